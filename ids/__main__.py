@@ -0,0 +1,8 @@
+"""
+Run the IDS from the command line: python -m ids {live,pcap,netflow,demo} ...
+"""
+import sys
+
+from ids.cli import main
+
+sys.exit(main())
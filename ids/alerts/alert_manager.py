@@ -113,6 +113,14 @@ class AlertManager:
             'recent_alerts': self.alerts[-10:]
         }
     
+    def get_state(self) -> Dict:
+        """Get alert history for checkpointing."""
+        return {'alerts': self.alerts[-1000:]}
+    
+    def load_state(self, state: Dict):
+        """Restore alert history saved with get_state()."""
+        self.alerts = list(state.get('alerts', []))
+    
     def clear_alerts(self):
         """Clear all alerts."""
         self.alerts.clear()
\ No newline at end of file
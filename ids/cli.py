@@ -0,0 +1,223 @@
+"""
+Command Line Interface
+Non-interactive IDS runner: live capture, capture file replay, flow exports or demo traffic
+"""
+import argparse
+import importlib
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .core.config import config
+
+# Detector names accepted by --disable, and the flag each one turns off
+DETECTOR_SETTINGS = {
+    'anomaly_detector': 'ENABLE_ANOMALY_DETECTION',
+    'scan_detector': 'ENABLE_SCAN_DETECTION',
+    'synflood_detector': 'ENABLE_SYN_FLOOD_DETECTION',
+    'dns_detector': 'ENABLE_DNS_DETECTION',
+    'rule_detector': 'ENABLE_RULE_DETECTION',
+    'stream_inspector': 'ENABLE_STREAM_INSPECTION',
+}
+
+# Simulated traffic for demo mode
+DEMO_IPS = ['192.168.1.100', '192.168.1.101', '10.0.0.50',
+            '172.16.0.10', '8.8.8.8', '1.1.1.1', '203.0.113.5']
+DEMO_TRANSPORTS = ['TCP', 'UDP', 'ICMP']
+DEMO_PORTS = [22, 23, 80, 443, 3306, 3389, 8080, 21, 25, 53]
+
+
+class ImportTimer:
+    """
+    Measures the imports each startup phase needs.
+
+    Scapy and Flask dominate startup, so they are only imported by the modes
+    that use them; the timings show what a run actually paid for.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    def load(self, label: str, module: str):
+        """Import a module, recording the time taken under a label."""
+        start = time.perf_counter()
+        loaded = importlib.import_module(module)
+        self.timings[label] = (time.perf_counter() - start) * 1000
+        return loaded
+
+    def report(self) -> str:
+        """Format the timings and the time since startup began."""
+        parts = [f"{label} {ms:.0f} ms" for label, ms in self.timings.items()]
+        total = (time.perf_counter() - self.started) * 1000
+        return f"imports: {', '.join(parts)}; ready in {total:.0f} ms"
+
+
+def host_port(value: str) -> Tuple[str, Optional[int]]:
+    """Parse HOST[:PORT] for --collector and --listen."""
+    host, _, port = value.partition(':')
+    if not host or (port and not port.isdigit()):
+        raise argparse.ArgumentTypeError(f"expected HOST[:PORT], got {value!r}")
+    return host, int(port) if port else None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    parser = argparse.ArgumentParser(
+        prog='python -m ids',
+        description='Network Intrusion Detection System (non-interactive)'
+    )
+    parser.add_argument('mode', choices=['live', 'pcap', 'netflow', 'demo'],
+                        help='live capture, capture file replay, NetFlow/IPFIX exports '
+                             'received over UDP, or simulated traffic')
+    parser.add_argument('pcap_file', nargs='?',
+                        help='capture file to replay (pcap mode)')
+    parser.add_argument('-i', '--interface', action='append', default=[],
+                        help='interface to capture from (repeat for several)')
+    parser.add_argument('-c', '--count', type=int, default=0,
+                        help='stop after this many packets in total over all interfaces, '
+                             'or flows (0 = no limit)')
+    parser.add_argument('-t', '--timeout', type=float, default=None,
+                        help='stop after this many seconds')
+    parser.add_argument('--listen', metavar='HOST[:PORT]', type=host_port,
+                        help='where to receive flow exports (netflow mode, '
+                             f'default {config.NETFLOW_HOST}:{config.NETFLOW_PORT})')
+    parser.add_argument('--rate', type=float, default=5.0,
+                        help='demo packets per second (0 = as fast as possible)')
+    parser.add_argument('--dashboard', action='store_true',
+                        help='serve the web dashboard while running')
+    parser.add_argument('--disable', action='append', default=[],
+                        choices=sorted(DETECTOR_SETTINGS), metavar='DETECTOR',
+                        help=f"turn a detector off ({', '.join(DETECTOR_SETTINGS)})")
+    parser.add_argument('--collector', metavar='HOST[:PORT]', type=host_port,
+                        help='push alerts and statistics to a central collector')
+    parser.add_argument('--sensor-name',
+                        help='name reported to the collector (default: host name)')
+    parser.add_argument('--collector-token',
+                        help='shared token the collector requires (default: COLLECTOR_TOKEN)')
+    parser.add_argument('--no-checkpoints', action='store_true',
+                        help='neither restore nor save detector state')
+    return parser
+
+
+def apply_arguments(args: argparse.Namespace):
+    """Apply command line overrides to the global config."""
+    for name in args.disable:
+        setattr(config, DETECTOR_SETTINGS[name], False)
+    if args.no_checkpoints:
+        config.ENABLE_CHECKPOINTS = False
+    if len(args.interface) > 1:
+        config.INTERFACES = list(args.interface)
+    if args.collector:
+        config.COLLECTOR_HOST, port = args.collector
+        if port:
+            config.COLLECTOR_PORT = port
+    if args.sensor_name:
+        config.SENSOR_NAME = args.sensor_name
+    if args.collector_token:
+        config.COLLECTOR_TOKEN = args.collector_token
+    if args.listen:
+        config.NETFLOW_HOST, port = args.listen
+        if port:
+            config.NETFLOW_PORT = port
+
+
+def demo_packet(number: int) -> dict:
+    """Build one simulated packet."""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'number': number,
+        'length': random.randint(64, 1500),
+        'src_ip': random.choice(DEMO_IPS),
+        'dst_ip': random.choice(DEMO_IPS),
+        'protocol': random.randint(1, 17),
+        'ttl': random.randint(64, 128),
+        'transport': random.choice(DEMO_TRANSPORTS),
+        'src_port': random.randint(1024, 65535),
+        'dst_port': random.choice(DEMO_PORTS)
+    }
+
+
+def run_demo(engine, count: int = 0, timeout: Optional[float] = None, rate: float = 5.0):
+    """
+    Feed simulated packets to the engine.
+
+    Args:
+        engine: IDS engine
+        count: Number of packets (0 = until interrupted or timed out)
+        timeout: Seconds to run (None = no limit)
+        rate: Packets per second (0 = as fast as possible)
+    """
+    deadline = time.time() + timeout if timeout else None
+    number = 0
+    while not count or number < count:
+        if deadline and time.time() >= deadline:
+            break
+        number += 1
+        engine.packet_callback(demo_packet(number))
+        if rate > 0:
+            time.sleep(1 / rate)
+
+
+def start_dashboard(engine, timer: ImportTimer):
+    """Import Flask and serve the dashboard in a background thread."""
+    app = timer.load('dashboard', 'ids.web.app')
+    thread = threading.Thread(target=app.run_dashboard, args=(engine,), daemon=True)
+    thread.start()
+    print(f"  📊 Dashboard: http://{config.DASHBOARD_HOST}:{config.DASHBOARD_PORT}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the IDS without prompts.
+
+    Returns:
+        Process exit code
+    """
+    timer = ImportTimer()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.mode == 'pcap' and not args.pcap_file:
+        parser.error('pcap mode needs a capture file')
+    apply_arguments(args)
+
+    engine_module = timer.load('engine', 'ids.ids_engine')
+    if args.mode == 'netflow':
+        timer.load('netflow', 'ids.netflow.listener')
+    elif args.mode != 'demo':
+        # Scapy: otherwise imported on the first capture
+        timer.load('capture', 'ids.core.capture')
+
+    try:
+        engine = engine_module.IDSEngine()
+    except PermissionError as e:
+        # A collector that refuses the sensor's token
+        print(f"\n❌ {e}")
+        return 1
+    if args.dashboard:
+        start_dashboard(engine, timer)
+    print(f"\n  ⏱️  Startup {timer.report()}")
+
+    try:
+        if args.mode == 'demo':
+            print(f"  🎮 Demo traffic at {args.rate or 'max'} packets/sec, Ctrl+C to stop")
+            run_demo(engine, count=args.count, timeout=args.timeout, rate=args.rate)
+        else:
+            interface = args.interface[0] if len(args.interface) == 1 else None
+            engine.start(interface=interface, count=args.count, timeout=args.timeout,
+                         pcap_file=args.pcap_file if args.mode == 'pcap' else None,
+                         netflow=args.mode == 'netflow')
+
+        # Keep serving results of a finished run until interrupted
+        if args.dashboard and args.mode in ('pcap', 'demo'):
+            print("  Dashboard still serving, Ctrl+C to exit")
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Shutting down IDS...")
+
+    if engine.running or args.mode == 'demo':
+        engine.stop()
+    return 0
@@ -0,0 +1,104 @@
+"""
+Collector Protocol
+Framing of the compressed messages sensors and the collector exchange
+"""
+import json
+import socket
+import struct
+import zlib
+from typing import BinaryIO, Dict, Iterator, Optional
+
+PROTOCOL_VERSION = 1
+
+# Frame: 4-byte big-endian payload length, then zlib-compressed JSON
+HEADER = struct.Struct('!I')
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+# Limit on the decompressed size, so a small frame cannot inflate unbounded
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+def encode_frame(message: Dict) -> bytes:
+    """Serialize a message to one frame."""
+    payload = zlib.compress(
+        json.dumps(message, separators=(',', ':'), default=str).encode(), 6
+    )
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode_payload(payload: bytes) -> Dict:
+    """
+    Deserialize the payload of one frame.
+
+    Raises:
+        ValueError: If the payload is corrupt or too large
+    """
+    try:
+        inflater = zlib.decompressobj()
+        data = inflater.decompress(payload, MAX_MESSAGE_BYTES)
+        if inflater.unconsumed_tail:
+            raise ValueError("Message exceeds the size limit")
+        message = json.loads(data)
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Corrupt message: {e}")
+    if not isinstance(message, dict):
+        raise ValueError("Message is not an object")
+    return message
+
+
+def _read_exactly(read, size: int) -> Optional[bytes]:
+    """Read `size` bytes with `read`, or None at end of stream before any byte."""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = read(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ValueError("Stream ended inside a frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def _read_frame(read) -> Optional[Dict]:
+    header = _read_exactly(read, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds the size limit")
+    payload = _read_exactly(read, length)
+    if payload is None:
+        raise ValueError("Stream ended inside a frame")
+    return decode_payload(payload)
+
+
+def recv_message(sock: socket.socket) -> Optional[Dict]:
+    """
+    Read one message from a socket.
+
+    Returns:
+        The message, or None if the peer closed the connection
+
+    Raises:
+        ValueError: If the stream is not valid framing
+        OSError: On socket errors and timeouts
+    """
+    return _read_frame(sock.recv)
+
+
+def read_frames(stream: BinaryIO) -> Iterator[bytes]:
+    """
+    Read the encoded frames of a spool file in order.
+
+    A truncated last frame (the sensor stopped while writing it) is skipped.
+    """
+    while True:
+        header = stream.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        (length,) = HEADER.unpack(header)
+        payload = stream.read(length)
+        if length > MAX_FRAME_BYTES or len(payload) < length:
+            return
+        yield header + payload
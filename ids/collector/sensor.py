@@ -0,0 +1,390 @@
+"""
+Sensor Reporter
+Pushes an engine's alert and statistics deltas to the central collector
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .protocol import PROTOCOL_VERSION, encode_frame, read_frames, recv_message
+
+
+class SensorReporter:
+    """
+    Sends batched deltas of one engine to a collector over a persistent connection.
+
+    Every interval the packet thread builds one batch (maybe_collect(),
+    called between packets like checkpoints): counter increments since the
+    last batch, alerts raised since then, closed 1 second time-series rows,
+    the current top talkers and a few gauges. The batch only holds copies,
+    so the background thread that encodes and sends it never reads the
+    engine's live structures. Each batch is one compressed frame that the
+    collector acknowledges. While the collector is unreachable, frames are
+    appended to a spool file on disk and sent in order once it is back.
+    Batches carry a per-run session id and a sequence number, so frames
+    sent twice (an ack lost to a reconnect) are only merged once.
+
+    A collector refusing the sensor (wrong token or protocol version) is
+    not retried: start() raises PermissionError, and if it happens later
+    the reporter stops with an error instead of spooling forever.
+    """
+
+    def __init__(self, engine, host: str, port: int, name: Optional[str] = None,
+                 token: Optional[str] = None, interval: float = 5.0, spool_dir: str = "data/spool",
+                 max_spool_bytes: int = 64 * 1024 * 1024, top_talkers: int = 20,
+                 max_alerts: int = 1000, timeout: float = 5.0):
+        """
+        Initialize sensor reporter.
+
+        Args:
+            engine: IDS engine to report
+            host: Collector host
+            port: Collector port
+            name: Sensor name shown by the collector (default: host name)
+            token: Shared token the collector requires
+            interval: Seconds between batches
+            spool_dir: Directory of the spool file used while disconnected
+            max_spool_bytes: Spool size above which new batches are dropped
+            top_talkers: Number of top source hosts sent per batch
+            max_alerts: Maximum alerts per batch (the rest go in the next one)
+            timeout: Connect and acknowledgement timeout in seconds
+        """
+        self.engine = engine
+        self.address = (host, port)
+        self.name = name or socket.gethostname()
+        self.token = token
+        self.interval = interval
+        self.spool_file = os.path.join(spool_dir, f"{self.name}.spool")
+        self.max_spool_bytes = max_spool_bytes
+        self.top_talkers = top_talkers
+        self.max_alerts = max_alerts
+        self.timeout = timeout
+
+        self.session = uuid.uuid4().hex
+        self.seq = 0
+        self._sock: Optional[socket.socket] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Batches built on the packet thread, waiting for the reporter thread
+        self._batches: Deque[Dict] = deque()
+        self._ready = threading.Event()
+        self._last_collect = time.monotonic()
+        self.refused: Optional[str] = None
+
+        # What the collector has already been sent (counters restored from a
+        # checkpoint were reported by the previous run)
+        self._counters: Dict[str, int] = dict(engine.stats)
+        self._detector_alerts: Dict[str, int] = {}
+        self._alerts_sent = len(engine.alert_manager.alerts)
+        self._last_second: Optional[int] = None
+        if engine.timeseries and engine.timeseries.seconds.bucket is not None:
+            # History restored from a checkpoint was reported by the previous run
+            self._last_second = engine.timeseries.seconds.bucket - 1
+
+        self.stats = {
+            'batches_sent': 0,
+            'batches_spooled': 0,
+            'batches_dropped': 0,
+            'batches_rejected': 0,
+            'bytes_sent': 0,
+            'connects': 0,
+            'errors': 0,
+            'last_error': None
+        }
+
+    def start(self):
+        """
+        Start reporting in a background thread.
+
+        Raises:
+            PermissionError: If the collector refuses the sensor (an
+                unreachable collector is not an error: batches are spooled)
+        """
+        if self._thread is not None:
+            return
+        try:
+            with self._lock:
+                self._connect()
+        except PermissionError:
+            raise
+        except (OSError, ValueError) as e:
+            self.stats['last_error'] = str(e)
+            self._close()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sensor-reporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop reporting, sending (or spooling) a last batch.
+
+        Called once packets have stopped, as the last batch is built on the
+        calling thread.
+        """
+        self._stop.set()
+        self._ready.set()
+        if self._thread is not None:
+            self._thread.join(self.timeout * 2)
+            self._thread = None
+        if self.refused is None:
+            self.collect(final=True)
+            self._send_cycle()
+        self._close()
+
+    def maybe_collect(self):
+        """Build a batch if one is due (packet thread)."""
+        now = time.monotonic()
+        if now - self._last_collect < self.interval or self.refused is not None:
+            return
+        self._last_collect = now
+        self.collect()
+
+    def collect(self, final: bool = False):
+        """
+        Build a batch and queue it for the reporter thread.
+
+        Args:
+            final: Whether the engine has stopped (the open second is sent too)
+        """
+        batch = self.build_batch(final)
+        with self._lock:
+            self._batches.append(batch)
+        self._ready.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._ready.wait(self.interval)
+            self._ready.clear()
+            if not self._send_cycle():
+                return
+
+    def _send_cycle(self) -> bool:
+        """
+        Deliver the queued batches, logging any failure.
+
+        Returns:
+            False if the collector refused the sensor and reporting stopped
+        """
+        try:
+            self.send_pending()
+        except PermissionError as e:
+            self.refused = str(e)
+            self.stats['last_error'] = self.refused
+            with self._lock:
+                self.stats['batches_dropped'] += len(self._batches)
+                self._batches.clear()
+            self._close()
+            print(f"\n❌ {e}; collector reporting stopped")
+            return False
+        except Exception as e:
+            # Never let one bad cycle end reporting
+            self.stats['errors'] += 1
+            self.stats['last_error'] = str(e)
+            print(f"\n❌ Collector report failed: {e}")
+        return True
+
+    def send_pending(self):
+        """
+        Deliver the queued batches, with any spooled batches before them.
+
+        Raises:
+            PermissionError: If the collector refuses the sensor
+        """
+        with self._lock:
+            while self._batches:
+                self._deliver(encode_frame(self._batches.popleft()))
+
+    def build_batch(self, final: bool = False) -> Dict:
+        """Collect what changed since the last batch (packet thread: reads live state)."""
+        engine = self.engine
+        self.seq += 1
+
+        counters = {}
+        for name, value in engine.stats.items():
+            delta = value - self._counters.get(name, 0)
+            if delta:
+                counters[name] = delta
+            self._counters[name] = value
+
+        detector_alerts = {}
+        for name, cost in engine.detectors.get_statistics().items():
+            delta = cost['alerts'] - self._detector_alerts.get(name, 0)
+            if delta:
+                detector_alerts[name] = delta
+            self._detector_alerts[name] = cost['alerts']
+
+        alerts = engine.alert_manager.alerts[self._alerts_sent:self._alerts_sent + self.max_alerts]
+        self._alerts_sent += len(alerts)
+
+        rows: List[Tuple[int, List[int]]] = []
+        if engine.timeseries:
+            rows = engine.timeseries.rows_since(self._last_second, include_open=final)
+            if rows:
+                self._last_second = rows[-1][0]
+
+        top = engine.anomaly_detector.get_top_talkers(self.top_talkers)
+
+        return {
+            'type': 'batch',
+            'sensor': self.name,
+            'session': self.session,
+            'seq': self.seq,
+            'time': time.time(),
+            'counters': counters,
+            'detector_alerts': detector_alerts,
+            'alerts': alerts,
+            'timeseries': rows,
+            'top_talkers': [[ip, packets] for ip, packets in top],
+            'status': {
+                'hosts': len(engine.hosts),
+                'protocols': dict(engine.anomaly_detector.protocol_counts),
+                'capture_lag': engine.capture_lag,
+                'sampling_rate': engine.load_shedder.effective_rate,
+                'running': engine.running
+            }
+        }
+
+    def _deliver(self, frame: bytes):
+        """
+        Send a frame after the spooled ones, spooling it if that fails.
+
+        Raises:
+            PermissionError: If the collector refuses the sensor (the frame
+                is dropped; spooled frames are kept)
+        """
+        try:
+            self._flush_spool()
+            self._sent(frame, self._send(frame))
+            return
+        except PermissionError:
+            self.stats['batches_dropped'] += 1
+            raise
+        except (OSError, ValueError) as e:
+            self.stats['last_error'] = str(e)
+            self._close()
+        self._spool(frame)
+
+    def _connect(self):
+        """
+        Open the connection and introduce the sensor.
+
+        Raises:
+            PermissionError: If the collector refuses the sensor
+            OSError: If the collector is unreachable
+        """
+        if self._sock is not None:
+            return
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._sock = sock
+        self.stats['connects'] += 1
+        error = self._send(encode_frame({
+            'type': 'hello',
+            'version': PROTOCOL_VERSION,
+            'sensor': self.name,
+            'session': self.session,
+            'token': self.token
+        }))
+        if error:
+            self._close()
+            raise PermissionError(f"Collector refused sensor {self.name!r}: {error}")
+
+    def _send(self, frame: bytes) -> Optional[str]:
+        """
+        Send one frame and wait for its acknowledgement.
+
+        Returns:
+            The collector's error if it rejected the frame, else None
+
+        Raises:
+            OSError: If the collector is unreachable or does not answer
+            ValueError: If the reply is not an acknowledgement
+        """
+        self._connect()
+        self._sock.sendall(frame)
+        reply = recv_message(self._sock)
+        if reply is None:
+            raise ConnectionError("Collector closed the connection")
+        if reply.get('type') != 'ack':
+            raise ValueError(f"Unexpected reply from collector: {reply.get('type')!r}")
+        return reply.get('error')
+
+    def _sent(self, frame: bytes, error: Optional[str]):
+        """Account a delivered frame; a rejected one is not retried."""
+        if error:
+            self.stats['batches_rejected'] += 1
+            self.stats['last_error'] = error
+            return
+        self.stats['batches_sent'] += 1
+        self.stats['bytes_sent'] += len(frame)
+
+    def _spool(self, frame: bytes):
+        """Append a frame to the spool file (or drop it when the spool is full)."""
+        try:
+            if self.spool_bytes() + len(frame) > self.max_spool_bytes:
+                self.stats['batches_dropped'] += 1
+                return
+            os.makedirs(os.path.dirname(self.spool_file) or '.', exist_ok=True)
+            with open(self.spool_file, 'ab') as f:
+                f.write(frame)
+            self.stats['batches_spooled'] += 1
+        except OSError as e:
+            self.stats['batches_dropped'] += 1
+            self.stats['last_error'] = str(e)
+
+    def _flush_spool(self):
+        """
+        Send spooled frames in order, removing the spool once all are acknowledged.
+
+        Raises:
+            OSError: If sending fails; unsent frames are kept in the spool
+        """
+        if not os.path.exists(self.spool_file):
+            return
+        with open(self.spool_file, 'rb') as f:
+            frames = list(read_frames(f))
+
+        for index, frame in enumerate(frames):
+            try:
+                error = self._send(frame)
+            except (OSError, ValueError):
+                self._rewrite_spool(frames[index:])
+                raise
+            self._sent(frame, error)
+        os.remove(self.spool_file)
+
+    def _rewrite_spool(self, frames: List[bytes]):
+        """Replace the spool with the frames not yet acknowledged."""
+        temp = self.spool_file + '.tmp'
+        with open(temp, 'wb') as f:
+            f.writelines(frames)
+        os.replace(temp, self.spool_file)
+
+    def spool_bytes(self) -> int:
+        """Get the size of the spool file."""
+        try:
+            return os.path.getsize(self.spool_file)
+        except OSError:
+            return 0
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def get_statistics(self) -> Dict:
+        """Get reporter statistics."""
+        return {
+            'collector': f"{self.address[0]}:{self.address[1]}",
+            'sensor': self.name,
+            'connected': self._sock is not None,
+            'spool_bytes': self.spool_bytes(),
+            **self.stats
+        }
@@ -0,0 +1,324 @@
+"""
+Collector Server
+Merges the alerts and statistics many sensors push into one combined view
+"""
+import hmac
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Dict, Optional
+
+from ..core.timeseries import TimeSeries
+from .protocol import PROTOCOL_VERSION, encode_frame, recv_message
+
+# Sessions (sensor runs) remembered per sensor for duplicate detection
+MAX_SESSIONS = 16
+
+
+class SensorState:
+    """What the collector knows about one sensor."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.address: Optional[str] = None
+        self.connections = 0
+        self.first_seen = time.time()
+        self.last_seen: Optional[float] = None
+        self.batches = 0
+        self.duplicates = 0
+        self.counters: Counter = Counter()
+        self.detector_alerts: Counter = Counter()
+        self.by_severity: Counter = Counter()
+        self.top_talkers: Dict[str, int] = {}
+        self.status: Dict = {}
+        # session -> last merged sequence number
+        self.sessions: 'OrderedDict[str, int]' = OrderedDict()
+
+    def get_statistics(self) -> Dict:
+        return {
+            'address': self.address,
+            'connected': self.connections > 0,
+            'last_seen': self.last_seen,
+            'batches': self.batches,
+            'duplicates': self.duplicates,
+            'packets_processed': self.counters['packets_processed'],
+            'alerts_generated': self.counters['alerts_generated'],
+            'by_severity': {s: self.by_severity[s] for s in ('HIGH', 'MEDIUM', 'LOW')},
+            'hosts': self.status.get('hosts', 0),
+            'capture_lag': self.status.get('capture_lag', 0.0),
+            'sampling_rate': self.status.get('sampling_rate', 1.0)
+        }
+
+
+class _SensorHandler(socketserver.BaseRequestHandler):
+    """Serves one sensor connection."""
+
+    def handle(self):
+        self.server.collector.handle_connection(self.request, self.client_address)
+
+
+class _CollectorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Collector:
+    """
+    Central service that sensors push batched deltas to.
+
+    Each sensor keeps one TCP connection open and sends compressed batches
+    (see SensorReporter); every batch is merged under one lock and then
+    acknowledged. Counters are summed per sensor and overall, alerts are
+    kept in one bounded list tagged with their sensor, 1 second time-series
+    rows are added into the collector's own TimeSeries (out-of-order rows
+    land in their interval), and top talkers are summed over the latest
+    top-N list of every sensor. Batches seen before (same session and
+    sequence number, e.g. resent from a sensor's spool) are acknowledged
+    but not merged again.
+
+    Sensors must present the collector's shared token in their hello;
+    other connections are refused before anything is merged.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5140, token: Optional[str] = None,
+                 max_alerts: int = 1000, top_talkers: int = 20,
+                 timeseries_points: Optional[Dict[str, int]] = None,
+                 idle_timeout: float = 300.0):
+        """
+        Initialize collector.
+
+        Args:
+            host: Address to listen on
+            port: Port to listen on
+            token: Shared token sensors must present (required to start)
+            max_alerts: Merged alerts kept in memory
+            top_talkers: Length of the merged top talker list
+            timeseries_points: Intervals kept per time-series resolution
+            idle_timeout: Seconds without a message before a connection is dropped
+        """
+        self.address = (host, port)
+        self.token = token
+        self.max_alerts = max_alerts
+        self.top_talker_count = top_talkers
+        self.idle_timeout = idle_timeout
+
+        self.sensors: Dict[str, SensorState] = {}
+        self.alerts: deque = deque(maxlen=max_alerts)
+        self.by_type: Counter = Counter()
+        self.timeseries = TimeSeries(timeseries_points)
+        self.lock = threading.Lock()
+
+        self.server: Optional[_CollectorServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._connections = set()
+        self.start_time = time.time()
+        self.rejected = 0
+        self.refused = 0
+
+    def start(self):
+        """
+        Start accepting sensor connections in a background thread.
+
+        Raises:
+            ValueError: If no token is configured
+            OSError: If the address cannot be bound
+        """
+        if not self.token:
+            raise ValueError("A collector token is required (COLLECTOR_TOKEN)")
+        self.server = _CollectorServer(self.address, _SensorHandler)
+        self.server.collector = self
+        # Port 0 binds a free port; report the real one
+        self.address = self.server.server_address[:2]
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        name="collector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop accepting connections and disconnect all sensors."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        with self.lock:
+            connections = list(self._connections)
+        for sock in connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def handle_connection(self, sock: socket.socket, address):
+        """Read a sensor's hello, then merge and acknowledge its batches."""
+        sock.settimeout(self.idle_timeout)
+        state = None
+        with self.lock:
+            self._connections.add(sock)
+        try:
+            hello = recv_message(sock)
+            if not hello or hello.get('type') != 'hello' or not hello.get('sensor'):
+                return
+            if hello.get('version') != PROTOCOL_VERSION:
+                sock.sendall(encode_frame({
+                    'type': 'ack',
+                    'error': f"Unsupported protocol version {hello.get('version')}"
+                }))
+                return
+            if not self._authorized(hello.get('token')):
+                self.refused += 1
+                sock.sendall(encode_frame({'type': 'ack', 'error': "Invalid token"}))
+                return
+
+            with self.lock:
+                state = self._sensor(str(hello['sensor']))
+                state.connections += 1
+                state.address = f"{address[0]}:{address[1]}"
+            sock.sendall(encode_frame({'type': 'ack'}))
+
+            while True:
+                message = recv_message(sock)
+                if message is None:
+                    break
+                error = None
+                try:
+                    self.merge(message)
+                except (KeyError, TypeError, ValueError) as e:
+                    self.rejected += 1
+                    error = f"Invalid batch: {e}"
+                sock.sendall(encode_frame({'type': 'ack', 'seq': message.get('seq'),
+                                           'error': error}))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                self._connections.discard(sock)
+                if state is not None:
+                    state.connections -= 1
+
+    def _authorized(self, token) -> bool:
+        """Check a sensor's token against the configured one."""
+        if not self.token or not isinstance(token, str):
+            return False
+        return hmac.compare_digest(token.encode(), self.token.encode())
+
+    def _sensor(self, name: str) -> SensorState:
+        state = self.sensors.get(name)
+        if state is None:
+            state = self.sensors[name] = SensorState(name)
+        return state
+
+    def merge(self, batch: Dict) -> bool:
+        """
+        Merge one batch.
+
+        Returns:
+            False if the batch was already merged
+
+        Raises:
+            KeyError, TypeError, ValueError: If the batch is malformed
+        """
+        if batch.get('type') != 'batch':
+            raise ValueError(f"unexpected message type {batch.get('type')!r}")
+        name = str(batch['sensor'])
+        session = str(batch['session'])
+        seq = int(batch['seq'])
+
+        # Convert everything first, so a malformed batch changes nothing
+        counters = {str(k): int(v) for k, v in batch.get('counters', {}).items()}
+        detector_alerts = {str(k): int(v) for k, v in batch.get('detector_alerts', {}).items()}
+        alerts = [dict(alert, sensor=name) for alert in batch.get('alerts', [])]
+        rows = [(int(second), [int(v) for v in row])
+                for second, row in batch.get('timeseries', [])]
+        top_talkers = {str(ip): int(count) for ip, count in batch.get('top_talkers', [])}
+        status = dict(batch.get('status', {}))
+
+        with self.lock:
+            state = self._sensor(name)
+            if seq <= state.sessions.get(session, 0):
+                state.duplicates += 1
+                return False
+            state.sessions[session] = seq
+            state.sessions.move_to_end(session)
+            if len(state.sessions) > MAX_SESSIONS:
+                state.sessions.popitem(last=False)
+
+            state.counters.update(counters)
+            state.detector_alerts.update(detector_alerts)
+            for alert in alerts:
+                self.alerts.append(alert)
+                state.by_severity[alert.get('severity')] += 1
+                self.by_type[alert.get('type')] += 1
+            for second, row in rows:
+                self.timeseries.add_row(second, row)
+
+            state.top_talkers = top_talkers
+            state.status = status
+            state.batches += 1
+            state.last_seen = time.time()
+        return True
+
+    def top_talkers(self) -> Dict[str, int]:
+        """Sum the latest top talker lists of all sensors."""
+        merged: Counter = Counter()
+        for state in self.sensors.values():
+            merged.update(state.top_talkers)
+        return dict(merged.most_common(self.top_talker_count))
+
+    def get_statistics(self) -> Dict:
+        """
+        Get the combined statistics of all sensors.
+
+        The layout follows IDSEngine.get_statistics() where the dashboard
+        reads it, plus a 'sensors' table and 'collector' totals.
+        """
+        with self.lock:
+            sensors = list(self.sensors.values())
+            totals: Counter = Counter()
+            detector_alerts: Counter = Counter()
+            by_severity: Counter = Counter()
+            protocols: Counter = Counter()
+            for state in sensors:
+                totals.update(state.counters)
+                detector_alerts.update(state.detector_alerts)
+                by_severity.update(state.by_severity)
+                protocols.update(state.status.get('protocols', {}))
+            recent = list(self.alerts)[-10:]
+            top = self.top_talkers()
+            sensor_stats = {state.name: state.get_statistics() for state in sensors}
+            by_type = dict(self.by_type)
+
+        return {
+            'engine': {
+                'packets_processed': totals['packets_processed'],
+                'flows_processed': totals['flows_processed'],
+                'anomalies_detected': totals['anomalies_detected'],
+                'alerts_generated': totals['alerts_generated'],
+                'packets_suppressed': totals['packets_suppressed'],
+                'packets_shed': totals['packets_shed']
+            },
+            'anomaly_detector': {
+                'total_ips': sum(s['hosts'] for s in sensor_stats.values()),
+                'connections_by_ip': top,
+                'protocol_distribution': dict(protocols)
+            },
+            'alert_manager': {
+                'total_alerts': sum(by_severity.values()),
+                'by_severity': {s: by_severity[s] for s in ('HIGH', 'MEDIUM', 'LOW')},
+                'by_type': by_type,
+                'recent_alerts': recent
+            },
+            'detector_alerts': dict(detector_alerts),
+            'top_talkers': top,
+            'sensors': sensor_stats,
+            'collector': {
+                'address': f"{self.address[0]}:{self.address[1]}",
+                'sensors': len(sensor_stats),
+                'connected': sum(1 for s in sensor_stats.values() if s['connected']),
+                'batches': sum(s['batches'] for s in sensor_stats.values()),
+                'duplicates': sum(s['duplicates'] for s in sensor_stats.values()),
+                'rejected': self.rejected,
+                'refused': self.refused,
+                'uptime': time.time() - self.start_time
+            }
+        }
@@ -0,0 +1,80 @@
+"""
+Address Module
+Unified integer form of IPv4 and IPv6 addresses
+"""
+import socket
+from typing import Optional
+
+# IPv4 addresses are stored IPv4-mapped (::ffff:a.b.c.d), so both families
+# share one 128-bit integer space and every table needs one kind of key
+V4_MAPPED = 0xFFFF << 32
+V4_MASK = 0xFFFFFFFF
+
+# Packet fields holding integer addresses, and the string fields they come from
+ADDRESS_FIELDS = {'src_addr': 'src_ip', 'dst_addr': 'dst_ip'}
+
+
+def address_to_int(ip: str) -> int:
+    """
+    Convert an IPv4/IPv6 address string to its unified integer form.
+
+    Raises:
+        ValueError: If the address is not valid
+    """
+    try:
+        if ':' in ip:
+            return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+        return V4_MAPPED | int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except (OSError, TypeError):
+        raise ValueError(f"Invalid IP address: {ip!r}")
+
+
+def is_ipv4(address: int) -> bool:
+    """Check whether a unified address is an IPv4 address."""
+    return address >> 32 == 0xFFFF
+
+
+def int_to_address(address: int) -> str:
+    """Convert a unified integer address back to its string form."""
+    if is_ipv4(address):
+        return socket.inet_ntop(socket.AF_INET, (address & V4_MASK).to_bytes(4, 'big'))
+    return socket.inet_ntop(socket.AF_INET6, address.to_bytes(16, 'big'))
+
+
+def subnet_of(address: int) -> int:
+    """Get the /24 (IPv4) or /64 (IPv6) network of a unified address."""
+    if is_ipv4(address):
+        return address & ~0xFF
+    return address >> 64 << 64
+
+
+def format_subnet(network: int) -> str:
+    """Format a network from subnet_of() in CIDR notation."""
+    return f"{int_to_address(network)}/{24 if is_ipv4(network) else 64}"
+
+
+def packet_address(packet_info: dict, field: str) -> Optional[int]:
+    """
+    Get a packet's source or destination address in integer form.
+
+    The sniffer fills in 'src_addr'/'dst_addr'; for packets built elsewhere
+    (demo traffic, flow records) the string address is converted on first
+    use and cached in the packet.
+
+    Args:
+        packet_info: Packet information dictionary
+        field: 'src_addr' or 'dst_addr'
+
+    Returns:
+        Integer address, or None if the packet has no valid address
+    """
+    if field in packet_info:
+        return packet_info[field]
+
+    ip = packet_info.get(ADDRESS_FIELDS[field])
+    try:
+        address = address_to_int(ip) if ip else None
+    except ValueError:
+        address = None
+    packet_info[field] = address
+    return address
@@ -0,0 +1,183 @@
+"""
+Application Layer Parsers
+Lazy HTTP request and DNS query parsing on top of the captured payload
+"""
+import re
+import struct
+from typing import Any
+from urllib.parse import unquote_plus
+
+HTTP_METHODS = (b'GET ', b'POST ', b'PUT ', b'HEAD ', b'DELETE ', b'OPTIONS ',
+                b'PATCH ', b'CONNECT ', b'TRACE ')
+
+# Longest request line / header block looked at
+MAX_REQUEST_LINE = 8192
+MAX_HEADER_BYTES = 16384
+
+DNS_PORT = 53
+
+DNS_QTYPES = {
+    'A': 1, 'NS': 2, 'CNAME': 5, 'SOA': 6, 'NULL': 10, 'PTR': 12, 'HINFO': 13,
+    'MX': 15, 'TXT': 16, 'AAAA': 28, 'SRV': 33, 'NAPTR': 35, 'DS': 43,
+    'DNSKEY': 48, 'HTTPS': 65, 'AXFR': 252, 'ANY': 255
+}
+
+HTTP_FIELDS = ('http_method', 'http_uri', 'http_host')
+DNS_FIELDS = ('dns_qname', 'dns_qtype', 'dns_rcode', 'dns_response', 'dns_answers')
+
+_HOST_HEADER = re.compile(rb'\r\nhost:[ \t]*([^\r\n]*)', re.IGNORECASE)
+
+
+def parse_http(packet_info: dict):
+    """
+    Fill in the HTTP request fields of a packet (None if not a request).
+
+    Only the request line and Host header are extracted; the payload is
+    searched in place rather than copied or split into lines.
+    """
+    for field in HTTP_FIELDS:
+        packet_info[field] = None
+
+    payload = packet_info.get('payload')
+    if packet_info.get('transport') != 'TCP' or not payload or not payload.startswith(HTTP_METHODS):
+        return
+
+    line_end = payload.find(b'\r\n', 0, MAX_REQUEST_LINE)
+    if line_end < 0:
+        # Request line continues in a later segment
+        line_end = min(len(payload), MAX_REQUEST_LINE)
+
+    parts = payload[:line_end].split(b' ', 2)
+    packet_info['http_method'] = parts[0].decode('ascii', 'replace')
+    if len(parts) > 1:
+        packet_info['http_uri'] = unquote_plus(parts[1].decode('latin-1'), encoding='latin-1')
+
+    header_end = payload.find(b'\r\n\r\n', line_end, MAX_HEADER_BYTES)
+    if header_end < 0:
+        header_end = min(len(payload), MAX_HEADER_BYTES)
+    match = _HOST_HEADER.search(payload, line_end, header_end + 2)
+    if match:
+        packet_info['http_host'] = match.group(1).decode('latin-1').strip().lower()
+
+
+def _read_name(data: bytes, pos: int, base: int) -> tuple:
+    """
+    Read a (possibly compressed) domain name.
+
+    Args:
+        data: Buffer holding the DNS message
+        pos: Position of the name
+        base: Position of the DNS header (compression pointers are relative to it)
+
+    Returns:
+        (lowercase name without trailing dot, position after the name)
+
+    Raises:
+        ValueError: If the name is malformed
+    """
+    labels = []
+    end = None
+    length = 0
+    for _ in range(128):
+        if pos >= len(data):
+            raise ValueError("Truncated name")
+        size = data[pos]
+        if size == 0:
+            return '.'.join(labels), (end if end is not None else pos + 1)
+        if size & 0xC0 == 0xC0:
+            if pos + 1 >= len(data):
+                raise ValueError("Truncated pointer")
+            if end is None:
+                end = pos + 2
+            pos = base + (((size & 0x3F) << 8) | data[pos + 1])
+            continue
+        if size & 0xC0:
+            raise ValueError("Invalid label type")
+
+        length += size + 1
+        if length > 255 or pos + 1 + size > len(data):
+            raise ValueError("Invalid name length")
+        labels.append(data[pos + 1:pos + 1 + size].decode('latin-1').lower())
+        pos += 1 + size
+    raise ValueError("Name pointer loop")
+
+
+def parse_dns(packet_info: dict):
+    """Fill in the DNS fields of a packet (None if not a DNS message)."""
+    for field in DNS_FIELDS:
+        packet_info[field] = None
+
+    payload = packet_info.get('payload')
+    transport = packet_info.get('transport')
+    if not payload or transport not in ('UDP', 'TCP'):
+        return
+    if packet_info.get('dst_port') != DNS_PORT and packet_info.get('src_port') != DNS_PORT:
+        return
+
+    # DNS over TCP carries a two-byte length prefix
+    offset = 2 if transport == 'TCP' else 0
+    if len(payload) < offset + 12:
+        return
+
+    _, flags, qdcount, ancount = struct.unpack_from('!HHHH', payload, offset)
+    if qdcount == 0:
+        return
+
+    try:
+        qname, pos = _read_name(payload, offset + 12, offset)
+    except ValueError:
+        return
+    if pos + 2 > len(payload):
+        return
+
+    packet_info['dns_qname'] = qname
+    packet_info['dns_qtype'] = struct.unpack_from('!H', payload, pos)[0]
+    packet_info['dns_rcode'] = flags & 0x0F
+    packet_info['dns_response'] = bool(flags & 0x8000)
+    packet_info['dns_answers'] = ancount
+
+
+_PARSERS = {field: parse_http for field in HTTP_FIELDS}
+_PARSERS.update({field: parse_dns for field in DNS_FIELDS})
+
+APP_FIELDS = frozenset(_PARSERS)
+
+
+def app_field(packet_info: dict, name: str) -> Any:
+    """
+    Get an application-layer field, parsing the payload on first use.
+
+    Packets are not parsed by the sniffer; the parser for a protocol runs
+    the first time a rule or detector asks for one of its fields, and its
+    results are cached in packet_info for the rest of the pipeline.
+
+    Args:
+        packet_info: Packet information dictionary
+        name: One of APP_FIELDS
+
+    Returns:
+        Field value, or None if the packet does not carry it
+    """
+    try:
+        return packet_info[name]
+    except KeyError:
+        pass
+    _PARSERS[name](packet_info)
+    return packet_info[name]
+
+
+def qtype_number(value) -> int:
+    """
+    Convert a DNS query type name or number to its number.
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    if isinstance(value, int):
+        return value
+    name = str(value).upper()
+    if name.isdigit():
+        return int(name)
+    if name not in DNS_QTYPES:
+        raise ValueError(f"Unknown DNS query type: {value}")
+    return DNS_QTYPES[name]
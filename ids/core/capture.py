@@ -0,0 +1,220 @@
+"""
+Capture Manager Module
+Runs one capture worker per interface (or RX queue) feeding a single detection stage
+"""
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from .sniffer import PacketSniffer
+
+
+class CaptureWorker:
+    """A sniffer running in its own thread, handing packets to the shared queue."""
+
+    def __init__(self, sniffer: PacketSniffer, packets: 'queue.Queue'):
+        self.sniffer = sniffer
+        self.packets = packets
+        self.queue_drops = 0
+        self.thread: Optional[threading.Thread] = None
+        sniffer.callback = self._enqueue
+
+    def _enqueue(self, packet_info: dict):
+        # Never block capture: a full queue means detection is behind
+        try:
+            self.packets.put_nowait(packet_info)
+        except queue.Full:
+            self.queue_drops += 1
+
+    def start(self, count: int, timeout: Optional[int]):
+        self.thread = threading.Thread(
+            target=self.sniffer.start,
+            kwargs={'count': count, 'timeout': timeout},
+            name=f"capture-{self.sniffer.interface or 'default'}",
+            daemon=True
+        )
+        self.thread.start()
+
+    @property
+    def alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+
+class CaptureManager:
+    """
+    Captures from several interfaces at once for one detection stage.
+
+    Each interface gets one or more PacketSniffer workers in their own
+    threads; several workers on one interface join an AF_PACKET fanout
+    group, so the kernel splits its traffic (per flow, or per NIC RX queue)
+    between their sockets. Workers dissect packets and put them on one
+    bounded queue, which the calling thread drains in batches of whatever
+    is waiting (up to batch_size) into the detection stage. A single
+    interface with a single worker skips the queue and calls back directly,
+    each packet as a batch of one.
+    """
+
+    def __init__(self, interfaces: List[Optional[str]], callback: Callable[[dict], None],
+                 metrics=None, workers_per_interface: int = 1, fanout_mode: str = 'hash',
+                 queue_size: int = 10000, pcap_file: Optional[str] = None,
+                 batch_callback: Optional[Callable[[List[dict]], None]] = None,
+                 batch_size: int = 256):
+        """
+        Initialize capture manager.
+
+        Args:
+            interfaces: Interfaces to capture from (None: the default interface)
+            callback: Detection stage called with each packet's information
+            metrics: Optional Metrics registry for dissection timing
+            workers_per_interface: Capture workers (fanout group members) per interface
+            fanout_mode: Fanout group mode ('hash', 'lb', 'cpu' or 'qm')
+            queue_size: Maximum packets waiting for the detection stage
+            pcap_file: Capture file to replay instead of the interfaces (one worker)
+            batch_callback: Detection stage called with each batch instead of
+                callback (optional)
+            batch_size: Maximum packets per batch
+        """
+        self.interfaces = list(interfaces) or [None]
+        self.callback = callback
+        self.batch_callback = batch_callback
+        self.batch_size = batch_size
+        self.batches = 0
+        self.packets: 'queue.Queue' = queue.Queue(maxsize=queue_size)
+        self.running = False
+        self.start_time = None
+
+        self.workers: List[CaptureWorker] = []
+        if pcap_file:
+            self.interfaces = [None]
+            sniffer = PacketSniffer(metrics=metrics, offline=pcap_file)
+            self.workers.append(CaptureWorker(sniffer, self.packets))
+            return
+
+        for interface in self.interfaces:
+            fanout_group = None
+            if workers_per_interface > 1:
+                # One group id per interface, stable across restarts
+                fanout_group = zlib.crc32(str(interface).encode()) & 0xFFFF
+            for _ in range(workers_per_interface):
+                sniffer = PacketSniffer(interface=interface, metrics=metrics,
+                                        fanout_group=fanout_group, fanout_mode=fanout_mode)
+                self.workers.append(CaptureWorker(sniffer, self.packets))
+
+    def start(self, count: int = 0, timeout: Optional[int] = None):
+        """
+        Start all workers and run the detection stage until they stop.
+
+        Args:
+            count: Number of packets to analyze over all workers (0 = infinite)
+            timeout: Capture timeout in seconds (None = no timeout)
+        """
+        self.running = True
+        self.start_time = time.time()
+
+        if len(self.workers) == 1:
+            sniffer = self.workers[0].sniffer
+            sniffer.callback = (self.callback if self.batch_callback is None
+                                else lambda packet_info: self._deliver([packet_info]))
+            sniffer.start(count=count, timeout=timeout)
+            return
+
+        # Workers capture without a count; the drain stops them at the total
+        for worker in self.workers:
+            worker.start(0, timeout)
+
+        print(f"  Capturing on {', '.join(str(i or 'default') for i in self.interfaces)} "
+              f"with {len(self.workers)} workers")
+
+        remaining = count or None
+        while self.running:
+            try:
+                packet_info = self.packets.get(timeout=0.5)
+            except queue.Empty:
+                if not any(worker.alive for worker in self.workers):
+                    break
+                continue
+
+            # Take what else is already waiting, without blocking
+            limit = self.batch_size if remaining is None else min(self.batch_size, remaining)
+            batch = [packet_info]
+            while len(batch) < limit:
+                try:
+                    batch.append(self.packets.get_nowait())
+                except queue.Empty:
+                    break
+            self._deliver(batch)
+
+            if remaining is not None:
+                remaining -= len(batch)
+                if not remaining:
+                    for worker in self.workers:
+                        worker.sniffer.running = False
+                    break
+
+    def _deliver(self, batch: List[dict]):
+        """Hand a batch of packets to the detection stage."""
+        self.batches += 1
+        if self.batch_callback is not None:
+            self.batch_callback(batch)
+        else:
+            for packet_info in batch:
+                self.callback(packet_info)
+
+    def stop(self):
+        """Stop all workers."""
+        self.running = False
+        if len(self.workers) == 1:
+            self.workers[0].sniffer.stop()
+            return
+
+        for worker in self.workers:
+            worker.sniffer.running = False
+
+        if self.start_time:
+            duration = time.time() - self.start_time
+            total = sum(worker.sniffer.packet_count for worker in self.workers)
+            print(f"\n{'='*70}")
+            print(f"  PACKET CAPTURE STOPPED")
+            print(f"{'='*70}")
+            print(f"  Stopped: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"  Total packets: {total} on {len(self.interfaces)} interfaces")
+            print(f"  Duration: {duration:.2f} seconds")
+            print(f"  Rate: {total/duration:.2f} packets/sec")
+            print(f"{'='*70}\n")
+
+    def kernel_drops(self) -> int:
+        """Get packets dropped by the kernel over all workers, as last polled by each."""
+        return sum(worker.sniffer.kernel_drops for worker in self.workers)
+
+    def get_stats(self) -> Dict:
+        """Get capture statistics, overall and per interface."""
+        duration = time.time() - self.start_time if self.start_time else 0
+        interfaces: Dict[str, Dict] = {}
+        for worker in self.workers:
+            sniffer = worker.sniffer
+            name = sniffer.interface or sniffer.offline or 'default'
+            entry = interfaces.setdefault(str(name), {
+                'workers': 0, 'packet_count': 0, 'kernel_drops': 0,
+                'queue_drops': 0, 'running': False
+            })
+            entry['workers'] += 1
+            entry['packet_count'] += sniffer.packet_count
+            entry['kernel_drops'] += sniffer.kernel_drops
+            entry['queue_drops'] += worker.queue_drops
+            entry['running'] = entry['running'] or sniffer.running
+        for entry in interfaces.values():
+            entry['rate'] = entry['packet_count'] / duration if duration > 0 else 0
+
+        return {
+            'packet_count': sum(e['packet_count'] for e in interfaces.values()),
+            'kernel_drops': sum(e['kernel_drops'] for e in interfaces.values()),
+            'queue_drops': sum(e['queue_drops'] for e in interfaces.values()),
+            'queued': self.packets.qsize(),
+            'batches': self.batches,
+            'duration': duration,
+            'running': self.running,
+            'interfaces': interfaces
+        }
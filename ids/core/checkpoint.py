@@ -0,0 +1,229 @@
+"""
+Checkpoint Module
+Periodic snapshots of detector state for warm restarts
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .hosts import HostSnapshot, HostTable
+
+CHECKPOINT_MAGIC = b'IDSCKPT'
+CHECKPOINT_VERSION = 3
+# Characters of JSON compressed at a time
+ENCODE_CHUNK = 1 << 16
+
+
+def encode_snapshot(state: Dict, hosts: Optional[Dict[str, List[str]]] = None) -> bytes:
+    """
+    Serialize plain-data state (dicts, lists, strings, numbers) to the
+    compact checkpoint format: a header and zlib-compressed JSON.
+
+    Args:
+        state: State to save
+        hosts: Host table saved by a HostSnapshot, stored under 'hosts'
+            (dumper name -> JSON members)
+
+    The host members are already JSON; they are spliced in and compressed
+    in chunks rather than joined into one string, so encoding a large
+    table never holds the GIL (and the packet thread) for long.
+
+    Raises:
+        TypeError: If the state holds other objects
+    """
+    compressor = zlib.compressobj(6)
+    parts = [CHECKPOINT_MAGIC, bytes([CHECKPOINT_VERSION])]
+    pending = []
+    size = 0
+    for piece in _json_pieces(state, hosts):
+        pending.append(piece)
+        size += len(piece)
+        if size >= ENCODE_CHUNK:
+            parts.append(compressor.compress(''.join(pending).encode()))
+            pending.clear()
+            size = 0
+    parts.append(compressor.compress(''.join(pending).encode()))
+    parts.append(compressor.flush())
+    return b''.join(parts)
+
+
+def _json_pieces(state: Dict, hosts: Optional[Dict[str, List[str]]]) -> Iterator[str]:
+    """Yield the JSON text of state with the host members added under 'hosts'."""
+    text = json.dumps(state, separators=(',', ':'))
+    if hosts is None:
+        yield text
+        return
+
+    yield text[:-1]
+    yield ',"hosts":{' if state else '"hosts":{'
+    for i, (name, members) in enumerate(hosts.items()):
+        yield f'{"," if i else ""}{json.dumps(name)}:{{'
+        for j, member in enumerate(members):
+            yield ',' + member if j else member
+        yield '}'
+    yield '}}'
+
+
+def decode_snapshot(data: bytes) -> Dict:
+    """
+    Deserialize state written by encode_snapshot().
+
+    Raises:
+        ValueError: If the data is not a supported checkpoint
+    """
+    header = len(CHECKPOINT_MAGIC)
+    if data[:header] != CHECKPOINT_MAGIC:
+        raise ValueError("Not an IDS checkpoint file")
+    if data[header] != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {data[header]}")
+
+    state = json.loads(zlib.decompress(data[header + 1:]))
+    if not isinstance(state, dict):
+        raise ValueError("Checkpoint does not hold a state object")
+    return state
+
+
+def write_snapshot(path: str, data: bytes):
+    """Atomically write an encoded snapshot to disk."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str) -> Optional[Dict]:
+    """
+    Load a checkpoint file.
+
+    Returns:
+        Saved state, or None if there is no usable checkpoint
+    """
+    try:
+        with open(path, 'rb') as f:
+            return decode_snapshot(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, IndexError, zlib.error) as e:
+        print(f"\n❌ Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+
+class CheckpointManager:
+    """
+    Periodically snapshots state without pausing the capture loop.
+
+    maybe_snapshot() is meant to be called from the thread that owns the
+    state (the packet path). When a snapshot is due, that thread only
+    takes the state outside the host table, which config limits keep
+    small (alert history, time series, subnet baselines), as plain data,
+    and starts a copy-on-write snapshot of the host table (see
+    HostSnapshot), which is O(1). A background thread then saves the
+    host records, encodes everything to JSON, compresses it and writes
+    the file, so the per-host state that grows with traffic is never
+    walked or encoded between two packets. Checkpoints hold only JSON,
+    so loading one cannot run code.
+    """
+
+    def __init__(self, path: str, get_state: Callable[[], Dict], interval: float = 60.0,
+                 hosts: Optional[HostTable] = None):
+        """
+        Initialize checkpoint manager.
+
+        Args:
+            path: Checkpoint file
+            get_state: Function returning the state to save as plain data
+                (besides the host table)
+            interval: Seconds between snapshots
+            hosts: Host table saved copy-on-write under 'hosts' (optional)
+        """
+        self.path = path
+        self.get_state = get_state
+        self.interval = interval
+        self.hosts = hosts
+
+        self.snapshots_started = 0
+        self.snapshots_failed = 0
+        self.last_snapshot = time.monotonic()
+        # Time the calling thread spent starting the last and slowest snapshot
+        self.last_pause_ns = 0
+        self.max_pause_ns = 0
+
+        self._writer = None
+
+    def maybe_snapshot(self):
+        """Start a snapshot if one is due and none is in progress."""
+        now = time.monotonic()
+        if now - self.last_snapshot < self.interval:
+            return
+
+        self.last_snapshot = now
+        if self.in_progress():
+            return
+
+        self.snapshot()
+
+    def in_progress(self) -> bool:
+        """Check whether a snapshot is still being written."""
+        return bool(self._writer and self._writer.is_alive())
+
+    def snapshot(self):
+        """Take a snapshot now and write it in the background."""
+        started = time.perf_counter_ns()
+        self.snapshots_started += 1
+        state = self.get_state()
+        view = self.hosts.begin_snapshot() if self.hosts is not None else None
+
+        self._writer = threading.Thread(target=self._write, args=(state, view), daemon=True)
+        self._writer.start()
+        self.last_pause_ns = time.perf_counter_ns() - started
+        self.max_pause_ns = max(self.max_pause_ns, self.last_pause_ns)
+
+    def _write(self, state: Dict, view: Optional[HostSnapshot]):
+        """Save the host records, encode, compress and write (writer thread)."""
+        try:
+            hosts = view.collect() if view is not None else None
+            write_snapshot(self.path, encode_snapshot(state, hosts))
+        except (OSError, TypeError, ValueError) as e:
+            self.snapshots_failed += 1
+            print(f"\n❌ Checkpoint failed: {e}")
+
+    def save_now(self):
+        """
+        Write a snapshot synchronously (used on shutdown).
+
+        Raises:
+            OSError: If the file cannot be written
+            TypeError, ValueError: If the state is not plain data
+        """
+        while self.in_progress():
+            time.sleep(0.05)
+
+        state = self.get_state()
+        hosts = self.hosts.begin_snapshot().collect() if self.hosts is not None else None
+        write_snapshot(self.path, encode_snapshot(state, hosts))
+        self.snapshots_started += 1
+        self.last_snapshot = time.monotonic()
+
+    def load(self) -> Optional[Dict]:
+        """Load the last checkpoint, if any."""
+        return load_snapshot(self.path)
+
+    def get_statistics(self) -> Dict:
+        """Get checkpoint statistics."""
+        return {
+            'path': self.path,
+            'snapshots': self.snapshots_started,
+            'failed': self.snapshots_failed,
+            'in_progress': self.in_progress(),
+            'last_pause_ms': self.last_pause_ns / 1e6,
+            'max_pause_ms': self.max_pause_ns / 1e6
+        }
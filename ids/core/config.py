@@ -2,7 +2,7 @@
 IDS Configuration Settings
 """
 from dataclasses import dataclass, field
-from typing import List
+from typing import Dict, List
 import os
 
 @dataclass
@@ -11,11 +11,79 @@ class IDSConfig:
     
     # Network Settings
     INTERFACE: str = None  # Auto-detect interface
+    INTERFACES: List[str] = field(default_factory=list)  # Capture from several at once
     PROMISCUOUS_MODE: bool = False
     
+    # Capture Workers (several per interface join an AF_PACKET fanout group, Linux only)
+    CAPTURE_WORKERS_PER_INTERFACE: int = 1
+    CAPTURE_FANOUT_MODE: str = 'hash'  # hash (per flow), lb, cpu, qm (per RX queue)
+    CAPTURE_QUEUE_SIZE: int = 10000  # packets waiting for detection
+    CAPTURE_BATCH_SIZE: int = 256  # most queued packets handed to detection at once
+    
+    # NetFlow v5/v9 and IPFIX input (netflow mode): flow records exported by
+    # routers are analyzed instead of captured packets
+    NETFLOW_HOST: str = "0.0.0.0"
+    NETFLOW_PORT: int = 2055
+    NETFLOW_RECV_BUFFER: int = 8 * 1024 * 1024  # bytes of export packets queued by the kernel
+    
     # Detection Settings
     ENABLE_ANOMALY_DETECTION: bool = True
     ENABLE_RULE_DETECTION: bool = True
+    # Detector names to run first, in this order (the rest follow in their default order)
+    DETECTOR_ORDER: List[str] = field(default_factory=list)
+    
+    # Shared per-host state of all detectors (CLOCK-evicted as a unit)
+    HOST_TABLE_SIZE: int = 200000
+    
+    # Rule Files (JSON/YAML, loaded on top of the built-in rules and hot-reloaded)
+    RULE_FILES: List[str] = field(default_factory=list)
+    RULE_RELOAD_INTERVAL: int = 10
+    
+    # Snort/Suricata rule files (supported subset only) and their $VARIABLES
+    # (over the stock snort.conf port and server variables, e.g. $HTTP_PORTS)
+    SNORT_RULE_FILES: List[str] = field(default_factory=list)
+    SNORT_VARIABLES: Dict[str, str] = field(default_factory=lambda: {
+        'HOME_NET': 'any', 'EXTERNAL_NET': 'any'
+    })
+    
+    # TCP Stream Inspection (ATTACK_SIGNATURES matched across segment boundaries)
+    ENABLE_STREAM_INSPECTION: bool = True
+    STREAM_MAX_FLOWS: int = 50000
+    STREAM_BUFFER_BYTES: int = 65536  # out-of-order bytes per stream direction
+    STREAM_MEMORY_LIMIT: int = 32 * 1024 * 1024
+    STREAM_DEPTH: int = 1024 * 1024  # bytes inspected per stream direction
+    STREAM_IDLE_TIMEOUT: int = 120
+    
+    # SYN Flood Detection (per destination, fixed windows)
+    ENABLE_SYN_FLOOD_DETECTION: bool = True
+    SYN_FLOOD_WINDOW: int = 5
+    SYN_FLOOD_MIN_SYNS: int = 500
+    SYN_FLOOD_RATIO: float = 3.0  # SYNs per handshake-completing ACK
+    
+    # DNS Tunnelling / DGA Detection (per registered domain and per client, per window)
+    ENABLE_DNS_DETECTION: bool = True
+    DNS_WINDOW: int = 60
+    DNS_MAX_TRACKED: int = 50000
+    DNS_TUNNEL_BYTES: int = 2000  # subdomain bytes under one domain
+    DNS_TUNNEL_ENTROPY: float = 3.5  # bits/char over those subdomains
+    DNS_TUNNEL_DISTINCT: int = 50  # distinct subdomains (or long-label queries)
+    DNS_LONG_LABEL: int = 40
+    DNS_NXDOMAIN_MIN: int = 20
+    DNS_NXDOMAIN_RATIO: float = 0.5
+    DNS_DGA_ENTROPY: float = 3.0
+    
+    # Long-Horizon Scan Detection (decaying distinct-count sketches per source/target)
+    ENABLE_SCAN_DETECTION: bool = True
+    SCAN_HORIZON: int = 3600
+    SCAN_GENERATIONS: int = 6
+    SCAN_SKETCH_BITS: int = 512
+    SCAN_VERTICAL_PORTS: int = 100
+    SCAN_HORIZONTAL_HOSTS: int = 128
+    SCAN_HORIZONTAL_MAX_PORTS: int = 3
+    SCAN_DISTRIBUTED_PORTS: int = 100
+    SCAN_DISTRIBUTED_SOURCES: int = 5
+    SCAN_PROBE_TIMEOUT: float = 5.0
+    SCAN_MAX_PENDING: int = 100000
     
     # Anomaly Thresholds
     MAX_PACKETS_PER_SECOND: int = 1000
@@ -23,6 +91,25 @@ class IDSConfig:
     MAX_PORTS_SCANNED: int = 20
     SUSPICIOUS_PORT_THRESHOLD: int = 10
     
+    # Learned Baselines (the thresholds above apply until a baseline is warm)
+    BASELINE_WINDOW: float = 10.0
+    BASELINE_TIME_BUCKETS: int = 24
+    BASELINE_ALPHA: float = 0.05
+    BASELINE_MIN_SAMPLES: int = 30
+    ANOMALY_Z_THRESHOLD: float = 4.0
+    
+    # IP Reputation (files with one CIDR per line, optional label after it)
+    ALLOWLIST_FILES: List[str] = field(default_factory=list)
+    DENYLIST_FILES: List[str] = field(default_factory=list)
+    REPUTATION_CACHE_SIZE: int = 65536
+    LIST_RELOAD_INTERVAL: int = 30
+    
+    # Load Shedding (samples low-value traffic when capture lag exceeds the target)
+    ENABLE_LOAD_SHEDDING: bool = True
+    LOAD_SHED_TARGET_LAG: float = 0.5
+    LOAD_SHED_MIN_RATE: float = 0.05
+    SUSPICION_TTL: int = 300
+    
     # Alert Settings
     ENABLE_CONSOLE_ALERTS: bool = True
     ENABLE_FILE_ALERTS: bool = True
@@ -36,6 +123,30 @@ class IDSConfig:
     DASHBOARD_PORT: int = 5000
     DASHBOARD_UPDATE_INTERVAL: int = 5
     
+    # Time series for dashboard charts: intervals kept per resolution
+    ENABLE_TIMESERIES: bool = True
+    TIMESERIES_POINTS: Dict[str, int] = field(default_factory=lambda: {
+        '1s': 600,   # 10 minutes
+        '1m': 1440,  # 1 day
+        '1h': 720    # 30 days
+    })
+    
+    # Central collector: a sensor with COLLECTOR_HOST set pushes batched
+    # alert and statistics deltas to it, spooling them while it is down
+    COLLECTOR_HOST: str = None
+    COLLECTOR_PORT: int = 5140
+    COLLECTOR_TOKEN: str = None  # shared secret; the collector refuses sensors without it
+    COLLECTOR_INTERVAL: float = 5.0
+    COLLECTOR_SPOOL_DIR: str = "data/spool"
+    COLLECTOR_SPOOL_MAX_BYTES: int = 64 * 1024 * 1024
+    COLLECTOR_TOP_TALKERS: int = 20
+    SENSOR_NAME: str = None  # default: host name
+    
+    # Checkpoints (detector state is restored from CHECKPOINT_FILE on startup)
+    ENABLE_CHECKPOINTS: bool = True
+    CHECKPOINT_FILE: str = "data/checkpoint.bin"
+    CHECKPOINT_INTERVAL: int = 60
+    
     # Data Retention
     MAX_PACKETS_IN_MEMORY: int = 10000
     MAX_ALERTS_IN_MEMORY: int = 1000
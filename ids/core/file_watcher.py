@@ -0,0 +1,81 @@
+"""
+File Watcher Module
+Polls configuration files and triggers reloads when they change
+"""
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+class FileWatcher:
+    """Calls a reload function in the background whenever watched files change."""
+
+    def __init__(self, paths: List[str], on_change: Callable[[], None],
+                 interval: float = 30.0):
+        """
+        Initialize file watcher.
+
+        Args:
+            paths: Files to watch
+            on_change: Function called (from the watcher thread) after a change
+            interval: Polling interval in seconds
+        """
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.interval = interval
+        self.reload_count = 0
+        self.last_error: Optional[str] = None
+
+        self._mtimes = self._snapshot()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _snapshot(self) -> Dict[str, float]:
+        """Get the current modification time of every watched file."""
+        mtimes = {}
+        for path in self.paths:
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def check(self) -> bool:
+        """
+        Check watched files once and reload if any of them changed.
+
+        Returns:
+            True if a reload was triggered
+        """
+        mtimes = self._snapshot()
+        if mtimes == self._mtimes:
+            return False
+
+        self._mtimes = mtimes
+        try:
+            self.on_change()
+            self.reload_count += 1
+            self.last_error = None
+        except Exception as e:
+            # Keep serving the previous data if the new files are broken
+            self.last_error = str(e)
+            print(f"\n❌ Reload failed: {self.last_error}")
+        return True
+
+    def _run(self):
+        """Watcher thread loop."""
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """Start watching in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watcher thread."""
+        self._stop_event.set()
@@ -0,0 +1,276 @@
+"""
+Host Table Module
+Shared per-address state for all detectors
+"""
+import json
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .address import int_to_address, packet_address
+
+
+class HostRecord:
+    """
+    Everything tracked about one address, evicted as a unit.
+
+    Each detector keeps its per-host state in its own slot (None until the
+    detector first needs it), so one table entry replaces a string-keyed
+    table per detector. The string form of the address is only built when
+    an alert or a checkpoint needs it.
+    """
+
+    __slots__ = ('id', 'address', 'saved', 'first_seen', 'packets',
+                 'baseline', 'scan_source', 'scan_target', 'syn_target', 'dns_client')
+
+    def __init__(self, host_id: int, address: int, generation: int = 0):
+        self.id = host_id
+        self.address = address
+        # Last snapshot generation the record was saved in (see HostSnapshot)
+        self.saved = generation
+        # Anomaly detector: packets sent and first time seen as a source
+        self.first_seen: Optional[float] = None
+        self.packets = 0
+        self.baseline = None
+        # Scan detector: sketches as a source and as a target
+        self.scan_source = None
+        self.scan_target = None
+        # SYN flood detector: handshake window as a destination
+        self.syn_target = None
+        # DNS detector: response window as a client
+        self.dns_client = None
+
+    @property
+    def ip(self) -> str:
+        """String form of the address."""
+        return int_to_address(self.address)
+
+
+class HostSnapshot:
+    """
+    Copy-on-write checkpoint of a host table.
+
+    Starting one only bumps the table's generation. A writer thread then
+    walks the records by id and saves each one with the table's dumpers;
+    meanwhile the packet thread saves a record itself the first time it
+    looks it up (or evicts it), before any detector can change it. Either
+    way each record is saved once, as it was when the snapshot started,
+    and the packet thread never pays for more than the hosts it touches.
+    Records created after the start are not part of the snapshot.
+
+    Saved data is kept as JSON text rather than as objects: a snapshot of
+    100k hosts would otherwise create enough long-lived containers to set
+    off full garbage collections, which stall every thread.
+    """
+
+    def __init__(self, table: 'HostTable', generation: int):
+        self.table = table
+        self.generation = generation
+        # Ids above this were allocated after the start
+        self.end = len(table.records)
+        # Dumper name -> '"address":data' JSON members
+        self.hosts: Dict[str, List[str]] = {name: [] for name in table.dumpers}
+        self.copied = 0
+        self.done = False
+
+    def _save(self, record: HostRecord):
+        """Save one record with every dumper (the table lock is held)."""
+        record.saved = self.generation
+        key = None
+        for name, dump in self.table.dumpers.items():
+            data = dump(record)
+            if data is not None:
+                if key is None:
+                    key = f'"{record.ip}":'
+                self.hosts[name].append(key + json.dumps(data, separators=(',', ':')))
+
+    def copy(self, record: HostRecord):
+        """Save a record before the packet thread changes it."""
+        with self.table.lock:
+            if not self.done and record.saved < self.generation:
+                self._save(record)
+                self.copied += 1
+
+    def collect(self) -> Dict[str, List[str]]:
+        """
+        Save every record not saved yet and end the snapshot (writer thread).
+
+        Returns:
+            Dumper name -> JSON members ('"address":data') of its saved hosts
+        """
+        table = self.table
+        records = table.records
+        for host_id in range(self.end):
+            if host_id >= len(records):
+                break
+            record = records[host_id]
+            if record is None or record.saved >= self.generation:
+                continue
+            with table.lock:
+                if record.saved < self.generation:
+                    self._save(record)
+        with table.lock:
+            self.done = True
+            if table.snapshot is self:
+                table.snapshot = None
+        return self.hosts
+
+
+class HostTable:
+    """
+    Maps each address to a compact integer id indexing its HostRecord.
+
+    Addresses are looked up by their unified integer form (see address.py)
+    in one dict of address -> id; records live in a list indexed by id, and
+    the ids of evicted hosts are reused. The table is bounded with CLOCK
+    eviction: a lookup only sets the host's byte in a reference bitmap, and
+    when the table is full a hand sweeps the ids, clearing set bytes, and
+    drops the first host not used since its last pass, with the state of
+    every detector.
+
+    The table belongs to the packet thread. Detectors keep their own
+    counters of the records they fill in (evict_hooks tell them when one
+    is dropped), so statistics never walk the table from another thread.
+    Checkpoints read it through a copy-on-write HostSnapshot, with the
+    dumpers detectors register for their slots.
+    """
+
+    def __init__(self, max_hosts: int = 200000):
+        """
+        Initialize host table.
+
+        Args:
+            max_hosts: Maximum number of tracked hosts (CLOCK eviction)
+        """
+        self.max_hosts = max_hosts
+        # address -> id
+        self.index: Dict[int, int] = {}
+        # id -> record (None for free ids)
+        self.records: List[Optional[HostRecord]] = []
+        # id -> 1 if used since the clock hand last passed it
+        self.referenced = bytearray()
+        self._free_ids: List[int] = []
+        self._hand = 0
+        self.evicted = 0
+        # Called with each record before it is evicted
+        self.evict_hooks: List[Callable[[HostRecord], None]] = []
+        # Name -> function returning a record's plain-data state (None: nothing to save)
+        self.dumpers: Dict[str, Callable[[HostRecord], object]] = {}
+        self.generation = 0
+        self.snapshot: Optional[HostSnapshot] = None
+        self.lock = threading.Lock()
+
+    def get(self, address: int) -> HostRecord:
+        """
+        Get the record of an address, creating it if needed.
+
+        Args:
+            address: Unified integer address
+
+        Returns:
+            The host's record (marked as recently used)
+        """
+        host_id = self.index.get(address)
+        if host_id is not None:
+            self.referenced[host_id] = 1
+            record = self.records[host_id]
+            snapshot = self.snapshot
+            if snapshot is not None and record.saved < snapshot.generation:
+                snapshot.copy(record)
+            return record
+
+        if len(self.index) >= self.max_hosts:
+            self._evict()
+
+        if self._free_ids:
+            host_id = self._free_ids.pop()
+        else:
+            host_id = len(self.records)
+            self.records.append(None)
+            self.referenced.append(0)
+
+        record = HostRecord(host_id, address, self.generation)
+        self.index[address] = host_id
+        self.records[host_id] = record
+        self.referenced[host_id] = 1
+        return record
+
+    def find(self, address: Optional[int]) -> Optional[HostRecord]:
+        """Get the record of an address without creating or touching it."""
+        host_id = self.index.get(address)
+        if host_id is None:
+            return None
+        record = self.records[host_id]
+        snapshot = self.snapshot
+        if snapshot is not None and record.saved < snapshot.generation:
+            snapshot.copy(record)
+        return record
+
+    def source(self, packet_info: dict) -> Optional[HostRecord]:
+        """Get (or create) the record of a packet's source, or None without one."""
+        address = packet_address(packet_info, 'src_addr')
+        if address is None:
+            return None
+        return self.get(address)
+
+    def destination(self, packet_info: dict) -> Optional[HostRecord]:
+        """Get (or create) the record of a packet's destination, or None without one."""
+        address = packet_address(packet_info, 'dst_addr')
+        if address is None:
+            return None
+        return self.get(address)
+
+    def _evict(self):
+        """Drop the first host the clock hand finds unused since its last pass."""
+        records = self.records
+        referenced = self.referenced
+        hand = self._hand
+        while True:
+            if hand >= len(records):
+                hand = 0
+            if records[hand] is not None:
+                if not referenced[hand]:
+                    break
+                referenced[hand] = 0
+            hand += 1
+        self._hand = hand + 1
+
+        record = records[hand]
+        snapshot = self.snapshot
+        if snapshot is not None and record.saved < snapshot.generation:
+            snapshot.copy(record)
+        for hook in self.evict_hooks:
+            hook(record)
+        del self.index[record.address]
+        records[hand] = None
+        self._free_ids.append(hand)
+        self.evicted += 1
+
+    def begin_snapshot(self) -> HostSnapshot:
+        """Start a copy-on-write snapshot (O(1); finish it with collect())."""
+        if self.snapshot is not None:
+            raise RuntimeError("A host table snapshot is already in progress")
+        self.generation += 1
+        self.snapshot = HostSnapshot(self, self.generation)
+        return self.snapshot
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[HostRecord]:
+        return (record for record in self.records if record is not None)
+
+    def clear(self):
+        """Forget all hosts."""
+        self.index.clear()
+        self.records.clear()
+        self.referenced.clear()
+        self._free_ids.clear()
+        self._hand = 0
+
+    def get_statistics(self) -> Dict:
+        """Get host table statistics."""
+        return {
+            'hosts': len(self.index),
+            'max_hosts': self.max_hosts,
+            'evicted': self.evicted
+        }
@@ -0,0 +1,166 @@
+"""
+Load Shedding Module
+Samples low-value traffic when the detection pipeline falls behind
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+# Packets between two adjustments of the sampling rate
+ADJUST_EVERY = 256
+
+
+class LoadShedder:
+    """
+    Adaptive sampler for low-value packets.
+
+    The capture lag (time between a packet being captured and reaching the
+    engine) grows as soon as processing cannot keep up with the kernel.
+    The sampling rate for low-value packets is cut in half whenever the
+    smoothed lag exceeds the target and recovers additively once it drops,
+    while SYNs, packets to rule-matched ports and packets from or to
+    sources already under suspicion are always processed.
+    """
+
+    def __init__(self, target_lag: float = 0.5, min_rate: float = 0.05,
+                 priority_ports: Iterable[int] = (), suspicion_ttl: float = 300.0,
+                 max_suspects: int = 100000):
+        """
+        Initialize load shedder.
+
+        Args:
+            target_lag: Capture lag (seconds) above which traffic is shed
+            min_rate: Lowest sampling rate for low-value traffic
+            priority_ports: Destination ports that are never shed
+            suspicion_ttl: Seconds a source stays under suspicion after an alert
+            max_suspects: Maximum number of tracked suspicious sources
+        """
+        self.target_lag = target_lag
+        self.min_rate = min_rate
+        self.priority_ports = frozenset(priority_ports)
+        self.suspicion_ttl = suspicion_ttl
+        self.max_suspects = max_suspects
+
+        self.rate = 1.0
+        self.lag = 0.0
+        self.suspects: 'OrderedDict[str, float]' = OrderedDict()
+
+        self.seen = 0
+        self.admitted = 0
+        self.priority = 0
+        self.shed = 0
+
+        self._credit = 0.0
+        self._since_adjust = 0
+        self._window_seen = 0
+        self._window_admitted = 0
+        self.effective_rate = 1.0
+
+    def mark_suspicious(self, ip: Optional[str], now: Optional[float] = None):
+        """Always process traffic from or to an address for a while."""
+        if not ip:
+            return
+        self.suspects[ip] = (now or time.time()) + self.suspicion_ttl
+        self.suspects.move_to_end(ip)
+        if len(self.suspects) > self.max_suspects:
+            self.suspects.popitem(last=False)
+
+    def _is_suspect(self, ip: Optional[str], now: float) -> bool:
+        """Check whether an address is under suspicion."""
+        expires = self.suspects.get(ip)
+        if expires is None:
+            return False
+        if expires < now:
+            del self.suspects[ip]
+            return False
+        return True
+
+    @staticmethod
+    def _is_syn(flags) -> bool:
+        """Check whether TCP flags include SYN."""
+        if isinstance(flags, int):
+            return bool(flags & 0x02)
+        return bool(flags) and 'S' in flags
+
+    def is_priority(self, packet_info: dict, now: float) -> bool:
+        """Check whether a packet must always be processed."""
+        if self._is_syn(packet_info.get('flags')):
+            return True
+        if packet_info.get('dst_port') in self.priority_ports:
+            return True
+        if self.suspects and (self._is_suspect(packet_info.get('src_ip'), now)
+                              or self._is_suspect(packet_info.get('dst_ip'), now)):
+            return True
+        return False
+
+    def admit(self, packet_info: dict) -> bool:
+        """
+        Decide whether a packet should go through detection.
+
+        Returns:
+            False if the packet is shed
+        """
+        self.seen += 1
+        self._window_seen += 1
+
+        capture_time = packet_info.get('capture_time')
+        now = time.time()
+        if capture_time:
+            self.lag += 0.05 * ((now - capture_time) - self.lag)
+
+        self._since_adjust += 1
+        if self._since_adjust >= ADJUST_EVERY:
+            self._adjust()
+
+        if self.rate < 1.0 and not self.is_priority(packet_info, now):
+            # Deterministic sampling: admit exactly `rate` of low-value packets
+            self._credit += self.rate
+            if self._credit < 1.0:
+                self.shed += 1
+                return False
+            self._credit -= 1.0
+        elif self.rate < 1.0:
+            self.priority += 1
+
+        self.admitted += 1
+        self._window_admitted += 1
+        return True
+
+    def _adjust(self):
+        """Update the sampling rate from the smoothed capture lag."""
+        self.effective_rate = self._window_admitted / self._window_seen if self._window_seen else 1.0
+        self._since_adjust = 0
+        self._window_seen = 0
+        self._window_admitted = 0
+
+        if self.lag > self.target_lag:
+            self.rate = max(self.min_rate, self.rate / 2)
+        elif self.lag < self.target_lag / 2 and self.rate < 1.0:
+            self.rate = min(1.0, self.rate + 0.05)
+            if self.rate >= 1.0:
+                self._credit = 0.0
+
+    @property
+    def shedding(self) -> bool:
+        return self.rate < 1.0
+
+    def get_statistics(self) -> Dict:
+        """
+        Get load shedding statistics.
+
+        effective_sampling_rate is the share of all packets processed over the
+        last adjustment window; divide processed counts by it to estimate
+        totals.
+        """
+        return {
+            'shedding': self.shedding,
+            'low_value_sampling_rate': self.rate,
+            'effective_sampling_rate': self.effective_rate,
+            'overall_sampling_rate': self.admitted / self.seen if self.seen else 1.0,
+            'capture_lag': self.lag,
+            'packets_seen': self.seen,
+            'packets_admitted': self.admitted,
+            'packets_shed': self.shed,
+            'priority_packets': self.priority,
+            'suspects': len(self.suspects)
+        }
@@ -0,0 +1,325 @@
+"""
+Metrics Module
+Per-stage counters, latency histograms and an on-demand sampling profiler
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Sub-buckets per power of two (2**5 = 32 -> ~3% relative error)
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# Largest recordable value: 2**40 ns (~18 minutes)
+MAX_EXPONENT = 40 - SUB_BUCKET_BITS - 1
+
+# Bucket bounds (seconds) used for the Prometheus export
+EXPORT_BOUNDS = (1e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 1.0)
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of durations in nanoseconds.
+
+    Each power of two is split into SUB_BUCKETS linear buckets, so recording
+    is a bit_length, a shift and a list increment, and quantiles are exact
+    to within a few percent over the whole range.
+    """
+
+    __slots__ = ('counts', 'total', 'sum_ns', 'max_ns')
+
+    def __init__(self):
+        self.counts = [0] * ((MAX_EXPONENT + 2) * SUB_BUCKETS)
+        self.total = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def record(self, value_ns: int):
+        """Record one duration."""
+        if value_ns < 0:
+            value_ns = 0
+        exponent = value_ns.bit_length() - SUB_BUCKET_BITS - 1
+        if exponent <= 0:
+            index = value_ns
+        else:
+            if exponent > MAX_EXPONENT:
+                exponent = MAX_EXPONENT
+                value_ns = (2 * SUB_BUCKETS << exponent) - 1
+            index = (exponent << SUB_BUCKET_BITS) + (value_ns >> exponent)
+
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ns += value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    @staticmethod
+    def bucket_high(index: int) -> int:
+        """Get the largest value (ns) recorded into a bucket index."""
+        if index < 2 * SUB_BUCKETS:
+            return index
+        exponent = (index >> SUB_BUCKET_BITS) - 1
+        mantissa = index - (exponent << SUB_BUCKET_BITS)
+        return ((mantissa + 1) << exponent) - 1
+
+    def quantile(self, q: float) -> int:
+        """Get the q-quantile (0..1) in nanoseconds."""
+        if self.total == 0:
+            return 0
+        target = max(1, int(q * self.total + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                seen += count
+                if seen >= target:
+                    return min(self.bucket_high(index), self.max_ns)
+        return self.max_ns
+
+    def cumulative(self, bounds_ns: List[int]) -> List[int]:
+        """Get cumulative counts at or below each bound."""
+        results = []
+        seen = 0
+        index = 0
+        size = len(self.counts)
+        for bound in bounds_ns:
+            while index < size and self.bucket_high(index) <= bound:
+                seen += self.counts[index]
+                index += 1
+            results.append(seen)
+        return results
+
+    def copy(self) -> 'LatencyHistogram':
+        """Get a copy to read while this histogram keeps recording."""
+        histogram = LatencyHistogram()
+        histogram.counts = list(self.counts)
+        histogram.total = sum(histogram.counts)
+        histogram.sum_ns = self.sum_ns
+        histogram.max_ns = self.max_ns
+        return histogram
+
+    def summary(self) -> Dict:
+        """Get count, mean and common quantiles in microseconds."""
+        return {
+            'count': self.total,
+            'mean_us': (self.sum_ns / self.total / 1000) if self.total else 0.0,
+            'p50_us': self.quantile(0.50) / 1000,
+            'p99_us': self.quantile(0.99) / 1000,
+            'p999_us': self.quantile(0.999) / 1000,
+            'max_us': self.max_ns / 1000
+        }
+
+
+class SamplingProfiler:
+    """Samples a thread's Python stack periodically and counts hot call paths."""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 12):
+        """
+        Initialize sampling profiler.
+
+        Args:
+            interval: Seconds between samples
+            max_depth: Maximum stack frames kept per sample
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self.sample_count = 0
+        self.target_thread = None
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self, thread_id: Optional[int] = None):
+        """
+        Start sampling.
+
+        Args:
+            thread_id: Thread to sample (defaults to the main thread)
+        """
+        if self.running:
+            return
+
+        self.target_thread = thread_id or threading.main_thread().ident
+        self.samples.clear()
+        self.sample_count = 0
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling (collected samples are kept)."""
+        self._stop_event.set()
+
+    def _run(self):
+        """Sampler thread loop."""
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+
+            self.samples[';'.join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def report(self, limit: int = 20) -> Dict:
+        """Get the most frequently sampled stacks."""
+        return {
+            'running': self.running,
+            'samples': self.sample_count,
+            'interval': self.interval,
+            'top_stacks': [
+                {'stack': stack, 'samples': count,
+                 'percent': 100.0 * count / self.sample_count}
+                for stack, count in self.samples.most_common(limit)
+            ]
+        }
+
+
+class Metrics:
+    """
+    Registry of counters, gauges and per-stage latency histograms.
+
+    Counters and histograms are updated from the packet thread without
+    locks; readers on other threads (the dashboard, /metrics) work on
+    copies taken with snapshot(), never on the live dicts.
+    """
+
+    def __init__(self, prefix: str = 'ids'):
+        """
+        Initialize metrics registry.
+
+        Args:
+            prefix: Prefix for exported metric names
+        """
+        self.prefix = prefix
+        self.start_time = time.time()
+
+        # name -> {labels tuple: value}
+        self.counters: Dict[str, Dict[Tuple, float]] = {}
+        # name -> (kind, read function)
+        self.callbacks: Dict[str, Tuple[str, Callable[[], object]]] = {}
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.help: Dict[str, str] = {}
+
+        self.profiler = SamplingProfiler()
+
+    def inc(self, name: str, value: float = 1, labels: Tuple = ()):
+        """Increment a counter."""
+        series = self.counters.get(name)
+        if series is None:
+            series = self.counters[name] = {}
+        series[labels] = series.get(labels, 0) + value
+
+    def observe(self, stage: str, duration_ns: int):
+        """Record the duration of one pass through a pipeline stage."""
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.record(duration_ns)
+
+    def register_callback(self, name: str, read: Callable[[], object],
+                          help_text: str = '', kind: str = 'gauge'):
+        """
+        Register a metric whose value is read at export time.
+
+        Args:
+            name: Metric name (without prefix)
+            read: Returns a number, or a {labels tuple: number} dict
+            help_text: Description
+            kind: Prometheus type ('gauge' or 'counter')
+        """
+        self.callbacks[name] = (kind, read)
+        if help_text:
+            self.help[name] = help_text
+
+    def describe(self, name: str, help_text: str):
+        """Set the description of a counter."""
+        self.help[name] = help_text
+
+    def counter_total(self, name: str) -> float:
+        """Get the sum of a counter over all labels."""
+        return sum(dict(self.counters.get(name, {})).values())
+
+    def snapshot(self) -> Tuple[Dict[str, Dict[Tuple, float]], Dict[str, LatencyHistogram]]:
+        """
+        Copy counters and stage histograms for reading from another thread.
+
+        Returns:
+            (counters, stages) copies
+        """
+        counters = {name: dict(series) for name, series in dict(self.counters).items()}
+        stages = {stage: h.copy() for stage, h in dict(self.stages).items()}
+        return counters, stages
+
+    def stage_summary(self) -> Dict[str, Dict]:
+        """Get latency summaries for every stage."""
+        return {stage: h.summary() for stage, h in dict(self.stages).items()}
+
+    @staticmethod
+    def _format_labels(labels: Tuple) -> str:
+        """Format a labels tuple as {k="v",...}."""
+        if not labels:
+            return ''
+        parts = []
+        for key, value in labels:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+            parts.append(f'{key}="{value}"')
+        return '{' + ','.join(parts) + '}'
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        counters, stages = self.snapshot()
+
+        for name, series in sorted(counters.items()):
+            full = f"{self.prefix}_{name}"
+            if name in self.help:
+                lines.append(f"# HELP {full} {self.help[name]}")
+            lines.append(f"# TYPE {full} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{full}{self._format_labels(labels)} {value}")
+
+        for name, (kind, read) in sorted(dict(self.callbacks).items()):
+            full = f"{self.prefix}_{name}"
+            try:
+                value = read()
+            except Exception:
+                continue
+            if name in self.help:
+                lines.append(f"# HELP {full} {self.help[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+            if isinstance(value, dict):
+                for labels, v in sorted(value.items()):
+                    lines.append(f"{full}{self._format_labels(labels)} {v}")
+            else:
+                lines.append(f"{full} {value}")
+
+        if stages:
+            full = f"{self.prefix}_stage_latency_seconds"
+            bounds_ns = [int(b * 1e9) for b in EXPORT_BOUNDS]
+            lines.append(f"# HELP {full} Time spent per packet in each pipeline stage")
+            lines.append(f"# TYPE {full} histogram")
+            for stage, histogram in sorted(stages.items()):
+                for bound, count in zip(EXPORT_BOUNDS, histogram.cumulative(bounds_ns)):
+                    lines.append(f'{full}_bucket{{stage="{stage}",le="{bound:g}"}} {count}')
+                lines.append(f'{full}_bucket{{stage="{stage}",le="+Inf"}} {histogram.total}')
+                lines.append(f'{full}_sum{{stage="{stage}"}} {histogram.sum_ns / 1e9}')
+                lines.append(f'{full}_count{{stage="{stage}"}} {histogram.total}')
+
+        full = f"{self.prefix}_uptime_seconds"
+        lines.append(f"# TYPE {full} gauge")
+        lines.append(f"{full} {time.time() - self.start_time:.3f}")
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,313 @@
+"""
+IP Reputation Module
+CIDR allowlist/denylist lookups for suppression and severity escalation
+"""
+import socket
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .address import V4_MASK, is_ipv4
+from .file_watcher import FileWatcher
+
+ADDRESS_BITS = {4: 32, 6: 128}
+
+SEVERITY_ESCALATION = {'LOW': 'MEDIUM', 'MEDIUM': 'HIGH', 'HIGH': 'HIGH'}
+
+# Cache marker for addresses that matched no list
+_NO_MATCH = object()
+
+
+def parse_address(ip: str) -> Tuple[int, int]:
+    """
+    Convert an IPv4/IPv6 address string to (version, integer).
+
+    Raises:
+        ValueError: If the address is not valid
+    """
+    try:
+        if ':' in ip:
+            return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except (OSError, TypeError):
+        raise ValueError(f"Invalid IP address: {ip!r}")
+
+
+def format_prefix(version: int, network: int, prefix_len: int) -> str:
+    """Convert an integer network back to CIDR notation."""
+    if version == 4:
+        address = socket.inet_ntop(socket.AF_INET, network.to_bytes(4, 'big'))
+    else:
+        address = socket.inet_ntop(socket.AF_INET6, network.to_bytes(16, 'big'))
+    return f"{address}/{prefix_len}"
+
+
+def escalate_severity(severity: str) -> str:
+    """Raise a severity level by one step (LOW -> MEDIUM -> HIGH)."""
+    return SEVERITY_ESCALATION.get(severity, severity)
+
+
+class PrefixSet:
+    """
+    Longest-prefix-match index over IPv4 and IPv6 CIDRs.
+
+    Networks are stored in one hash table per prefix length, so a lookup
+    is at most one masked dictionary probe per distinct prefix length
+    (bounded by the address length) and memory stays at one dict entry
+    per prefix, even for hundreds of thousands of prefixes.
+    """
+
+    def __init__(self):
+        """Initialize an empty prefix set."""
+        # version -> {prefix_len: {network: label}}
+        self._tables: Dict[int, Dict[int, Dict[int, Optional[str]]]] = {4: {}, 6: {}}
+        # version -> [(prefix_len, mask, table)], longest prefix first
+        self._lookup_order: Dict[int, List[Tuple[int, int, dict]]] = {4: [], 6: []}
+        self.size = 0
+
+    def add(self, cidr: str, label: Optional[str] = None):
+        """
+        Add a CIDR (or bare address) to the set.
+
+        Args:
+            cidr: Network such as "10.0.0.0/8" or "2001:db8::/32"
+            label: Optional label returned on match
+
+        Raises:
+            ValueError: If the CIDR is not valid
+        """
+        address, _, length = cidr.partition('/')
+        version, value = parse_address(address)
+        bits = ADDRESS_BITS[version]
+
+        try:
+            prefix_len = int(length) if length else bits
+        except ValueError:
+            raise ValueError(f"Invalid prefix length: {cidr!r}")
+        if not 0 <= prefix_len <= bits:
+            raise ValueError(f"Invalid prefix length: {cidr!r}")
+
+        tables = self._tables[version]
+        if prefix_len not in tables:
+            tables[prefix_len] = {}
+            self._lookup_order[version] = [
+                (length, self._mask(version, length), tables[length])
+                for length in sorted(tables, reverse=True)
+            ]
+
+        table = tables[prefix_len]
+        network = value & self._mask(version, prefix_len)
+        if network not in table:
+            self.size += 1
+        table[network] = label
+
+    @staticmethod
+    def _mask(version: int, prefix_len: int) -> int:
+        """Get the network mask for a prefix length."""
+        bits = ADDRESS_BITS[version]
+        return ((1 << prefix_len) - 1) << (bits - prefix_len)
+
+    def lookup(self, version: int, address: int) -> Optional[Tuple[int, int, Optional[str]]]:
+        """
+        Find the longest prefix containing an address.
+
+        Args:
+            version: IP version (4 or 6)
+            address: Integer address
+
+        Returns:
+            (prefix_len, network, label) or None
+        """
+        for prefix_len, mask, table in self._lookup_order[version]:
+            network = address & mask
+            if network in table:
+                return prefix_len, network, table[network]
+        return None
+
+    def lookup_address(self, address: int) -> Optional[Tuple[int, int, Optional[str]]]:
+        """Find the longest prefix containing a unified integer address (see address.py)."""
+        if is_ipv4(address):
+            return self.lookup(4, address & V4_MASK)
+        return self.lookup(6, address)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def load_prefix_files(paths: List[str]) -> Tuple[PrefixSet, int, List[str]]:
+    """
+    Load prefix list files into a PrefixSet.
+
+    Each line holds a CIDR optionally followed by a label; blank lines and
+    lines starting with '#' or ';' are ignored. Files that do not exist
+    are skipped.
+
+    Args:
+        paths: Prefix list files
+
+    Returns:
+        (prefix set, number of invalid lines skipped, missing files)
+    """
+    prefixes = PrefixSet()
+    invalid = 0
+    missing = []
+
+    for path in paths:
+        try:
+            f = open(path)
+        except FileNotFoundError:
+            missing.append(path)
+            continue
+        with f:
+            for line in f:
+                line = line.strip()
+                if not line or line[0] in '#;':
+                    continue
+
+                cidr, _, label = line.partition(' ')
+                try:
+                    prefixes.add(cidr, label.strip() or None)
+                except ValueError:
+                    invalid += 1
+
+    return prefixes, invalid, missing
+
+
+class IPReputation:
+    """Classifies source addresses against allowlist and denylist prefixes."""
+
+    def __init__(self, allowlist_files: List[str] = None,
+                 denylist_files: List[str] = None,
+                 cache_size: int = 65536, reload_interval: float = 30.0):
+        """
+        Initialize IP reputation lookups.
+
+        Args:
+            allowlist_files: Prefix files whose sources are exempt from detection
+            denylist_files: Prefix files whose sources get escalated alerts
+            cache_size: Maximum number of cached per-IP results (LRU)
+            reload_interval: Seconds between checks for changed files
+        """
+        self.allowlist_files = list(allowlist_files or [])
+        self.denylist_files = list(denylist_files or [])
+        self.cache_size = cache_size
+
+        self._lists = {'allow': PrefixSet(), 'deny': PrefixSet()}
+        self._cache = OrderedDict()
+        self._reload_lock = threading.Lock()
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.invalid_lines = 0
+        self.missing_files: List[str] = []
+
+        self.watcher = FileWatcher(
+            self.allowlist_files + self.denylist_files,
+            self.load,
+            interval=reload_interval
+        )
+
+        if self.enabled:
+            self.load()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any list files are configured."""
+        return bool(self.allowlist_files or self.denylist_files)
+
+    def load(self):
+        """
+        (Re)load all list files.
+
+        The new indexes are built off to the side and swapped in with a single
+        assignment, so lookups on the packet path never wait for a reload.
+        Missing files are skipped with a warning and picked up by the watcher
+        once they appear.
+        """
+        with self._reload_lock:
+            allow, allow_invalid, allow_missing = load_prefix_files(self.allowlist_files)
+            deny, deny_invalid, deny_missing = load_prefix_files(self.denylist_files)
+
+            missing = allow_missing + deny_missing
+            for path in missing:
+                if path not in self.missing_files:
+                    print(f"\n⚠️  Reputation list not found, skipping: {path}")
+            self.missing_files = missing
+            self.invalid_lines = allow_invalid + deny_invalid
+            self._lists = {'allow': allow, 'deny': deny}
+            self._cache = OrderedDict()
+
+    def lookup(self, ip: str) -> Optional[Dict]:
+        """
+        Look up the reputation of an address.
+
+        The allowlist takes precedence over the denylist.
+
+        Args:
+            ip: IP address string
+
+        Returns:
+            Dict with 'list', 'prefix' and 'label', or None if unlisted
+        """
+        cache = self._cache
+        result = cache.get(ip)
+
+        if result is not None:
+            self.cache_hits += 1
+            cache.move_to_end(ip)
+            return None if result is _NO_MATCH else result
+
+        self.cache_misses += 1
+        result = self._classify(ip)
+
+        cache[ip] = _NO_MATCH if result is None else result
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+        return result
+
+    def _classify(self, ip: str) -> Optional[Dict]:
+        """Match an address against the current lists."""
+        try:
+            version, address = parse_address(ip)
+        except ValueError:
+            return None
+
+        lists = self._lists
+        for name in ('allow', 'deny'):
+            match = lists[name].lookup(version, address)
+            if match:
+                prefix_len, network, label = match
+                return {
+                    'list': name,
+                    'prefix': format_prefix(version, network, prefix_len),
+                    'label': label
+                }
+        return None
+
+    def is_allowed(self, ip: str) -> bool:
+        """Check whether an address is allowlisted."""
+        result = self.lookup(ip)
+        return bool(result) and result['list'] == 'allow'
+
+    def start_watching(self):
+        """Start hot-reloading list files in the background."""
+        if self.enabled:
+            self.watcher.start()
+
+    def stop_watching(self):
+        """Stop hot-reloading list files."""
+        self.watcher.stop()
+
+    def get_statistics(self) -> Dict:
+        """Get reputation lookup statistics."""
+        return {
+            'allowlist_prefixes': len(self._lists['allow']),
+            'denylist_prefixes': len(self._lists['deny']),
+            'invalid_lines': self.invalid_lines,
+            'missing_files': len(self.missing_files),
+            'cache_size': len(self._cache),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'reloads': self.watcher.reload_count
+        }
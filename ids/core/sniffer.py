@@ -2,29 +2,74 @@
 Packet Sniffer Module
 Captures network packets for analysis
 """
+import socket
+import struct
 import time
 from datetime import datetime
 from typing import Callable, Optional
-from scapy.all import sniff, IP, TCP, UDP, ICMP
-from scapy.packet import Packet
+# Only the layers dissected here (plus link layers) are loaded: scapy.all
+# imports every protocol Scapy knows and dominates startup time
+from scapy.config import conf
+from scapy.layers.inet import IP, TCP, UDP, ICMP, IPerror, TCPerror, UDPerror
+from scapy.layers.inet6 import (IPv6, IPerror6, IPv6ExtHdrDestOpt, IPv6ExtHdrFragment,
+                                IPv6ExtHdrHopByHop, IPv6ExtHdrRouting, _ICMPv6)
+from scapy.layers.l2 import Ether  # noqa: F401 (registers link layer types)
+from scapy.packet import Packet, Padding
+from scapy.sendrecv import sniff
 import threading
 
+from .address import V4_MAPPED
+
+# Linux getsockopt(SOL_PACKET, PACKET_STATISTICS): struct tpacket_stats
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+
+# Seconds between reads of the kernel drop counters (by the capture thread)
+DROP_POLL_INTERVAL = 1.0
+
+# Linux setsockopt(SOL_PACKET, PACKET_FANOUT): spread one interface's packets
+# over the sockets of a group, by flow hash, round robin, CPU or RX queue
+PACKET_FANOUT = 18
+PACKET_FANOUT_FLAG_DEFRAG = 0x8000
+FANOUT_MODES = {'hash': 0, 'lb': 1, 'cpu': 2, 'qm': 5}
+
+# IPv6 extension headers walked to reach the transport header
+IPV6_EXTENSION_HEADERS = (IPv6ExtHdrHopByHop, IPv6ExtHdrRouting,
+                          IPv6ExtHdrFragment, IPv6ExtHdrDestOpt)
+
 class PacketSniffer:
     """Captures and processes network packets."""
     
-    def __init__(self, interface: str = None, callback: Optional[Callable] = None):
+    def __init__(self, interface: str = None, callback: Optional[Callable] = None,
+                 metrics=None, fanout_group: Optional[int] = None, fanout_mode: str = 'hash',
+                 offline: Optional[str] = None):
         """
         Initialize packet sniffer.
         
         Args:
             interface: Network interface to sniff on
             callback: Function to call for each packet
+            metrics: Optional Metrics registry for dissection timing
+            fanout_group: AF_PACKET fanout group to join (Linux), shared by the
+                sniffers that split one interface's traffic
+            fanout_mode: How the group splits packets: 'hash' (per flow),
+                'lb' (round robin), 'cpu' or 'qm' (per NIC RX queue)
+            offline: Capture file (pcap/pcapng) to read instead of an interface
         """
+        if fanout_mode not in FANOUT_MODES:
+            raise ValueError(f"Unknown fanout mode: {fanout_mode!r}")
         self.interface = interface
         self.callback = callback
+        self.metrics = metrics
+        self.fanout_group = fanout_group
+        self.fanout_mode = fanout_mode
+        self.offline = offline
         self.running = False
         self.packet_count = 0
+        self.kernel_drops = 0
         self.start_time = None
+        self._socket = None
+        self._last_drop_poll = 0.0
         
     def process_packet(self, packet: Packet):
         """
@@ -33,48 +78,95 @@ class PacketSniffer:
         Args:
             packet: Scapy packet object
         """
+        started = time.perf_counter_ns()
         self.packet_count += 1
         
         # Extract packet information
         packet_info = {
             'timestamp': datetime.now().isoformat(),
+            'capture_time': float(packet.time),
             'number': self.packet_count,
             'length': len(packet),
+            'interface': self.interface,
         }
         
-        # IP layer
-        if IP in packet:
+        # IP layer (IPv4 or IPv6), then the transport header it carries
+        layer = None
+        ip = packet.getlayer(IP)
+        if ip is not None:
             packet_info.update({
-                'src_ip': packet[IP].src,
-                'dst_ip': packet[IP].dst,
-                'protocol': packet[IP].proto,
-                'ttl': packet[IP].ttl,
+                'ip_version': 4,
+                'src_ip': ip.src,
+                'dst_ip': ip.dst,
+                'src_addr': V4_MAPPED | int.from_bytes(socket.inet_aton(ip.src), 'big'),
+                'dst_addr': V4_MAPPED | int.from_bytes(socket.inet_aton(ip.dst), 'big'),
+                'protocol': ip.proto,
+                'ttl': ip.ttl,
             })
-            
+            # Later fragments carry no transport header
+            if not ip.frag:
+                layer = ip.payload
+        else:
+            ip = packet.getlayer(IPv6)
+            if ip is not None:
+                packet_info.update({
+                    'ip_version': 6,
+                    'src_ip': ip.src,
+                    'dst_ip': ip.dst,
+                    'src_addr': int.from_bytes(socket.inet_pton(socket.AF_INET6, ip.src), 'big'),
+                    'dst_addr': int.from_bytes(socket.inet_pton(socket.AF_INET6, ip.dst), 'big'),
+                    'ttl': ip.hlim,
+                })
+                layer = self._walk_ipv6(ip, packet_info)
+        
+        if layer is not None:
             # TCP layer
-            if TCP in packet:
+            if isinstance(layer, TCP):
                 packet_info.update({
                     'transport': 'TCP',
-                    'src_port': packet[TCP].sport,
-                    'dst_port': packet[TCP].dport,
-                    'flags': str(packet[TCP].flags),
+                    'src_port': layer.sport,
+                    'dst_port': layer.dport,
+                    'flags': int(layer.flags),
+                    'seq': layer.seq,
+                    'ack': layer.ack,
                 })
             
             # UDP layer
-            elif UDP in packet:
+            elif isinstance(layer, UDP):
                 packet_info.update({
                     'transport': 'UDP',
-                    'src_port': packet[UDP].sport,
-                    'dst_port': packet[UDP].dport,
+                    'src_port': layer.sport,
+                    'dst_port': layer.dport,
                 })
             
-            # ICMP layer
-            elif ICMP in packet:
+            # ICMP / ICMPv6 layer
+            elif isinstance(layer, (ICMP, _ICMPv6)):
                 packet_info.update({
                     'transport': 'ICMP',
-                    'type': packet[ICMP].type,
-                    'code': packet[ICMP].code,
+                    'type': layer.type,
+                    'code': layer.code,
                 })
+                # Errors quote the header of the packet they refer to
+                quoted = layer.payload
+                if isinstance(quoted, (IPerror, IPerror6)) and isinstance(
+                        quoted.payload, (TCPerror, UDPerror)):
+                    packet_info.update({
+                        'quoted_dst_ip': quoted.dst,
+                        'quoted_src_port': quoted.payload.sport,
+                        'quoted_dst_port': quoted.payload.dport,
+                    })
+            
+            # Application payload: the bytes Scapy dissected the layer from
+            # (a reference, not a re-serialization, even for DNS). Bytes past
+            # the IP length (Ethernet padding of short frames, e.g. bare ACKs)
+            # are dissected as a Padding layer and are not payload.
+            if 'src_port' in packet_info and not isinstance(layer.payload, Padding):
+                payload = getattr(layer.payload, 'original', None)
+                if payload:
+                    packet_info['payload'] = payload
+        
+        if self.metrics:
+            self.metrics.observe('dissect', time.perf_counter_ns() - started)
         
         # Call callback if provided
         if self.callback:
@@ -82,6 +174,43 @@ class PacketSniffer:
         
         return packet_info
     
+    @staticmethod
+    def _walk_ipv6(ip: Packet, packet_info: dict) -> Optional[Packet]:
+        """
+        Skip the extension headers of an IPv6 packet.
+        
+        Sets 'protocol' to the upper-layer protocol number and
+        'extension_headers' to the number of headers skipped.
+        
+        Returns:
+            The upper-layer header, or None for a non-first fragment
+        """
+        layer = ip.payload
+        next_header = ip.nh
+        skipped = 0
+        
+        while isinstance(layer, IPV6_EXTENSION_HEADERS):
+            skipped += 1
+            next_header = layer.nh
+            if isinstance(layer, IPv6ExtHdrFragment) and layer.offset:
+                # Later fragments carry no transport header
+                layer = None
+                break
+            layer = layer.payload
+        
+        packet_info['protocol'] = next_header
+        packet_info['extension_headers'] = skipped
+        return layer
+    
+    def _on_packet(self, packet: Packet):
+        """Sniff callback (returns nothing, so Scapy does not print the result)."""
+        self.process_packet(packet)
+        
+        now = time.monotonic()
+        if now - self._last_drop_poll >= DROP_POLL_INTERVAL:
+            self._last_drop_poll = now
+            self.poll_kernel_drops()
+    
     def start(self, count: int = 0, timeout: Optional[int] = None):
         """
         Start packet capture.
@@ -96,16 +225,34 @@ class PacketSniffer:
         print(f"\n{'='*70}")
         print(f"  PACKET SNIFFER STARTED")
         print(f"{'='*70}")
-        print(f"  Interface: {self.interface or 'Default'}")
+        if self.offline:
+            print(f"  Capture File: {self.offline}")
+        else:
+            print(f"  Interface: {self.interface or 'Default'}")
         print(f"  Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"{'='*70}\n")
         
         try:
+            if self.offline:
+                sniff(
+                    offline=self.offline,
+                    prn=self._on_packet,
+                    count=count,
+                    stop_filter=lambda _: not self.running,
+                    store=False
+                )
+                return
+            
+            # Open the socket ourselves so kernel drop counters can be read
+            self._socket = conf.L2listen(iface=self.interface)
+            if self.fanout_group is not None:
+                self._join_fanout()
             sniff(
-                iface=self.interface,
-                prn=self.process_packet,
+                opened_socket=self._socket,
+                prn=self._on_packet,
                 count=count,
                 timeout=timeout,
+                stop_filter=lambda _: not self.running,
                 store=False
             )
         except PermissionError:
@@ -115,6 +262,47 @@ class PacketSniffer:
         except Exception as e:
             print(f"\n❌ ERROR: {str(e)}")
             self.running = False
+        finally:
+            self.poll_kernel_drops()
+            if self._socket:
+                self._socket.close()
+                self._socket = None
+    
+    def _join_fanout(self):
+        """
+        Join the AF_PACKET fanout group of this sniffer's interface.
+        
+        Raises:
+            OSError: If the socket is not a Linux packet socket
+        """
+        sock = getattr(self._socket, 'ins', None)
+        if not isinstance(sock, socket.socket) or sock.family != getattr(socket, 'AF_PACKET', None):
+            raise OSError("Fanout groups need Linux AF_PACKET capture")
+        mode = FANOUT_MODES[self.fanout_mode]
+        if self.fanout_mode == 'hash':
+            # Hash whole datagrams, so fragments stay with their flow
+            mode |= PACKET_FANOUT_FLAG_DEFRAG
+        value = (self.fanout_group & 0xFFFF) | (mode << 16)
+        sock.setsockopt(SOL_PACKET, PACKET_FANOUT, struct.pack('I', value))
+    
+    def poll_kernel_drops(self) -> int:
+        """
+        Update and return packets dropped by the kernel before capture.
+        
+        The kernel resets its counters on every read, so only the capture
+        thread that owns the socket polls them (about once per second and
+        when capture ends); other threads read self.kernel_drops. Only
+        available for Linux packet sockets; elsewhere stays at 0.
+        """
+        sock = getattr(self._socket, 'ins', None)
+        if isinstance(sock, socket.socket) and sock.family == getattr(socket, 'AF_PACKET', None):
+            try:
+                # Counters reset on every read, so accumulate them
+                _, drops = struct.unpack('II', sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 8))
+                self.kernel_drops += drops
+            except OSError:
+                pass
+        return self.kernel_drops
     
     def stop(self):
         """Stop packet capture."""
@@ -140,8 +328,11 @@ class PacketSniffer:
             rate = 0
         
         return {
+            'interface': self.interface,
+            'offline': self.offline,
             'packet_count': self.packet_count,
             'duration': duration,
             'rate': rate,
+            'kernel_drops': self.kernel_drops,
             'running': self.running
         }
\ No newline at end of file
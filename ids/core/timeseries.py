@@ -0,0 +1,267 @@
+"""
+Time Series Module
+Pre-aggregated traffic and alert counts at fixed resolutions for charts
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Counted per interval, in row order
+COLUMNS = ('packets', 'bytes', 'alerts_high', 'alerts_medium', 'alerts_low',
+           'tcp', 'udp', 'icmp', 'other')
+
+PACKETS, BYTES = 0, 1
+SEVERITY_COLUMNS = {'HIGH': 2, 'MEDIUM': 3, 'LOW': 4}
+TRANSPORT_COLUMNS = {'TCP': 5, 'UDP': 6, 'ICMP': 7}
+OTHER = 8
+
+# Resolution name -> interval length in seconds, finest first
+RESOLUTIONS = {'1s': 1, '1m': 60, '1h': 3600}
+
+
+class Resolution:
+    """
+    Ring buffer of per-interval rows at one resolution.
+
+    Each slot holds the row of one interval and the interval's number, so a
+    slot left over from an older lap of the ring reads as empty and gaps
+    never need clearing. The open interval is accumulated separately and
+    written to its slot (and added to the next coarser resolution) when a
+    later interval starts.
+    """
+
+    __slots__ = ('name', 'step', 'size', 'buckets', 'rows', 'bucket', 'open', 'coarser')
+
+    def __init__(self, name: str, step: int, size: int):
+        self.name = name
+        self.step = step
+        self.size = size
+        self.buckets: List[int] = [-1] * size
+        self.rows: List[Optional[List[int]]] = [None] * size
+        self.bucket: Optional[int] = None
+        self.open: List[int] = [0] * len(COLUMNS)
+        self.coarser: Optional['Resolution'] = None
+
+    def roll(self, bucket: int):
+        """Close the open interval if `bucket` is a later one."""
+        if self.bucket is not None:
+            # Late data (reordered capture) is counted in the open interval
+            if bucket <= self.bucket:
+                return
+            slot = self.bucket % self.size
+            self.buckets[slot] = self.bucket
+            self.rows[slot] = self.open
+            if self.coarser is not None:
+                self.coarser.add(self.bucket * self.step, self.open)
+            self.open = [0] * len(COLUMNS)
+        self.bucket = bucket
+
+    def add(self, start: int, row: List[int]):
+        """Add the row of a closed finer interval starting at `start` (seconds)."""
+        self.roll(start // self.step)
+        total = self.open
+        for index, value in enumerate(row):
+            total[index] += value
+
+    def row(self, bucket: int) -> Optional[List[int]]:
+        """Get the stored row of a closed interval, if still in the ring."""
+        slot = bucket % self.size
+        return self.rows[slot] if self.buckets[slot] == bucket else None
+
+
+class TimeSeries:
+    """
+    Traffic and alert counts rolled up at 1 second, 1 minute and 1 hour.
+
+    A packet only increments the open 1 second row (a dict lookup and three
+    additions); each closed second is folded into the open minute, and each
+    closed minute into the open hour, so the coarser series cost nothing
+    per packet and a query never touches raw packets or alerts. Intervals
+    follow the packets' capture time, so a replayed capture file is charted
+    at its original time.
+    """
+
+    def __init__(self, points: Optional[Dict[str, int]] = None):
+        """
+        Initialize time series store.
+
+        Args:
+            points: Intervals kept per resolution name (see RESOLUTIONS)
+        """
+        points = points or {}
+        self.resolutions: Dict[str, Resolution] = {}
+        finer = None
+        for name, step in RESOLUTIONS.items():
+            resolution = Resolution(name, step, max(int(points.get(name, 600)), 1))
+            if finer is not None:
+                finer.coarser = resolution
+            self.resolutions[name] = finer = resolution
+        self.seconds = self.resolutions['1s']
+        self.latest = 0.0
+
+    def add_packet(self, timestamp: float, length: int, transport: Optional[str],
+                   packets: int = 1):
+        """
+        Count one packet (or the packets of a flow record).
+
+        Args:
+            timestamp: Capture time (seconds since the epoch)
+            length: Packet length (or a flow's total) in bytes
+            transport: 'TCP', 'UDP', 'ICMP' or None
+            packets: Packets counted at once
+        """
+        seconds = self.seconds
+        second = int(timestamp)
+        if second != seconds.bucket:
+            seconds.roll(second)
+            if timestamp > self.latest:
+                self.latest = timestamp
+        row = seconds.open
+        row[PACKETS] += packets
+        row[BYTES] += length
+        row[TRANSPORT_COLUMNS.get(transport, OTHER)] += packets
+
+    def add_alert(self, severity: str):
+        """Count one alert in the current interval."""
+        seconds = self.seconds
+        if seconds.bucket is None:
+            seconds.roll(int(time.time()))
+        column = SEVERITY_COLUMNS.get(severity)
+        if column is not None:
+            seconds.open[column] += 1
+
+    def add_row(self, timestamp: float, row: List[int]):
+        """
+        Add counts from elsewhere (e.g. another sensor's 1 second row).
+
+        A row for an interval that is already closed is added to the stored
+        row of each resolution that has closed it, up to the first one where
+        that interval is still open; from there the normal roll-up carries it.
+        Rows older than a resolution keeps are dropped at that resolution.
+        """
+        second = int(timestamp)
+        for level in self.resolutions.values():
+            bucket = second // level.step
+            if level.bucket is None or bucket >= level.bucket:
+                level.add(second, row)
+                break
+            stored = level.row(bucket)
+            if stored is not None:
+                for index, value in enumerate(row):
+                    stored[index] += value
+        if timestamp > self.latest:
+            self.latest = timestamp
+
+    def rows_since(self, second: Optional[int],
+                   include_open: bool = False) -> List[Tuple[int, List[int]]]:
+        """
+        Get the closed 1 second rows after a given second.
+
+        Args:
+            second: Last second already fetched (None: everything kept)
+            include_open: Also return the open second (once nothing more is counted)
+
+        Returns:
+            (second, row) pairs in time order
+        """
+        seconds = self.seconds
+        after = -1 if second is None else second
+        rows = [(bucket, row) for bucket, row in zip(seconds.buckets, seconds.rows)
+                if row is not None and bucket > after]
+        rows.sort(key=lambda item: item[0])
+        if include_open and seconds.bucket is not None and seconds.bucket > after:
+            rows.append((seconds.bucket, list(seconds.open)))
+        return rows
+
+    def _pending(self, resolution: Resolution) -> Dict[int, List[int]]:
+        """
+        Get the not yet closed counts of a resolution, by interval.
+
+        The open rows of the finer resolutions have not been folded in yet,
+        and may already belong to a later interval than the open one.
+        """
+        pending: Dict[int, List[int]] = {}
+        for level in self.resolutions.values():
+            if level.bucket is not None:
+                bucket = level.bucket * level.step // resolution.step
+                total = pending.setdefault(bucket, [0] * len(COLUMNS))
+                for index, value in enumerate(level.open):
+                    total[index] += value
+            if level is resolution:
+                break
+        return pending
+
+    def query(self, resolution: str = '1m', start: Optional[float] = None,
+              end: Optional[float] = None) -> Dict:
+        """
+        Get a range of one resolution as columns for charting.
+
+        Args:
+            resolution: '1s', '1m' or '1h'
+            start: First time to include (default: as far back as kept)
+            end: Last time to include (default: now, or the latest packet
+                if that is older than the resolution keeps, e.g. after a replay)
+
+        Returns:
+            Dict with 'resolution', 'step', 'timestamps' (interval starts)
+            and one list per column in 'series'
+
+        Raises:
+            ValueError: If the resolution is unknown
+        """
+        level = self.resolutions.get(resolution)
+        if level is None:
+            raise ValueError(f"Unknown resolution: {resolution!r} "
+                             f"(expected one of {', '.join(RESOLUTIONS)})")
+
+        if end is None:
+            end = time.time()
+            if self.latest and end - self.latest >= level.step * level.size:
+                end = self.latest
+        last = int(end) // level.step
+        first = last - level.size + 1
+        if start is not None:
+            first = max(first, int(start) // level.step)
+
+        empty = [0] * len(COLUMNS)
+        pending = self._pending(level)
+        timestamps = []
+        series = {name: [] for name in COLUMNS}
+        for bucket in range(first, last + 1):
+            row = pending.get(bucket) or level.row(bucket) or empty
+            timestamps.append(bucket * level.step)
+            for name, value in zip(COLUMNS, row):
+                series[name].append(value)
+
+        return {
+            'resolution': level.name,
+            'step': level.step,
+            'timestamps': timestamps,
+            'series': series
+        }
+
+    def get_state(self) -> Dict:
+        """Get the stored intervals for checkpointing."""
+        state = {}
+        for name, level in self.resolutions.items():
+            rows = {bucket: row for bucket, row in zip(level.buckets, level.rows)
+                    if row is not None}
+            state[name] = {'rows': rows, 'bucket': level.bucket, 'open': list(level.open)}
+        return state
+
+    def load_state(self, state: Dict):
+        """Restore intervals saved with get_state()."""
+        for name, level in self.resolutions.items():
+            saved = state.get(name)
+            if not saved:
+                continue
+            for bucket, row in saved.get('rows', {}).items():
+                bucket = int(bucket)  # JSON object keys are strings
+                slot = bucket % level.size
+                if bucket > level.buckets[slot]:
+                    level.buckets[slot] = bucket
+                    level.rows[slot] = list(row)
+            if saved.get('bucket') is not None:
+                level.bucket = saved['bucket']
+                level.open = list(saved['open'])
+        if self.seconds.bucket is not None:
+            self.latest = float(self.seconds.bucket)
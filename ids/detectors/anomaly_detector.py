@@ -2,146 +2,405 @@
 Anomaly Detection Engine
 Detects unusual network behavior
 """
-from collections import defaultdict, deque
-from datetime import datetime, timedelta
-from typing import Dict, List
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
 import time
 
-class AnomalyDetector:
-    """Detects network anomalies using statistical analysis."""
-    
-    def __init__(self):
-        """Initialize anomaly detector."""
-        # Track connections per IP
-        self.connections_per_ip = defaultdict(int)
-        self.ip_first_seen = {}
-        
-        # Track port scans
-        self.ports_per_ip = defaultdict(set)
-        
-        # Track packet rates
-        self.packet_times = deque(maxlen=1000)
-        
+from ..core.address import int_to_address
+from ..core.config import IDSConfig, config
+from ..core.hosts import HostRecord, HostTable
+from .baseline import BaselineModel, ProtocolMixBaseline
+from .registry import Detector
+
+# Key of the whole-network baseline
+GLOBAL_KEY = '*'
+
+UNLIMITED = float('inf')
+
+# Busiest sources kept for statistics and the collector's top talkers
+TOP_TALKERS = 100
+
+# Most shares one flow's traffic is split into (one per baseline window)
+MAX_FLOW_SLICES = 60
+
+class AnomalyDetector(Detector):
+    """Detects network anomalies by scoring traffic against learned baselines."""
+
+    name = 'anomaly_detector'
+    enable_setting = 'ENABLE_ANOMALY_DETECTION'
+    order = 10
+    fields = ('src_ip',)
+
+    def __init__(self, settings: IDSConfig = None, hosts: HostTable = None):
+        """
+        Initialize anomaly detector.
+
+        Args:
+            settings: IDS configuration (defaults to the global config)
+            hosts: Shared host table (a private one is created if omitted)
+        """
+        self.settings = settings or config
+        window = self.settings.BASELINE_WINDOW
+
+        # Connections, first-seen time and baseline per source live in the host table
+        self.hosts = hosts if hosts is not None else HostTable(self.settings.HOST_TABLE_SIZE)
+
+        # Learned per-host (kept in host records), per-subnet and whole-network baselines
+        self.host_baselines = BaselineModel(
+            window=window,
+            buckets=self.settings.BASELINE_TIME_BUCKETS,
+            alpha=self.settings.BASELINE_ALPHA,
+            min_samples=self.settings.BASELINE_MIN_SAMPLES,
+            z_threshold=self.settings.ANOMALY_Z_THRESHOLD
+        )
+        self.global_baseline = BaselineModel(
+            window=window,
+            buckets=self.settings.BASELINE_TIME_BUCKETS,
+            alpha=self.settings.BASELINE_ALPHA,
+            min_samples=self.settings.BASELINE_MIN_SAMPLES,
+            z_threshold=self.settings.ANOMALY_Z_THRESHOLD,
+            use_subnets=False
+        )
+        self.protocol_mix = ProtocolMixBaseline(
+            window=window,
+            alpha=self.settings.BASELINE_ALPHA,
+            min_samples=self.settings.BASELINE_MIN_SAMPLES,
+            z_threshold=self.settings.ANOMALY_Z_THRESHOLD
+        )
+
         # Track protocols
         self.protocol_counts = defaultdict(int)
-        
+
         # Track anomalies
         self.anomalies = []
-        
+
+        # Counts of the host records this detector filled in, and the busiest
+        # sources (address -> packets), kept on the packet thread so statistics
+        # never walk the shared host table
+        self.sources = 0
+        self.baselined = 0
+        self.top_talkers: Dict[int, int] = {}
+        self._top_floor = 0
+        self.hosts.evict_hooks.append(self._forget)
+
+    def _host_fallback_limits(self) -> tuple:
+        """Per-window (packets, bytes, ports) limits for hosts without a baseline."""
+        return (self.settings.MAX_CONNECTIONS_PER_IP, UNLIMITED,
+                self.settings.MAX_PORTS_SCANNED)
+
+    def _global_fallback_limits(self) -> tuple:
+        """Per-window (packets, bytes, ports) limits for the whole network."""
+        return (self.settings.MAX_PACKETS_PER_SECOND * self.settings.BASELINE_WINDOW,
+                UNLIMITED, UNLIMITED)
+
     def analyze_packet(self, packet_info: dict) -> List[dict]:
         """
         Analyze packet for anomalies.
-        
+
         Args:
             packet_info: Dictionary with packet information
-            
+
+        Returns:
+            List of detected anomalies
+        """
+        # Capture time, so replayed traffic is scored on its own clock
+        now = packet_info.get('capture_time') or time.time()
+        return self._analyze(packet_info, [(now, 1, 1, packet_info.get('length', 0))])
+
+    def analyze_flow(self, flow: dict) -> List[dict]:
+        """
+        Analyze a flow record for anomalies.
+
+        The flow counts as one connection of its source, at its start. Its
+        packets and bytes are spread evenly over its start..end capture
+        time, one share per baseline window it spans, so a long flow is
+        not scored as one burst when it is exported. Shares that fall in a
+        window already closed (flows are exported late) go to the open one.
+
+        Args:
+            flow: Flow record with 'packets', 'bytes', 'start' and 'end'
+
         Returns:
             List of detected anomalies
         """
+        return self._analyze(flow, self._flow_slices(flow))
+
+    def _flow_slices(self, flow: dict) -> List[Tuple[float, int, int, int]]:
+        """Split a flow into (time, connections, packets, bytes) shares, oldest first."""
+        packets = flow.get('packets', 1)
+        length = flow.get('bytes', 0)
+        end = flow.get('end') or flow.get('capture_time') or time.time()
+        start = min(flow.get('start') or end, end)
+
+        count = min(int((end - start) // self.settings.BASELINE_WINDOW) + 1, MAX_FLOW_SLICES)
+        step = (end - start) / count
+        return [
+            (start + i * step, 1 if i == 0 else 0,
+             packets * (i + 1) // count - packets * i // count,
+             length * (i + 1) // count - length * i // count)
+            for i in range(count)
+        ]
+
+    def _analyze(self, info: dict, slices: List[Tuple[float, int, int, int]]) -> List[dict]:
+        """
+        Count a source's traffic and score its windows.
+
+        Args:
+            info: Packet or flow record
+            slices: (capture time, connections, packets, bytes), oldest first
+        """
         anomalies = []
-        
+
         # Extract info
-        src_ip = packet_info.get('src_ip')
-        dst_ip = packet_info.get('dst_ip')
-        dst_port = packet_info.get('dst_port')
-        protocol = packet_info.get('transport', 'Unknown')
-        
-        if not src_ip:
+        host = self.hosts.source(info)
+        dst_port = info.get('dst_port')
+        protocol = info.get('transport') or 'Unknown'
+
+        if host is None:
             return anomalies
-        
-        # Track packet timing
-        self.packet_times.append(time.time())
-        
-        # Track connections
-        self.connections_per_ip[src_ip] += 1
-        
+
+        # Track packets sent
+        total = sum(packets for _, _, packets, _ in slices)
+        if not host.packets:
+            self.sources += 1
+        host.packets += total
+        self._rank(host)
+
         # Track first time seeing this IP
-        if src_ip not in self.ip_first_seen:
-            self.ip_first_seen[src_ip] = time.time()
-        
+        if host.first_seen is None:
+            host.first_seen = slices[0][0]
+
         # Track protocol
-        self.protocol_counts[protocol] += 1
-        
-        # 1. Check for excessive connections from single IP
-        if self.connections_per_ip[src_ip] > 50:
-            anomalies.append({
-                'type': 'Excessive Connections',
-                'severity': 'HIGH',
-                'source_ip': src_ip,
-                'description': f'IP {src_ip} has {self.connections_per_ip[src_ip]} connections',
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        # 2. Check for port scanning
-        if dst_port:
-            self.ports_per_ip[src_ip].add(dst_port)
-            
-            if len(self.ports_per_ip[src_ip]) > 20:
-                anomalies.append({
-                    'type': 'Port Scan Detected',
-                    'severity': 'HIGH',
-                    'source_ip': src_ip,
-                    'description': f'IP {src_ip} scanned {len(self.ports_per_ip[src_ip])} ports',
-                    'ports': list(self.ports_per_ip[src_ip])[:10],
-                    'timestamp': datetime.now().isoformat()
-                })
-        
-        # 3. Check for high packet rate (DDoS indicator)
-        if len(self.packet_times) >= 100:
-            time_diff = self.packet_times[-1] - self.packet_times[0]
-            if time_diff > 0:
-                rate = len(self.packet_times) / time_diff
-                
-                if rate > 1000:  # More than 1000 packets/sec
-                    anomalies.append({
-                        'type': 'High Traffic Rate',
-                        'severity': 'MEDIUM',
-                        'description': f'Unusual traffic rate: {rate:.0f} packets/sec',
-                        'rate': rate,
-                        'timestamp': datetime.now().isoformat()
-                    })
-        
-        # 4. Check for suspicious protocol distribution
-        total_packets = sum(self.protocol_counts.values())
-        if total_packets > 100:
-            for proto, count in self.protocol_counts.items():
-                percentage = (count / total_packets) * 100
-                
-                # Alert if any protocol is >90% of traffic
-                if percentage > 90:
-                    anomalies.append({
-                        'type': 'Protocol Anomaly',
-                        'severity': 'LOW',
-                        'protocol': proto,
-                        'description': f'{proto} traffic is {percentage:.1f}% of total',
-                        'timestamp': datetime.now().isoformat()
-                    })
-        
+        self.protocol_counts[protocol] += total
+
+        if host.baseline is None:
+            host.baseline = self.host_baselines.new_record(host.address)
+            self.baselined += 1
+        host_limits = self._host_fallback_limits()
+        global_limits = self._global_fallback_limits()
+
+        for now, connections, packets, length in slices:
+            # 1-3. Score this host's window: connections, port fan-out, data volume
+            for crossing in self.host_baselines.observe_record(
+                    host.baseline, now, length, dst_port, host_limits, connections):
+                anomalies.append(self._host_anomaly(host, crossing))
+
+            # 4. Score the whole-network window (DDoS indicator)
+            for crossing in self.global_baseline.observe(
+                    GLOBAL_KEY, now, length, None, global_limits, packets):
+                anomalies.append(self._global_anomaly(crossing))
+
+            # 5. Score the protocol distribution of the last closed window
+            for shift in self.protocol_mix.observe(protocol, now, packets):
+                anomalies.append(self._protocol_anomaly(shift))
+
         # Store detected anomalies
         for anomaly in anomalies:
             self.anomalies.append(anomaly)
-        
+
         return anomalies
-    
+
+    on_packet = analyze_packet
+    on_flow = analyze_flow
+
+    def _rank(self, host: HostRecord):
+        """Keep a source in the top talkers if it is among the busiest."""
+        top = self.top_talkers
+        if host.address in top or len(top) < TOP_TALKERS:
+            top[host.address] = host.packets
+            return
+        if host.packets <= self._top_floor:
+            return
+        quietest = min(top, key=top.get)
+        if host.packets > top[quietest]:
+            del top[quietest]
+            top[host.address] = host.packets
+        self._top_floor = min(top.values())
+
+    def _forget(self, host: HostRecord):
+        """Drop the counts of a host evicted from the host table."""
+        if host.packets:
+            self.sources -= 1
+            self.top_talkers.pop(host.address, None)
+        if host.baseline is not None:
+            self.baselined -= 1
+
+    def get_top_talkers(self, count: int = 10) -> List[tuple]:
+        """
+        Get the busiest sources, busiest first.
+
+        Args:
+            count: Number of sources (at most TOP_TALKERS)
+
+        Returns:
+            List of (ip, packets)
+        """
+        # dict() copies at once; the packet thread keeps updating the table
+        top = dict(self.top_talkers)
+        busiest = sorted(top.items(), key=lambda item: item[1], reverse=True)[:count]
+        return [(int_to_address(address), packets) for address, packets in busiest]
+
+    @staticmethod
+    def _protocol_anomaly(shift: Dict) -> dict:
+        """Build the anomaly for a protocol whose share of traffic shifted."""
+        description = f"{shift['protocol']} traffic is {shift['share'] * 100:.1f}% of total"
+        if 'mean' in shift:
+            description += f" (usually {shift['mean'] * 100:.1f}%)"
+
+        return {
+            'type': 'Protocol Anomaly',
+            'severity': 'LOW',
+            'protocol': shift['protocol'],
+            'description': description,
+            'score': shift.get('score'),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    @staticmethod
+    def _baseline_note(crossing: Dict, scale: float = 1.0) -> str:
+        """
+        Describe the baseline a value was compared against.
+
+        Args:
+            crossing: Limit crossing reported by the baseline model
+            scale: Divisor applied to the per-window limit, mean and deviation
+                (the window length to report them per second)
+        """
+        if crossing['baseline'] == 'threshold':
+            return f"threshold {crossing['limit'] / scale:,.0f}"
+        return (f"{crossing['baseline']} baseline {crossing['mean'] / scale:,.1f} ± "
+                f"{crossing['std'] / scale:,.1f}, z={crossing['score']:.1f}")
+
+    def _host_anomaly(self, host: HostRecord, crossing: Dict) -> dict:
+        """Build the anomaly for a host feature that crossed its limit."""
+        feature = crossing['feature']
+        value = crossing['value']
+        window = crossing['window']
+        note = self._baseline_note(crossing)
+        src_ip = host.ip
+
+        anomaly = {
+            'source_ip': src_ip,
+            'score': crossing.get('score'),
+            'baseline': crossing['baseline'],
+            'timestamp': datetime.now().isoformat()
+        }
+
+        if feature == 'packets':
+            anomaly.update({
+                'type': 'Excessive Connections',
+                'severity': 'HIGH',
+                'description': f'IP {src_ip} has {value} connections in {window:.0f}s ({note})'
+            })
+        elif feature == 'ports':
+            record = host.baseline
+            anomaly.update({
+                'type': 'Port Scan Detected',
+                'severity': 'HIGH',
+                'description': f'IP {src_ip} scanned {value} ports in {window:.0f}s ({note})',
+                'ports': sorted(record.ports)[:10] if record else []
+            })
+        else:
+            anomaly.update({
+                'type': 'Unusual Data Volume',
+                'severity': 'MEDIUM',
+                'description': f'IP {src_ip} sent {value:,} bytes in {window:.0f}s ({note})'
+            })
+
+        return anomaly
+
+    def _global_anomaly(self, crossing: Dict) -> dict:
+        """Build the anomaly for network-wide traffic that crossed its limit."""
+        # Rate, limit and baseline are all reported per second
+        rate = crossing['value'] / crossing['window']
+        note = self._baseline_note(crossing, crossing['window'])
+
+        if crossing['feature'] == 'packets':
+            description = f'Unusual traffic rate: {rate:,.0f} packets/sec ({note})'
+        else:
+            description = f'Unusual traffic volume: {rate:,.0f} bytes/sec ({note})'
+
+        return {
+            'type': 'High Traffic Rate',
+            'severity': 'MEDIUM',
+            'description': description,
+            'rate': rate,
+            'score': crossing.get('score'),
+            'timestamp': datetime.now().isoformat()
+        }
+
     def get_statistics(self) -> dict:
         """Get detection statistics."""
         return {
-            'total_ips': len(self.connections_per_ip),
+            'total_ips': self.sources,
             'total_anomalies': len(self.anomalies),
-            'connections_by_ip': dict(sorted(
-                self.connections_per_ip.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10]),
+            'connections_by_ip': dict(self.get_top_talkers(10)),
             'protocol_distribution': dict(self.protocol_counts),
+            'baselines': {
+                'hosts': self.baselined,
+                'subnets': len(self.host_baselines.subnets)
+            },
             'recent_anomalies': self.anomalies[-10:]
         }
-    
+
+    def get_state(self) -> dict:
+        """Get detector state (history and subnet/global baselines) for checkpointing."""
+        return {
+            'protocol_counts': dict(self.protocol_counts),
+            'anomalies': self.anomalies[-self.settings.MAX_ALERTS_IN_MEMORY:],
+            'baselines': {
+                'hosts': self.host_baselines.get_state(),
+                'global': self.global_baseline.get_state(),
+                'protocol_mix': self.protocol_mix.get_state()
+            }
+        }
+
+    def load_state(self, state: dict):
+        """Restore state saved with get_state()."""
+        self.protocol_counts = defaultdict(int, state.get('protocol_counts', {}))
+        self.anomalies = list(state.get('anomalies', []))
+
+        baselines = state.get('baselines', {})
+        self.host_baselines.load_state(baselines.get('hosts', {}))
+        self.global_baseline.load_state(baselines.get('global', {}))
+        self.protocol_mix.load_state(baselines.get('protocol_mix', {}))
+
+    def dump_host(self, host: HostRecord) -> object:
+        """Get a source's packet count, first-seen time and learned baseline."""
+        if not host.packets:
+            return None
+        baseline = host.baseline
+        return [host.packets, host.first_seen,
+                self.host_baselines.dump_record(baseline) if baseline is not None else None]
+
+    def load_host(self, host: HostRecord, data):
+        """Restore a source saved with dump_host()."""
+        packets, first_seen, baseline = data
+        if not packets:
+            return
+        if not host.packets:
+            self.sources += 1
+        host.packets = packets
+        host.first_seen = first_seen
+        self._rank(host)
+        if baseline is not None:
+            if host.baseline is None:
+                self.baselined += 1
+            host.baseline = self.host_baselines.load_record(baseline)
+
     def reset(self):
         """Reset detector state."""
-        self.connections_per_ip.clear()
-        self.ip_first_seen.clear()
-        self.ports_per_ip.clear()
-        self.packet_times.clear()
+        for host in self.hosts:
+            host.packets = 0
+            host.first_seen = None
+            host.baseline = None
+        self.sources = 0
+        self.baselined = 0
+        self.top_talkers.clear()
+        self._top_floor = 0
+        self.host_baselines.reset()
+        self.global_baseline.reset()
+        self.protocol_mix.reset()
         self.protocol_counts.clear()
-        self.anomalies.clear()
\ No newline at end of file
+        self.anomalies.clear()
@@ -0,0 +1,434 @@
+"""
+Traffic Baseline Models
+Learns per-host and per-subnet traffic baselines for anomaly scoring
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from ..core.address import address_to_int, int_to_address, subnet_of
+
+# Hosts and subnets are keyed by integer address (see address.py); other
+# keys, such as the whole-network key, are kept as given
+Key = Union[int, str]
+
+# Features tracked for every host window
+FEATURES = ('packets', 'bytes', 'ports')
+
+# Idle windows recorded as zero traffic when a host becomes active again
+MAX_IDLE_WINDOWS = 10
+
+
+class RunningStats:
+    """Exponentially weighted streaming mean and variance."""
+
+    __slots__ = ('count', 'mean', 'var')
+
+    def __init__(self, count: int = 0, mean: float = 0.0, var: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.var = var
+
+    def update(self, value: float, alpha: float):
+        """
+        Add an observation in O(1).
+
+        While fewer than 1/alpha samples have been seen this is a plain
+        running mean, after that older samples decay with weight (1 - alpha).
+        """
+        self.count += 1
+        weight = max(alpha, 1.0 / self.count)
+        diff = value - self.mean
+        increment = weight * diff
+        self.mean += increment
+        self.var = (1 - weight) * (self.var + diff * increment)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    def zscore(self, value: float) -> float:
+        """Get the z-score of a value, with a Poisson-style floor on the spread."""
+        return (value - self.mean) / max(self.std, math.sqrt(max(self.mean, 0.0)), 1.0)
+
+    def limit(self, z_threshold: float) -> float:
+        """Get the value at which the z-score reaches the threshold."""
+        return self.mean + z_threshold * max(self.std, math.sqrt(max(self.mean, 0.0)), 1.0)
+
+    def copy(self) -> 'RunningStats':
+        return RunningStats(self.count, self.mean, self.var)
+
+    def to_list(self) -> list:
+        return [self.count, self.mean, self.var]
+
+    @classmethod
+    def from_list(cls, values: list) -> 'RunningStats':
+        return cls(*values)
+
+
+class HostBaseline:
+    """Baseline and current-window counters for one host."""
+
+    __slots__ = ('subnet', 'stats', 'window_start', 'bucket', 'packets',
+                 'bytes', 'ports', 'limits', 'sources', 'alerted')
+
+    def __init__(self, subnet: Optional[int]):
+        self.subnet = subnet
+        # time-of-day bucket -> [RunningStats per feature]
+        self.stats: Dict[int, List[RunningStats]] = {}
+        self.window_start = None
+        self.bucket = 0
+        self.packets = 0
+        self.bytes = 0
+        self.ports = set()
+        self.limits = (0.0, 0.0, 0.0)
+        self.sources = (None, None, None)
+        self.alerted = set()
+
+
+def dump_key(key: Optional[Key]) -> Optional[str]:
+    """Convert a host or subnet key to a string for checkpoints."""
+    return int_to_address(key) if isinstance(key, int) else key
+
+
+def load_key(key: Optional[str]) -> Optional[Key]:
+    """Convert a checkpointed key back (older checkpoints hold CIDR strings)."""
+    if key is None:
+        return None
+    try:
+        return address_to_int(key.split('/', 1)[0])
+    except ValueError:
+        return key
+
+
+def time_bucket(timestamp: float, buckets: int) -> int:
+    """Get the local time-of-day bucket for a timestamp."""
+    t = time.localtime(timestamp)
+    seconds = t.tm_hour * 3600 + t.tm_min * 60 + t.tm_sec
+    return seconds * buckets // 86400
+
+
+class BaselineModel:
+    """
+    Online per-host traffic baselines.
+
+    Traffic is counted in fixed windows. When a window closes, its packet
+    count, byte count and destination port fan-out are folded into the
+    host's baseline for the current time-of-day bucket, and into the
+    baseline of the host's subnet, which stands in for hosts that have
+    not been seen long enough to have their own. Every packet only
+    increments counters and compares them to limits computed once per
+    window, so updates are O(1).
+    """
+
+    def __init__(self, window: float = 10.0, buckets: int = 24, alpha: float = 0.05,
+                 min_samples: int = 30, z_threshold: float = 4.0,
+                 max_hosts: int = 100000, use_subnets: bool = True):
+        """
+        Initialize baseline model.
+
+        Args:
+            window: Window length in seconds
+            buckets: Number of time-of-day buckets
+            alpha: Decay weight of new windows in the baseline
+            min_samples: Windows needed before a baseline is trusted
+            z_threshold: Z-score at which a window is anomalous
+            max_hosts: Maximum number of tracked hosts (LRU eviction)
+            use_subnets: Whether to keep per-subnet peer baselines
+        """
+        self.window = window
+        self.buckets = buckets
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.z_threshold = z_threshold
+        self.max_hosts = max_hosts
+        self.use_subnets = use_subnets
+
+        self.hosts: 'OrderedDict[Key, HostBaseline]' = OrderedDict()
+        # subnet -> time-of-day bucket -> [RunningStats per feature]
+        self.subnets: Dict[int, Dict[int, List[RunningStats]]] = {}
+
+    def observe(self, host: Key, now: float, length: int, port: Optional[int],
+                fallback_limits: Tuple[float, float, float], packets: int = 1) -> List[Dict]:
+        """
+        Count a packet for a host and score its current window.
+
+        Args:
+            host: Host key (usually the integer source address)
+            now: Packet timestamp
+            length: Packet length in bytes
+            port: Destination port, or None if fan-out is not tracked
+            fallback_limits: Per-window (packets, bytes, ports) limits used
+                until a baseline is trusted
+            packets: Packets counted at once (a flow record: its packet
+                count, with length its total bytes)
+
+        Returns:
+            Features that crossed their limit in this window (at most once
+            per feature per window)
+        """
+        record = self.hosts.get(host)
+        if record is None:
+            record = self.new_record(host)
+            self.hosts[host] = record
+            if len(self.hosts) > self.max_hosts:
+                self.hosts.popitem(last=False)
+        else:
+            self.hosts.move_to_end(host)
+
+        return self.observe_record(record, now, length, port, fallback_limits, packets)
+
+    def new_record(self, host: Key) -> HostBaseline:
+        """Create the baseline record of a host (not added to self.hosts)."""
+        subnet = subnet_of(host) if self.use_subnets and isinstance(host, int) else None
+        return HostBaseline(subnet)
+
+    def observe_record(self, record: HostBaseline, now: float, length: int,
+                       port: Optional[int], fallback_limits: Tuple[float, float, float],
+                       packets: int = 1) -> List[Dict]:
+        """
+        Count a packet in a host record held by the caller (e.g. in a HostTable).
+
+        Same as observe(), without the lookup in self.hosts.
+        """
+        if record.window_start is None or now - record.window_start >= self.window:
+            self._roll_window(record, now, fallback_limits)
+
+        record.packets += packets
+        record.bytes += length
+        if port is not None:
+            record.ports.add(port)
+
+        values = (record.packets, record.bytes, len(record.ports))
+        crossed = []
+        for i, feature in enumerate(FEATURES):
+            if values[i] > record.limits[i] and feature not in record.alerted:
+                record.alerted.add(feature)
+                crossed.append(self._describe(record, i, values[i]))
+
+        return crossed
+
+    def _roll_window(self, record: HostBaseline, now: float,
+                     fallback_limits: Tuple[float, float, float]):
+        """Fold the finished window into the baseline and open a new one."""
+        if record.window_start is not None:
+            values = (record.packets, record.bytes, len(record.ports))
+            self._record(record, record.bucket, values)
+
+            idle = int((now - record.window_start) // self.window) - 1
+            for _ in range(min(idle, MAX_IDLE_WINDOWS)):
+                self._record(record, record.bucket, (0, 0, 0))
+
+            # Keep windows aligned so idle gaps are counted consistently
+            record.window_start += (int((now - record.window_start) // self.window)
+                                    * self.window)
+        else:
+            record.window_start = now
+
+        record.bucket = time_bucket(now, self.buckets)
+        record.packets = 0
+        record.bytes = 0
+        record.ports = set()
+        record.alerted = set()
+        record.limits, record.sources = self._limits(record, fallback_limits)
+
+    def _record(self, record: HostBaseline, bucket: int, values: Tuple[int, int, int]):
+        """Add one window's values to the host and subnet baselines."""
+        targets = [record.stats]
+        if record.subnet is not None:
+            targets.append(self.subnets.setdefault(record.subnet, {}))
+
+        for stats_by_bucket in targets:
+            stats = stats_by_bucket.get(bucket)
+            if stats is None:
+                stats = stats_by_bucket[bucket] = [RunningStats() for _ in FEATURES]
+            for i, value in enumerate(values):
+                stats[i].update(value, self.alpha)
+
+    def _limits(self, record: HostBaseline, fallback_limits: Tuple[float, float, float]):
+        """Get the per-feature limits and where each one came from."""
+        host_stats = record.stats.get(record.bucket)
+        subnet_stats = None
+        if record.subnet is not None:
+            subnet_stats = self.subnets.get(record.subnet, {}).get(record.bucket)
+
+        limits = []
+        sources = []
+        for i in range(len(FEATURES)):
+            if host_stats and host_stats[i].count >= self.min_samples:
+                limits.append(host_stats[i].limit(self.z_threshold))
+                sources.append(('host', host_stats[i].copy()))
+            elif subnet_stats and subnet_stats[i].count >= self.min_samples:
+                limits.append(subnet_stats[i].limit(self.z_threshold))
+                sources.append(('subnet', subnet_stats[i].copy()))
+            else:
+                limits.append(fallback_limits[i])
+                sources.append(('threshold', None))
+
+        return tuple(limits), tuple(sources)
+
+    def _describe(self, record: HostBaseline, index: int, value: int) -> Dict:
+        """Describe a feature that crossed its limit."""
+        source, stats = record.sources[index]
+        result = {
+            'feature': FEATURES[index],
+            'value': value,
+            'limit': record.limits[index],
+            'baseline': source,
+            'window': self.window
+        }
+        if stats is not None:
+            result['mean'] = stats.mean
+            result['std'] = stats.std
+            result['score'] = stats.zscore(value)
+        return result
+
+    def host_window(self, host: Key) -> Optional[HostBaseline]:
+        """Get the live record of a host, if tracked."""
+        return self.hosts.get(host)
+
+    @staticmethod
+    def dump_record(record: HostBaseline) -> list:
+        """Get a host's learned baseline as plain data."""
+        return [dump_key(record.subnet), {
+            bucket: [s.to_list() for s in stats]
+            for bucket, stats in record.stats.items()
+        }]
+
+    @staticmethod
+    def load_record(data: list) -> HostBaseline:
+        """Restore a host baseline saved with dump_record()."""
+        subnet, by_bucket = data
+        record = HostBaseline(load_key(subnet))
+        record.stats = {
+            int(bucket): [RunningStats.from_list(s) for s in stats]
+            for bucket, stats in by_bucket.items()
+        }
+        return record
+
+    def get_state(self) -> Dict:
+        """Get learned baselines as plain data (window counters are not kept)."""
+        return {
+            'hosts': {
+                dump_key(host): self.dump_record(record)
+                for host, record in self.hosts.items()
+            },
+            'subnets': {
+                dump_key(subnet): {
+                    bucket: [s.to_list() for s in stats]
+                    for bucket, stats in by_bucket.items()
+                }
+                for subnet, by_bucket in self.subnets.items()
+            }
+        }
+
+    def load_state(self, state: Dict):
+        """Restore baselines saved with get_state()."""
+        self.hosts.clear()
+        for host, data in state.get('hosts', {}).items():
+            self.hosts[load_key(host)] = self.load_record(data)
+
+        self.subnets = {
+            load_key(subnet): {
+                int(bucket): [RunningStats.from_list(s) for s in stats]
+                for bucket, stats in by_bucket.items()
+            }
+            for subnet, by_bucket in state.get('subnets', {}).items()
+        }
+
+    def reset(self):
+        """Forget all baselines."""
+        self.hosts.clear()
+        self.subnets.clear()
+
+
+class ProtocolMixBaseline:
+    """Learns the typical share of each transport protocol per window."""
+
+    def __init__(self, window: float = 10.0, alpha: float = 0.05,
+                 min_samples: int = 30, z_threshold: float = 4.0,
+                 min_packets: int = 100, min_shift: float = 0.2,
+                 fallback_share: float = 0.9):
+        """
+        Initialize protocol mix baseline.
+
+        Args:
+            window: Window length in seconds
+            alpha: Decay weight of new windows in the baseline
+            min_samples: Windows needed before a baseline is trusted
+            z_threshold: Z-score at which a share is anomalous
+            min_packets: Minimum packets in a window before it is scored
+            min_shift: Minimum absolute share change to report
+            fallback_share: Share reported while the baseline is untrusted
+        """
+        self.window = window
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.z_threshold = z_threshold
+        self.min_packets = min_packets
+        self.min_shift = min_shift
+        self.fallback_share = fallback_share
+
+        self.stats: Dict[str, RunningStats] = {}
+        self.counts: Dict[str, int] = {}
+        self.window_start = None
+
+    def observe(self, protocol: str, now: float, packets: int = 1) -> List[Dict]:
+        """
+        Count packets and score the previous window if it just closed.
+
+        Returns:
+            Protocols whose share of the closed window was anomalous
+        """
+        anomalies = []
+        if self.window_start is None:
+            self.window_start = now
+        elif now - self.window_start >= self.window:
+            anomalies = self._close_window()
+            self.window_start = now
+
+        self.counts[protocol] = self.counts.get(protocol, 0) + packets
+        return anomalies
+
+    def _close_window(self) -> List[Dict]:
+        """Score and learn from the finished window."""
+        counts, self.counts = self.counts, {}
+        total = sum(counts.values())
+        if total < self.min_packets:
+            return []
+
+        anomalies = []
+        for protocol in set(self.stats) | set(counts):
+            share = counts.get(protocol, 0) / total
+            stats = self.stats.get(protocol)
+            if stats is None:
+                stats = self.stats[protocol] = RunningStats()
+
+            if stats.count >= self.min_samples:
+                spread = max(stats.std, 0.01)
+                score = (share - stats.mean) / spread
+                if score > self.z_threshold and share - stats.mean >= self.min_shift:
+                    anomalies.append({
+                        'protocol': protocol, 'share': share,
+                        'mean': stats.mean, 'score': score, 'baseline': 'learned'
+                    })
+            elif share > self.fallback_share:
+                anomalies.append({
+                    'protocol': protocol, 'share': share, 'baseline': 'threshold'
+                })
+
+            stats.update(share, self.alpha)
+
+        return anomalies
+
+    def get_state(self) -> Dict:
+        return {protocol: s.to_list() for protocol, s in self.stats.items()}
+
+    def load_state(self, state: Dict):
+        self.stats = {protocol: RunningStats.from_list(s) for protocol, s in state.items()}
+
+    def reset(self):
+        self.stats.clear()
+        self.counts.clear()
+        self.window_start = None
@@ -0,0 +1,322 @@
+"""
+DNS Anomaly Detection Engine
+Detects DNS tunnelling and domain generation algorithm (DGA) activity
+"""
+import math
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+import time
+
+from ..core.app_layer import DNS_PORT, app_field
+from ..core.config import IDSConfig, config
+from ..core.hosts import HostRecord, HostTable
+from .registry import Detector
+
+NXDOMAIN = 3
+
+# Second-level labels under which registrations happen one level deeper
+# (example.co.uk); a small stand-in for the public suffix list
+SHARED_SLDS = frozenset({'co', 'com', 'net', 'org', 'gov', 'edu', 'ac', 'or', 'ne', 'go'})
+
+# Query types commonly used to carry tunnelled data
+TUNNEL_QTYPES = frozenset({10, 16})  # NULL, TXT
+
+# Distinct subdomains remembered per domain and window
+MAX_DISTINCT = 1024
+
+
+def registered_domain(qname: str) -> str:
+    """Get the registered domain of a name (two labels, three under co.uk-style suffixes)."""
+    labels = qname.rsplit('.', 3)
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SHARED_SLDS:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def shannon_entropy(text: str) -> float:
+    """Get the Shannon entropy of a string in bits per character."""
+    if not text:
+        return 0.0
+    length = len(text)
+    return -sum(c / length * math.log2(c / length) for c in Counter(text).values())
+
+
+class CharEntropy:
+    """
+    Entropy of the characters of a growing text, updated per character.
+
+    Keeps sum(c * log2 c) over the character counts, so adding text costs a
+    lookup and two logs per character and the entropy is available in O(1):
+    H = log2(N) - sum(c * log2 c) / N.
+    """
+
+    __slots__ = ('counts', 'total', 'weighted')
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.total = 0
+        self.weighted = 0.0
+
+    def add(self, text: str):
+        counts = self.counts
+        for char, n in Counter(text).items():
+            old = counts.get(char, 0)
+            new = old + n
+            counts[char] = new
+            self.weighted += new * math.log2(new) - (old * math.log2(old) if old else 0.0)
+        self.total += len(text)
+
+    @property
+    def entropy(self) -> float:
+        if not self.total:
+            return 0.0
+        return max(0.0, math.log2(self.total) - self.weighted / self.total)
+
+
+class DomainWindow:
+    """Queries under one registered domain in the current window."""
+
+    __slots__ = ('start', 'queries', 'subdomain_bytes', 'long_labels', 'tunnel_qtypes',
+                 'distinct', 'chars', 'alerted')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.queries = 0
+        self.subdomain_bytes = 0
+        self.long_labels = 0
+        self.tunnel_qtypes = 0
+        self.distinct = set()
+        self.chars = CharEntropy()
+        self.alerted = False
+
+
+class ClientWindow:
+    """DNS responses to one client in the current window."""
+
+    __slots__ = ('start', 'responses', 'nxdomain', 'nx_domains', 'nx_entropy', 'alerted')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.responses = 0
+        self.nxdomain = 0
+        self.nx_domains = set()
+        self.nx_entropy = 0.0
+        self.alerted = False
+
+
+class DNSDetector(Detector):
+    """
+    Detects DNS tunnelling and DGA activity from query and response features.
+
+    Per registered domain, each window accumulates the volume, character
+    entropy, label lengths and number of distinct subdomains queried, which
+    together reveal data being encoded into query names (repeated lookups
+    of the same name are only counted). Per client, the share of NXDOMAIN
+    answers and the entropy of the names that failed reveal malware cycling
+    through generated domains. Domain windows are kept in an LRU-bounded
+    table and client windows in the shared host table, and both are updated
+    incrementally, one pass over each new query name.
+    """
+
+    name = 'dns_detector'
+    enable_setting = 'ENABLE_DNS_DETECTION'
+    order = 40
+    transports = frozenset({'UDP', 'TCP'})
+    ports = frozenset({DNS_PORT})
+
+    def __init__(self, settings: IDSConfig = None, hosts: HostTable = None):
+        """
+        Initialize DNS detector.
+
+        Args:
+            settings: IDS configuration (defaults to the global config)
+            hosts: Shared host table (a private one is created if omitted)
+        """
+        self.settings = settings or config
+        self.window = self.settings.DNS_WINDOW
+        self.max_tracked = self.settings.DNS_MAX_TRACKED
+
+        self.domains: 'OrderedDict[str, DomainWindow]' = OrderedDict()
+        # Client windows live in the host records
+        self.hosts = hosts if hosts is not None else HostTable(self.settings.HOST_TABLE_SIZE)
+
+        self.queries = 0
+        self.responses = 0
+        self.anomalies = []
+
+        # Host records holding a client window, counted here for statistics
+        self.tracked_clients = 0
+        self.hosts.evict_hooks.append(self._forget)
+
+    def analyze_packet(self, packet_info: dict) -> List[dict]:
+        """
+        Analyze a DNS packet.
+
+        Args:
+            packet_info: Packet information dictionary
+
+        Returns:
+            List of detected anomalies
+        """
+        if packet_info.get('dst_port') != DNS_PORT and packet_info.get('src_port') != DNS_PORT:
+            return []
+
+        qname = app_field(packet_info, 'dns_qname')
+        if not qname:
+            return []
+
+        now = packet_info.get('capture_time') or time.time()
+        anomalies = []
+
+        if app_field(packet_info, 'dns_response'):
+            self.responses += 1
+            anomaly = self._observe_response(self.hosts.destination(packet_info), qname,
+                                             packet_info['dns_rcode'], now)
+        else:
+            self.queries += 1
+            anomaly = self._observe_query(packet_info.get('src_ip'), qname,
+                                          packet_info['dns_qtype'], now)
+
+        if anomaly:
+            anomalies.append(anomaly)
+            self.anomalies.append(anomaly)
+        return anomalies
+
+    on_packet = analyze_packet
+
+    def _window(self, table: OrderedDict, key: str, factory, now: float):
+        """Get the current window of a key, starting a new one when it has expired."""
+        record = table.get(key)
+        if record is None or now - record.start >= self.window:
+            record = factory(now)
+            table[key] = record
+            if len(table) > self.max_tracked:
+                table.popitem(last=False)
+        table.move_to_end(key)
+        return record
+
+    def _observe_query(self, client: Optional[str], qname: str, qtype: int,
+                       now: float) -> Optional[dict]:
+        """Add a query to its domain's window and check for tunnelling."""
+        domain = registered_domain(qname)
+        subdomain = qname[:-len(domain) - 1] if len(qname) > len(domain) else ''
+
+        record = self._window(self.domains, domain, DomainWindow, now)
+        record.queries += 1
+        if qtype in TUNNEL_QTYPES:
+            record.tunnel_qtypes += 1
+        if not subdomain:
+            return None
+
+        # Repeated lookups of a name carry no new data
+        if subdomain in record.distinct:
+            return None
+        if len(record.distinct) < MAX_DISTINCT:
+            record.distinct.add(subdomain)
+
+        record.subdomain_bytes += len(subdomain)
+        if max(map(len, subdomain.split('.'))) >= self.settings.DNS_LONG_LABEL:
+            record.long_labels += 1
+        record.chars.add(subdomain.replace('.', ''))
+
+        if record.alerted:
+            return None
+
+        entropy = record.chars.entropy
+        encoded = (record.subdomain_bytes >= self.settings.DNS_TUNNEL_BYTES
+                   and entropy >= self.settings.DNS_TUNNEL_ENTROPY
+                   and len(record.distinct) >= self.settings.DNS_TUNNEL_DISTINCT)
+        if not encoded and record.long_labels < self.settings.DNS_TUNNEL_DISTINCT:
+            return None
+
+        record.alerted = True
+        elapsed = max(now - record.start, 1.0)
+        return {
+            'type': 'DNS Tunneling',
+            'severity': 'HIGH',
+            'source_ip': client,
+            'domain': domain,
+            'description': (f"{len(record.distinct)} distinct subdomains of {domain} "
+                            f"({record.subdomain_bytes:,} bytes, entropy {entropy:.2f} bits/char, "
+                            f"{record.long_labels} long labels, {record.tunnel_qtypes} TXT/NULL) "
+                            f"in {elapsed:.0f}s"),
+            'score': entropy,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def _observe_response(self, host: Optional[HostRecord], qname: str, rcode: int,
+                          now: float) -> Optional[dict]:
+        """Add a response to its client's window and check for DGA behaviour."""
+        if host is None:
+            return None
+
+        record = host.dns_client
+        if record is None:
+            self.tracked_clients += 1
+        if record is None or now - record.start >= self.window:
+            record = host.dns_client = ClientWindow(now)
+        record.responses += 1
+        if rcode != NXDOMAIN:
+            return None
+
+        record.nxdomain += 1
+        domain = registered_domain(qname)
+        if domain not in record.nx_domains and len(record.nx_domains) < MAX_DISTINCT:
+            record.nx_domains.add(domain)
+            # Entropy of the label a DGA generates
+            record.nx_entropy += shannon_entropy(domain.split('.', 1)[0])
+
+        if record.alerted or record.nxdomain < self.settings.DNS_NXDOMAIN_MIN:
+            return None
+        ratio = record.nxdomain / record.responses
+        if ratio < self.settings.DNS_NXDOMAIN_RATIO:
+            return None
+
+        record.alerted = True
+        client = host.ip
+        mean_entropy = record.nx_entropy / len(record.nx_domains)
+        severity = 'HIGH' if mean_entropy >= self.settings.DNS_DGA_ENTROPY else 'MEDIUM'
+        return {
+            'type': 'Possible DGA Activity',
+            'severity': severity,
+            'source_ip': client,
+            'description': (f"IP {client} got NXDOMAIN for {record.nxdomain} of "
+                            f"{record.responses} lookups ({ratio * 100:.0f}%) across "
+                            f"{len(record.nx_domains)} domains, mean name entropy "
+                            f"{mean_entropy:.2f} bits/char"),
+            'score': mean_entropy,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def _forget(self, host: HostRecord):
+        """Drop the count of a host evicted from the host table."""
+        if host.dns_client is not None:
+            self.tracked_clients -= 1
+
+    def get_statistics(self) -> dict:
+        """Get DNS detection statistics."""
+        return {
+            'queries': self.queries,
+            'responses': self.responses,
+            'tracked_domains': len(self.domains),
+            'tracked_clients': self.tracked_clients,
+            'total_anomalies': len(self.anomalies),
+            'recent_anomalies': self.anomalies[-10:]
+        }
+
+    def get_state(self) -> dict:
+        """Get detector state for checkpointing."""
+        return {'anomalies': self.anomalies[-self.settings.MAX_ALERTS_IN_MEMORY:]}
+
+    def load_state(self, state: dict):
+        """Restore state saved with get_state()."""
+        self.anomalies = list(state.get('anomalies', []))
+
+    def reset(self):
+        """Reset detector state."""
+        self.domains.clear()
+        for host in self.hosts:
+            host.dns_client = None
+        self.tracked_clients = 0
+        self.anomalies.clear()
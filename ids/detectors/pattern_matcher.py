@@ -0,0 +1,110 @@
+"""
+Multi-Pattern Matcher
+Aho-Corasick automaton for matching many byte patterns in one pass
+"""
+from collections import deque
+from typing import Iterable, List, Set, Tuple
+
+# Below this many patterns, C-level substring search per pattern is faster
+SMALL_PATTERN_SET = 16
+
+
+class MultiPatternMatcher:
+    """
+    Finds which of a set of byte patterns occur in a buffer.
+
+    All patterns share one Aho-Corasick automaton, so a payload is scanned
+    once no matter how many rules carry content patterns. The automaton
+    state can be carried from one buffer to the next (feed()), which lets
+    a byte stream be inspected incrementally across packet boundaries.
+    """
+
+    def __init__(self, patterns: Iterable[bytes]):
+        """
+        Build the automaton.
+
+        Args:
+            patterns: Byte patterns; a pattern's id is its position
+        """
+        self.patterns: List[bytes] = list(patterns)
+        self.max_length = max((len(p) for p in self.patterns), default=0)
+
+        # state -> {byte: next state}, failure links, pattern ids ending here
+        self._goto = [{}]
+        self._fail = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            if not pattern:
+                raise ValueError("Empty pattern")
+            self._insert(pattern, pattern_id)
+        self._link()
+
+    def _insert(self, pattern: bytes, pattern_id: int):
+        """Add a pattern to the trie."""
+        state = 0
+        for byte in pattern:
+            next_state = self._goto[state].get(byte)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][byte] = next_state
+            state = next_state
+        self._output[state] += (pattern_id,)
+
+    def _link(self):
+        """Compute failure links breadth-first."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for byte, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and byte not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(byte, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def search(self, data: bytes) -> Set[int]:
+        """
+        Find the patterns occurring in a buffer.
+
+        Returns:
+            Ids of the patterns found
+        """
+        if len(self.patterns) <= SMALL_PATTERN_SET:
+            return {i for i, pattern in enumerate(self.patterns) if pattern in data}
+        return self.feed(data, 0)[0]
+
+    def feed(self, data: bytes, state: int = 0) -> Tuple[Set[int], int]:
+        """
+        Continue matching from a previous state.
+
+        Args:
+            data: Next bytes of a stream
+            state: State returned by the previous call (0 for a new stream)
+
+        Returns:
+            (ids of patterns completed within data, new state)
+        """
+        found = set()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        for byte in data:
+            while state and byte not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(byte, 0)
+            if output[state]:
+                found.update(output[state])
+
+        return found, state
@@ -0,0 +1,266 @@
+"""
+Detector Registry
+Plugin interface for detectors and the dispatcher that runs them
+"""
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Alert fields passed on to the alert manager when a detector sets them
+ALERT_FIELDS = ('source_ip', 'destination_ip', 'destination_port', 'rule_id', 'timestamp')
+
+
+class Detector:
+    """
+    Base class of detector plugins.
+
+    A detector declares what it needs and implements any of three hooks,
+    each returning a list of alert dicts with 'type', 'severity' and
+    'description' (plus any of ALERT_FIELDS):
+
+    - on_packet(packet_info): called for each packet matching the subscription
+    - on_batch(packets): called with each batch of analyzed packets
+    - on_flow(flow): called with each completed flow record
+
+    Subscriptions are checked by the registry before a detector is called:
+    'transports' limits it to packets of those transports, 'ports' to packets
+    with one of those source or destination ports, and 'fields' to packets
+    where all of those fields are set. None (or no fields) means any.
+    """
+
+    # Name used for statistics, latency stages and DETECTOR_ORDER
+    name = 'detector'
+    # IDSConfig flag enabling the detector (None: always enabled)
+    enable_setting: Optional[str] = None
+    # Position in the dispatch list, lowest first
+    order = 100
+    # Whether the detector's alerts count as anomalies in engine statistics
+    reports_anomalies = True
+
+    transports: Optional[FrozenSet[str]] = None
+    ports: Optional[FrozenSet[int]] = None
+    fields: Tuple[str, ...] = ()
+
+    def on_packet(self, packet_info: dict) -> List[dict]:
+        """Analyze one packet."""
+        return []
+
+    def on_batch(self, packets: List[dict]) -> List[dict]:
+        """Analyze a batch of packets."""
+        return []
+
+    def on_flow(self, flow: dict) -> List[dict]:
+        """Analyze a completed flow record."""
+        return []
+
+    def get_statistics(self) -> dict:
+        """Get detector statistics."""
+        return {}
+
+    def get_state(self) -> dict:
+        """
+        Get detector state for checkpointing.
+
+        Called on the packet thread; the result is encoded on another
+        thread, so it must be plain data the detector will not change
+        afterwards. State kept in host records is saved by dump_host().
+        """
+        return {}
+
+    def load_state(self, state: dict):
+        """Restore state saved with get_state()."""
+
+    def dump_host(self, host) -> object:
+        """Get the plain-data state of one host record (None: nothing to save)."""
+        return None
+
+    def load_host(self, host, data):
+        """Restore host record state saved with dump_host() (after load_state())."""
+
+
+def _implements(detector: Detector, hook: str) -> bool:
+    """Check whether a detector overrides one of the base class hooks."""
+    return getattr(type(detector), hook) is not getattr(Detector, hook)
+
+
+class DetectorSlot:
+    """A registered detector with its subscription and cost counters."""
+
+    __slots__ = ('detector', 'name', 'ports', 'fields', 'calls', 'batches', 'flows',
+                 'time_ns', 'alerts')
+
+    def __init__(self, detector: Detector):
+        self.detector = detector
+        self.name = detector.name
+        self.ports = detector.ports
+        self.fields = tuple(detector.fields)
+        self.calls = 0
+        self.batches = 0
+        self.flows = 0
+        self.time_ns = 0
+        self.alerts = 0
+
+    def applies(self, packet_info: dict) -> bool:
+        """Check the port and field subscriptions against a packet."""
+        ports = self.ports
+        if ports is not None and (packet_info.get('dst_port') not in ports
+                                  and packet_info.get('src_port') not in ports):
+            return False
+        for name in self.fields:
+            if packet_info.get(name) is None:
+                return False
+        return True
+
+
+class DetectorRegistry:
+    """
+    Runs registered detectors in order, only on traffic they subscribe to.
+
+    The dispatch lists are built once (per transport for packets, plus the
+    batch and flow hook lists) when detectors are registered or the enabled
+    set changes, so a packet only walks the detectors that declared its
+    transport and are enabled. Time spent in each detector and the alerts it
+    returns are counted per detector; hooks run on the packet thread and do
+    not block, so the elapsed time is their CPU cost.
+    """
+
+    def __init__(self, settings=None, metrics=None):
+        """
+        Initialize detector registry.
+
+        Args:
+            settings: IDS configuration providing the enable flags and DETECTOR_ORDER
+            metrics: Metrics registry receiving per-detector latency (optional)
+        """
+        self.settings = settings
+        self.metrics = metrics
+        self.slots: Dict[str, DetectorSlot] = {}
+        self.packets = 0
+
+        self._by_transport: Dict[str, List[DetectorSlot]] = {}
+        self._any_transport: List[DetectorSlot] = []
+        self._batch: List[DetectorSlot] = []
+        self._flow: List[DetectorSlot] = []
+
+    def register(self, detector: Detector) -> Detector:
+        """
+        Add a detector and rebuild the dispatch lists.
+
+        Raises:
+            ValueError: If a detector with the same name is already registered
+        """
+        if detector.name in self.slots:
+            raise ValueError(f"Duplicate detector name: {detector.name}")
+        self.slots[detector.name] = DetectorSlot(detector)
+        self.build()
+        return detector
+
+    def get(self, name: str) -> Optional[Detector]:
+        """Get a registered detector by name."""
+        slot = self.slots.get(name)
+        return slot.detector if slot else None
+
+    def __iter__(self):
+        return (slot.detector for slot in self.slots.values())
+
+    def host_dumpers(self) -> Dict[str, Callable]:
+        """Get the dump_host() of each detector implementing it, by detector name."""
+        return {slot.name: slot.detector.dump_host for slot in self.slots.values()
+                if _implements(slot.detector, 'dump_host')}
+
+    def is_enabled(self, detector: Detector) -> bool:
+        """Check a detector's enable flag in the settings."""
+        if detector.enable_setting is None or self.settings is None:
+            return True
+        return bool(getattr(self.settings, detector.enable_setting, True))
+
+    def ordered(self) -> List[DetectorSlot]:
+        """Get the enabled detectors in dispatch order."""
+        preferred = list(getattr(self.settings, 'DETECTOR_ORDER', None) or [])
+        rank = {name: i for i, name in enumerate(preferred)}
+        enabled = [s for s in self.slots.values() if self.is_enabled(s.detector)]
+        # Names listed in DETECTOR_ORDER go first, the rest by their own order
+        return sorted(enabled, key=lambda s: (rank.get(s.name, len(rank)), s.detector.order))
+
+    def build(self):
+        """Build the dispatch lists (call again after changing enable flags)."""
+        ordered = self.ordered()
+        packet_slots = [s for s in ordered if _implements(s.detector, 'on_packet')]
+
+        transports = set()
+        for slot in packet_slots:
+            transports |= set(slot.detector.transports or ())
+
+        self._by_transport = {
+            transport: [s for s in packet_slots
+                        if s.detector.transports is None or transport in s.detector.transports]
+            for transport in transports
+        }
+        self._any_transport = [s for s in packet_slots if s.detector.transports is None]
+        self._batch = [s for s in ordered if _implements(s.detector, 'on_batch')]
+        self._flow = [s for s in ordered if _implements(s.detector, 'on_flow')]
+
+    def _record(self, slot: DetectorSlot, elapsed: int, alerts: List[dict]):
+        """Account one hook call."""
+        slot.time_ns += elapsed
+        if alerts:
+            slot.alerts += len(alerts)
+        if self.metrics is not None:
+            self.metrics.observe(slot.name, elapsed)
+
+    def run_packet(self, packet_info: dict) -> Iterable[Tuple[Detector, List[dict]]]:
+        """
+        Run the packet hooks subscribed to a packet.
+
+        Yields:
+            (detector, alerts) for each detector that returned alerts
+        """
+        self.packets += 1
+        slots = self._by_transport.get(packet_info.get('transport'), self._any_transport)
+        for slot in slots:
+            if not slot.applies(packet_info):
+                continue
+            slot.calls += 1
+            start = time.perf_counter_ns()
+            alerts = slot.detector.on_packet(packet_info)
+            self._record(slot, time.perf_counter_ns() - start, alerts)
+            if alerts:
+                yield slot.detector, alerts
+
+    def run_batch(self, packets: List[dict]) -> Iterable[Tuple[Detector, List[dict]]]:
+        """Run the batch hooks; yields (detector, alerts) like run_packet()."""
+        for slot in self._batch:
+            slot.batches += 1
+            start = time.perf_counter_ns()
+            alerts = slot.detector.on_batch(packets)
+            self._record(slot, time.perf_counter_ns() - start, alerts)
+            if alerts:
+                yield slot.detector, alerts
+
+    def run_flow(self, flow: dict) -> Iterable[Tuple[Detector, List[dict]]]:
+        """Run the flow hooks; yields (detector, alerts) like run_packet()."""
+        for slot in self._flow:
+            slot.flows += 1
+            start = time.perf_counter_ns()
+            alerts = slot.detector.on_flow(flow)
+            self._record(slot, time.perf_counter_ns() - start, alerts)
+            if alerts:
+                yield slot.detector, alerts
+
+    def get_statistics(self) -> Dict[str, Dict]:
+        """Get per-detector call counts, time and alerts, in dispatch order."""
+        ordered = self.ordered()
+        enabled = {s.name for s in ordered}
+        ordered += [s for s in self.slots.values() if s.name not in enabled]
+        return {
+            slot.name: {
+                'enabled': slot.name in enabled,
+                'packets': slot.calls,
+                'skipped_packets': self.packets - slot.calls if slot.name in enabled else 0,
+                'batches': slot.batches,
+                'flows': slot.flows,
+                'time_ms': slot.time_ns / 1e6,
+                'mean_us': slot.time_ns / 1e3 / max(slot.calls + slot.batches + slot.flows, 1),
+                'alerts': slot.alerts
+            }
+            for slot in ordered
+        }
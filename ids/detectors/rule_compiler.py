@@ -0,0 +1,569 @@
+"""
+Rule Compiler
+Validates declarative detection rules and compiles them into an indexed matcher
+"""
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from ..core.address import packet_address
+from ..core.app_layer import app_field, qtype_number
+from ..core.reputation import PrefixSet
+from .pattern_matcher import MultiPatternMatcher
+
+SEVERITIES = ('HIGH', 'MEDIUM', 'LOW')
+PROTOCOLS = ('TCP', 'UDP', 'ICMP', 'ANY')
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_PSH = 0x08
+TCP_ACK = 0x10
+
+# TCP flag letters as used by Scapy and Snort
+TCP_FLAG_BITS = {'F': TCP_FIN, 'S': TCP_SYN, 'R': TCP_RST, 'P': TCP_PSH,
+                 'A': TCP_ACK, 'U': 0x20, 'E': 0x40, 'C': 0x80}
+
+# Port ranges up to this size are expanded into the exact-port index
+MAX_EXPANDED_RANGE = 1024
+
+DEFAULT_THRESHOLD_SECONDS = 60
+
+# Application-layer fields: one of the listed values, or all listed substrings
+EXACT_APP_FIELDS = ('http_method', 'dns_qtype')
+TEXT_APP_FIELDS = ('http_uri', 'http_host', 'dns_qname')
+
+
+def flags_to_int(flags) -> int:
+    """Convert TCP flags (integer or letters such as 'SA') to a bitmask."""
+    if isinstance(flags, int):
+        return flags
+    mask = 0
+    for letter in flags or '':
+        mask |= TCP_FLAG_BITS.get(letter.upper(), 0)
+    return mask
+
+
+def _parse_ports(value) -> List[Tuple[int, int]]:
+    """Parse a port, 'lo-hi' range or list of them into (lo, hi) ranges."""
+    items = value if isinstance(value, list) else [value]
+    ranges = []
+    for item in items:
+        if isinstance(item, int):
+            lo = hi = item
+        elif isinstance(item, str) and '-' in item:
+            lo_text, _, hi_text = item.partition('-')
+            lo, hi = int(lo_text), int(hi_text)
+        elif isinstance(item, str):
+            lo = hi = int(item)
+        else:
+            raise ValueError(f"Invalid port: {item!r}")
+
+        if not 0 <= lo <= hi <= 65535:
+            raise ValueError(f"Invalid port range: {item!r}")
+        ranges.append((lo, hi))
+    return ranges
+
+
+def _parse_flags(value: str) -> Tuple[int, int]:
+    """
+    Parse a rule flags expression into (mask, value).
+
+    'SA' matches exactly SYN+ACK (among FSRPAU), 'S+' matches SYN with any
+    other flags set.
+    """
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"Invalid TCP flags: {value!r}")
+
+    at_least = value.endswith('+')
+    letters = value.rstrip('+')
+    for letter in letters:
+        if letter.upper() not in TCP_FLAG_BITS:
+            raise ValueError(f"Invalid TCP flag {letter!r} in {value!r}")
+
+    wanted = flags_to_int(letters)
+    mask = wanted if at_least else 0x3F | wanted
+    return mask, wanted
+
+
+def _parse_payload(value, nocase: bool) -> List[Tuple[bytes, bool]]:
+    """
+    Parse a rule's payload patterns into (bytes, nocase) pairs.
+
+    Patterns are strings (using the rule-level 'nocase') or mappings with
+    'pattern' and an optional per-pattern 'nocase'. Strings are encoded with
+    surrogateescape, so arbitrary bytes round-trip.
+    """
+    items = value if isinstance(value, list) else [value]
+    if not items:
+        raise ValueError("'payload' must not be empty")
+
+    patterns = []
+    for item in items:
+        item_nocase = nocase
+        if isinstance(item, dict):
+            item_nocase = bool(item.get('nocase', nocase))
+            item = item.get('pattern')
+        if not isinstance(item, str) or not item:
+            raise ValueError(f"Invalid payload pattern: {item!r}")
+
+        pattern = item.encode('utf-8', 'surrogateescape')
+        patterns.append((pattern.lower() if item_nocase else pattern, item_nocase))
+    return patterns
+
+
+def _parse_app_field(key: str, value) -> Tuple[object, bool]:
+    """
+    Parse an application-layer rule field.
+
+    Returns:
+        (frozenset of accepted values, True) for exact fields, or
+        (tuple of lowercase substrings, False) for text fields
+    """
+    items = value if isinstance(value, list) else [value]
+    if not items:
+        raise ValueError(f"'{key}' must not be empty")
+
+    if key == 'dns_qtype':
+        return frozenset(qtype_number(item) for item in items), True
+    if key == 'http_method':
+        return frozenset(str(item).upper() for item in items), True
+
+    for item in items:
+        if not isinstance(item, str) or not item:
+            raise ValueError(f"Invalid {key} pattern: {item!r}")
+    return tuple(item.lower() for item in items), False
+
+
+def validate_rule(rule: Dict) -> Dict:
+    """
+    Check a rule definition and fill in defaults.
+
+    Args:
+        rule: Rule dictionary
+
+    Returns:
+        Normalized copy of the rule
+
+    Raises:
+        ValueError: If the rule is invalid
+    """
+    if not isinstance(rule, dict):
+        raise ValueError(f"Rule must be a mapping, got {type(rule).__name__}")
+
+    rule = dict(rule)
+    for key in ('id', 'name'):
+        if not rule.get(key):
+            raise ValueError(f"Rule is missing '{key}': {rule!r}")
+
+    rule_id = rule['id']
+    rule.setdefault('description', rule['name'])
+
+    severity = str(rule.get('severity', 'MEDIUM')).upper()
+    if severity not in SEVERITIES:
+        raise ValueError(f"{rule_id}: invalid severity {rule.get('severity')!r}")
+    rule['severity'] = severity
+
+    protocol = str(rule.get('protocol', 'ANY')).upper()
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"{rule_id}: invalid protocol {rule.get('protocol')!r}")
+    rule['protocol'] = protocol
+
+    try:
+        if 'port' in rule and 'ports' in rule:
+            raise ValueError("use either 'port' or 'ports'")
+        for key in ('port', 'ports', 'src_ports'):
+            if key in rule:
+                _parse_ports(rule[key])
+        if 'flags' in rule:
+            if protocol != 'TCP':
+                raise ValueError("'flags' requires protocol TCP")
+            _parse_flags(rule['flags'])
+        for key in ('src_cidrs', 'dst_cidrs'):
+            for cidr in rule.get(key, []):
+                PrefixSet().add(cidr)
+        if 'payload' in rule:
+            _parse_payload(rule['payload'], bool(rule.get('nocase', False)))
+        for key in EXACT_APP_FIELDS + TEXT_APP_FIELDS:
+            if key in rule:
+                _parse_app_field(key, rule[key])
+        if rule.get('track', 'by_src') not in ('by_src', 'by_dst'):
+            raise ValueError(f"invalid track {rule['track']!r}")
+    except ValueError as e:
+        raise ValueError(f"{rule_id}: {e}")
+
+    threshold = rule.get('threshold', 1)
+    seconds = rule.get('seconds', DEFAULT_THRESHOLD_SECONDS)
+    if not isinstance(threshold, int) or threshold < 1:
+        raise ValueError(f"{rule_id}: threshold must be a positive integer")
+    if not isinstance(seconds, (int, float)) or seconds <= 0:
+        raise ValueError(f"{rule_id}: seconds must be positive")
+    rule['threshold'] = threshold
+    rule['seconds'] = seconds
+
+    return rule
+
+
+def load_rule_file(path: str) -> List[Dict]:
+    """
+    Load rules from a JSON or YAML file.
+
+    The file holds either a list of rules or a mapping with a 'rules' list.
+    YAML support requires PyYAML.
+
+    Raises:
+        ValueError: If the file cannot be parsed or a rule is invalid
+    """
+    with open(path) as f:
+        text = f.read()
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"{path}: PyYAML is required for YAML rule files")
+        data = yaml.safe_load(text)
+    else:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}")
+
+    if isinstance(data, dict):
+        data = data.get('rules', [])
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of rules")
+
+    rules = []
+    for rule in data:
+        try:
+            rules.append(validate_rule(rule))
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}")
+    return rules
+
+
+class CompiledRule:
+    """A validated rule with its predicates prepared for matching."""
+
+    __slots__ = ('rule', 'id', 'order', 'protocol', 'flags_mask', 'flags_value', 'src_ports',
+                 'dst_ports', 'src_cidrs', 'dst_cidrs', 'contents', 'case_ids', 'nocase_ids',
+                 'app_checks', 'track_dst', 'cost')
+
+    def __init__(self, rule: Dict, order: int):
+        self.rule = rule
+        self.id = rule['id']
+        self.order = order
+        self.protocol = rule['protocol']
+
+        self.flags_mask, self.flags_value = (
+            _parse_flags(rule['flags']) if 'flags' in rule else (0, 0)
+        )
+        self.src_ports = (tuple(_parse_ports(rule['src_ports']))
+                          if 'src_ports' in rule else None)
+        # Only checked here for rules the rule set does not index by port
+        self.dst_ports = None
+        self.src_cidrs = self._prefixes(rule.get('src_cidrs'))
+        self.dst_cidrs = self._prefixes(rule.get('dst_cidrs'))
+        self.track_dst = rule.get('track') == 'by_dst'
+        self.app_checks = tuple(
+            (key,) + _parse_app_field(key, rule[key])
+            for key in EXACT_APP_FIELDS + TEXT_APP_FIELDS if key in rule
+        )
+
+        self.contents = (_parse_payload(rule['payload'], bool(rule.get('nocase', False)))
+                         if 'payload' in rule else [])
+        # Ids in the rule set's shared matchers, assigned by CompiledRuleSet
+        self.case_ids = frozenset()
+        self.nocase_ids = frozenset()
+
+        # Relative cost of evaluating the predicates (one unit per check)
+        self.cost = (1 + bool(self.flags_mask) + bool(self.src_ports)
+                     + bool(self.src_cidrs) + bool(self.dst_cidrs) + bool(self.contents)
+                     + len(self.app_checks))
+
+    @staticmethod
+    def _prefixes(cidrs: Optional[List[str]]) -> Optional[PrefixSet]:
+        if not cidrs:
+            return None
+        prefixes = PrefixSet()
+        for cidr in cidrs:
+            prefixes.add(cidr)
+        return prefixes
+
+    @staticmethod
+    def _in_prefixes(prefixes: PrefixSet, packet_info: dict, field: str) -> bool:
+        address = packet_address(packet_info, field)
+        if address is None:
+            return False
+        return prefixes.lookup_address(address) is not None
+
+    def matches_header(self, packet_info: dict) -> bool:
+        """Evaluate the non-indexed header predicates against a packet."""
+        if self.flags_mask:
+            flags = flags_to_int(packet_info.get('flags'))
+            if flags & self.flags_mask != self.flags_value:
+                return False
+
+        if self.src_ports:
+            port = packet_info.get('src_port')
+            if port is None or not any(lo <= port <= hi for lo, hi in self.src_ports):
+                return False
+
+        if self.dst_ports:
+            port = packet_info.get('dst_port')
+            if port is None or not any(lo <= port <= hi for lo, hi in self.dst_ports):
+                return False
+
+        if self.src_cidrs and not self._in_prefixes(self.src_cidrs, packet_info, 'src_addr'):
+            return False
+        if self.dst_cidrs and not self._in_prefixes(self.dst_cidrs, packet_info, 'dst_addr'):
+            return False
+
+        return True
+
+    @property
+    def fast_pattern(self) -> Tuple[bytes, bool]:
+        """The content the rule is indexed by: its longest (the most selective)."""
+        return max(self.contents, key=lambda content: len(content[0]))
+
+    def matches_app(self, packet_info: dict) -> bool:
+        """Evaluate the application-layer predicates (parses the payload lazily)."""
+        for key, values, exact in self.app_checks:
+            value = app_field(packet_info, key)
+            if value is None:
+                return False
+            if exact:
+                if value not in values:
+                    return False
+            else:
+                value = value.lower()
+                for pattern in values:
+                    if pattern not in value:
+                        return False
+        return True
+
+
+def _unindexed(port_ranges) -> bool:
+    """Check whether port ranges would leave a rule out of the exact-port index."""
+    return not port_ranges or any(hi - lo >= MAX_EXPANDED_RANGE for lo, hi in port_ranges)
+
+
+def _index_ports(rules: List[Tuple[CompiledRule, List[Tuple[int, int]]]]):
+    """
+    Build a (protocol, port) index for rules and their port ranges.
+
+    Returns:
+        (index of ordered candidate tuples, per-protocol list of large ranges)
+    """
+    exact: Dict[Tuple[str, int], set] = {}
+    ranges: Dict[str, List[Tuple[int, int, CompiledRule]]] = {}
+
+    for compiled, port_ranges in rules:
+        protocol = compiled.rule['protocol']
+        targets = ('TCP', 'UDP', 'ICMP') if protocol == 'ANY' else (protocol,)
+        for lo, hi in port_ranges:
+            if hi - lo < MAX_EXPANDED_RANGE:
+                for target in targets:
+                    for port in range(lo, hi + 1):
+                        exact.setdefault((target, port), set()).add(compiled)
+            else:
+                ranges.setdefault(protocol, []).append((lo, hi, compiled))
+
+    index = {
+        key: tuple(sorted(bucket, key=lambda r: r.order))
+        for key, bucket in exact.items()
+    }
+    return index, ranges
+
+
+class CompiledRuleSet:
+    """
+    Rules indexed by header, with one shared content matcher.
+
+    Rules with destination ports are indexed by (protocol, destination
+    port); rules that only restrict source ports are indexed by (protocol,
+    source port). Exact ports and small ranges are expanded into
+    dictionaries of pre-merged, ordered candidate lists; large ranges and
+    port-less rules are kept in short per-protocol side lists. All payload
+    patterns are compiled into two Aho-Corasick automata (case-sensitive
+    and case-insensitive), so a payload is scanned at most twice per packet
+    however many content rules are candidates.
+
+    Rules with payload contents that would land in a side list (port-less
+    or large port ranges, typical of imported Snort rules) are indexed by
+    their fast pattern instead: the automata run first, and only the rules
+    whose fast pattern occurs in the payload have their header (ports
+    included) and other options checked.
+    """
+
+    def __init__(self, rules: List[Dict]):
+        """
+        Compile validated rules.
+
+        Args:
+            rules: Rules as returned by validate_rule()
+        """
+        self.rules = [CompiledRule(rule, order) for order, rule in enumerate(rules)]
+
+        by_dst = []
+        by_src = []
+        by_content = []
+        self.any_port: Dict[str, List[CompiledRule]] = {}
+
+        for compiled in self.rules:
+            rule = compiled.rule
+            port_spec = rule.get('ports', rule.get('port'))
+            dst_ports = _parse_ports(port_spec) if port_spec is not None else None
+            if compiled.contents and _unindexed(dst_ports or compiled.src_ports or []):
+                compiled.dst_ports = tuple(dst_ports) if dst_ports else None
+                by_content.append(compiled)
+            elif dst_ports is not None:
+                by_dst.append((compiled, dst_ports))
+            elif compiled.src_ports:
+                by_src.append((compiled, list(compiled.src_ports)))
+            else:
+                self.any_port.setdefault(rule['protocol'], []).append(compiled)
+
+        self.index, self.ranges = _index_ports(by_dst)
+        self.src_index, self.src_ranges = _index_ports(by_src)
+
+        # Deduplicated patterns shared by all rules
+        case_patterns: Dict[bytes, int] = {}
+        nocase_patterns: Dict[bytes, int] = {}
+        for compiled in self.rules:
+            case_ids = set()
+            nocase_ids = set()
+            for pattern, nocase in compiled.contents:
+                table, ids = ((nocase_patterns, nocase_ids) if nocase
+                              else (case_patterns, case_ids))
+                ids.add(table.setdefault(pattern, len(table)))
+            compiled.case_ids = frozenset(case_ids)
+            compiled.nocase_ids = frozenset(nocase_ids)
+
+        # Fast pattern id -> port-less content rules indexed by it
+        self.fast_case: Dict[int, List[CompiledRule]] = {}
+        self.fast_nocase: Dict[int, List[CompiledRule]] = {}
+        for compiled in by_content:
+            pattern, nocase = compiled.fast_pattern
+            if nocase:
+                self.fast_nocase.setdefault(nocase_patterns[pattern], []).append(compiled)
+            else:
+                self.fast_case.setdefault(case_patterns[pattern], []).append(compiled)
+
+        self.case_matcher = MultiPatternMatcher(case_patterns)
+        self.nocase_matcher = MultiPatternMatcher(nocase_patterns)
+        self.needs_payload = bool(case_patterns or nocase_patterns)
+
+    @staticmethod
+    def _lookup(index, ranges, protocol, port, found: List[CompiledRule]):
+        """Append indexed candidates for a port to found."""
+        if port is None:
+            return
+        found.extend(index.get((protocol, port), ()))
+        for proto in (protocol, 'ANY'):
+            for lo, hi, compiled in ranges.get(proto, ()):
+                if lo <= port <= hi:
+                    found.append(compiled)
+
+    def candidates(self, protocol: Optional[str], dst_port: Optional[int],
+                   src_port: Optional[int] = None) -> List[CompiledRule]:
+        """Get the rules whose indexed header fields match."""
+        found: List[CompiledRule] = []
+        self._lookup(self.index, self.ranges, protocol, dst_port, found)
+        self._lookup(self.src_index, self.src_ranges, protocol, src_port, found)
+        found.extend(self.any_port.get(protocol, ()))
+        found.extend(self.any_port.get('ANY', ()))
+        return found
+
+    def match(self, packet_info: dict) -> List[CompiledRule]:
+        """Get all rules matching a packet."""
+        matched = []
+        case_found = None
+        nocase_found = None
+
+        protocol = packet_info.get('transport')
+        found = self.candidates(protocol, packet_info.get('dst_port'),
+                                packet_info.get('src_port'))
+
+        # Port-less content rules: scan first, then only those whose fast pattern occurs
+        payload = packet_info.get('payload')
+        if payload and (self.fast_case or self.fast_nocase):
+            hits = []
+            if self.fast_case:
+                case_found = self.case_matcher.search(payload)
+                for pattern_id in case_found:
+                    hits.extend(self.fast_case.get(pattern_id, ()))
+            if self.fast_nocase:
+                nocase_found = self.nocase_matcher.search(payload.lower())
+                for pattern_id in nocase_found:
+                    hits.extend(self.fast_nocase.get(pattern_id, ()))
+            hits = [r for r in hits if r.protocol == protocol or r.protocol == 'ANY']
+            if hits:
+                found.extend(hits)
+                found.sort(key=lambda r: r.order)
+
+        for compiled in found:
+            if not compiled.matches_header(packet_info):
+                continue
+            if compiled.app_checks and not compiled.matches_app(packet_info):
+                continue
+
+            if compiled.contents:
+                payload = packet_info.get('payload')
+                if not payload:
+                    continue
+                # Each automaton runs at most once per packet
+                if compiled.case_ids:
+                    if case_found is None:
+                        case_found = self.case_matcher.search(payload)
+                    if not compiled.case_ids <= case_found:
+                        continue
+                if compiled.nocase_ids:
+                    if nocase_found is None:
+                        nocase_found = self.nocase_matcher.search(payload.lower())
+                    if not compiled.nocase_ids <= nocase_found:
+                        continue
+
+            matched.append(compiled)
+
+        return matched
+
+    def ports(self) -> set:
+        """Get every destination port referenced by an indexed rule."""
+        return {port for _, port in self.index}
+
+    def report(self) -> Dict:
+        """
+        Describe the compiled rule set and estimate its per-packet cost.
+
+        Costs are in predicate checks: the average and worst case over
+        indexed destination ports, plus the side lists every packet of a
+        protocol pays. Payload scans are one automaton pass per packet.
+        """
+        bucket_costs = [sum(r.cost for r in bucket) for bucket in self.index.values()]
+        always = {
+            proto: sum(r.cost for r in self.any_port.get(proto, ()))
+                   + sum(r.cost for r in self.any_port.get('ANY', ()))
+                   + len(self.ranges.get(proto, ())) + len(self.ranges.get('ANY', ()))
+                   + len(self.src_ranges.get(proto, ())) + len(self.src_ranges.get('ANY', ()))
+            for proto in ('TCP', 'UDP', 'ICMP')
+        }
+        return {
+            'rules': len(self.rules),
+            'indexed_ports': len(self.index),
+            'indexed_src_ports': len(self.src_index),
+            'range_rules': (sum(len(v) for v in self.ranges.values())
+                            + sum(len(v) for v in self.src_ranges.values())),
+            'any_port_rules': sum(len(v) for v in self.any_port.values()),
+            'fast_pattern_rules': (sum(len(v) for v in self.fast_case.values())
+                                   + sum(len(v) for v in self.fast_nocase.values())),
+            'payload_rules': sum(1 for r in self.rules if r.contents),
+            'app_layer_rules': sum(1 for r in self.rules if r.app_checks),
+            'content_patterns': len(self.case_matcher.patterns) + len(self.nocase_matcher.patterns),
+            'matcher_states': self.case_matcher.states + self.nocase_matcher.states,
+            'avg_indexed_cost': (sum(bucket_costs) / len(bucket_costs)) if bucket_costs else 0,
+            'max_indexed_cost': max(bucket_costs, default=0),
+            'unindexed_cost': always
+        }
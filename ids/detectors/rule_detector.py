@@ -2,16 +2,113 @@
 Rule-Based Detection Engine
 Detects attacks based on predefined rules
 """
-from typing import List, Dict
-import re
+from collections import OrderedDict
+from typing import Callable, List, Dict
+import time
 
-class RuleDetector:
+from ..core.file_watcher import FileWatcher
+from .rule_compiler import CompiledRuleSet, load_rule_file, validate_rule
+from .registry import Detector
+from .snort_importer import load_snort_rules
+
+# Maximum number of (rule, source) threshold counters kept
+MAX_THRESHOLD_ENTRIES = 100000
+
+class RuleDetector(Detector):
     """Detects attacks using signature-based rules."""
     
-    def __init__(self):
-        """Initialize rule detector."""
-        self.rules = self._load_default_rules()
+    name = 'rule_detector'
+    enable_setting = 'ENABLE_RULE_DETECTION'
+    order = 50
+    reports_anomalies = False
+    fields = ('src_ip',)
+    
+    def __init__(self, rule_files: List[str] = None, reload_interval: float = 10.0,
+                 snort_files: List[str] = None, snort_variables: Dict[str, str] = None):
+        """
+        Initialize rule detector.
+        
+        Args:
+            rule_files: JSON/YAML rule files loaded on top of the default rules
+            reload_interval: Seconds between checks for changed rule files
+            snort_files: Snort/Suricata rule files imported on top of the default rules
+            snort_variables: Values for $VARIABLES used in the Snort rules
+        """
+        self.rule_files = list(rule_files or [])
+        self.snort_files = list(snort_files or [])
+        self.snort_variables = dict(snort_variables or {})
+        self.import_errors: List[str] = []
+        self.missing_files: List[str] = []
+        self.custom_rules = []
         self.alerts = []
+        self.on_reload: List[Callable[[], None]] = []
+        
+        # (rule id, source ip) -> [window start, hits, alerted]
+        self.threshold_state = OrderedDict()
+        
+        self.rules = []
+        self.compiled = None
+        self.reload()
+        
+        watched = self.rule_files + self.snort_files
+        self.watcher = FileWatcher(watched, self.reload, interval=reload_interval)
+        if watched:
+            self.watcher.start()
+    
+    def reload(self):
+        """
+        (Re)load rule files and recompile the rule set.
+        
+        The new rule set is compiled completely before being swapped in with
+        a single assignment, so check_packet never waits and never sees a
+        half-built matcher. Invalid files leave the current rules in place;
+        Snort rules outside the supported subset are skipped and listed in
+        import_errors. Missing files are skipped with a warning (listed in
+        missing_files) and picked up once they appear.
+        
+        Raises:
+            ValueError: If a rule file is invalid
+        """
+        rules = {rule['id']: rule for rule in map(validate_rule, self._load_default_rules())}
+        missing = []
+        for path in self.rule_files:
+            try:
+                loaded = load_rule_file(path)
+            except FileNotFoundError:
+                missing.append(path)
+                continue
+            for rule in loaded:
+                rules[rule['id']] = rule
+        
+        import_errors = []
+        for path in self.snort_files:
+            try:
+                imported, errors = load_snort_rules(path, self.snort_variables)
+            except FileNotFoundError:
+                missing.append(path)
+                continue
+            import_errors.extend(errors)
+            for rule in imported:
+                rules[rule['id']] = rule
+        self.import_errors = import_errors
+        
+        for path in missing:
+            if path not in self.missing_files:
+                print(f"\n⚠️  Rule file not found, skipping: {path}")
+        self.missing_files = missing
+        
+        for rule in self.custom_rules:
+            rules[rule['id']] = rule
+        
+        self._install(list(rules.values()))
+    
+    def _install(self, rules: List[Dict]):
+        """Compile rules and swap them in."""
+        compiled = CompiledRuleSet(rules)
+        self.rules, self.compiled = rules, compiled
+        
+        for callback in self.on_reload:
+            callback()
     
     def _load_default_rules(self) -> List[Dict]:
         """Load default detection rules."""
@@ -76,40 +173,122 @@ class RuleDetector:
         alerts = []
         
         dst_port = packet_info.get('dst_port')
-        protocol = packet_info.get('transport')
         src_ip = packet_info.get('src_ip')
         
-        if not (dst_port and protocol and src_ip):
+        if not src_ip:
             return alerts
         
-        # Check each rule
-        for rule in self.rules:
-            if (rule['port'] == dst_port and 
-                rule['protocol'] == protocol):
-                
-                alert = {
-                    'rule_id': rule['id'],
-                    'rule_name': rule['name'],
-                    'severity': rule['severity'],
-                    'source_ip': src_ip,
-                    'destination_port': dst_port,
-                    'description': rule['description'],
-                    'timestamp': packet_info.get('timestamp')
-                }
-                
-                alerts.append(alert)
-                self.alerts.append(alert)
+        # Only rules whose protocol/port index matches are evaluated
+        matched = self.compiled.match(packet_info)
+        if not matched:
+            return alerts
+        
+        # Replayed captures are thresholded in capture time
+        now = packet_info.get('capture_time') or time.time()
+        for compiled in matched:
+            rule = compiled.rule
+            tracked_ip = packet_info.get('dst_ip') if compiled.track_dst else src_ip
+            
+            if not self._threshold_reached(rule, tracked_ip, now):
+                continue
+            
+            alert = {
+                'rule_id': rule['id'],
+                'rule_name': rule['name'],
+                'severity': rule['severity'],
+                'source_ip': src_ip,
+                'destination_port': dst_port,
+                'description': rule['description'],
+                'timestamp': packet_info.get('timestamp')
+            }
+            
+            alerts.append(alert)
+            self.alerts.append(alert)
         
         return alerts
     
+    def on_packet(self, packet_info: dict) -> List[Dict]:
+        """Check a packet against the rules, named by rule in the alert format."""
+        return [
+            {
+                'type': alert['rule_name'],
+                'severity': alert['severity'],
+                'description': alert['description'],
+                'source_ip': alert['source_ip'],
+                'destination_port': alert['destination_port'],
+                'rule_id': alert['rule_id']
+            }
+            for alert in self.check_packet(packet_info)
+        ]
+
+    def on_flow(self, flow: dict) -> List[Dict]:
+        """
+        Check a flow record against the rules' header predicates.
+
+        A flow counts as one hit towards a rule's threshold (one connection
+        attempt rather than each of its packets), and its TCP flags are those
+        of all its packets combined. Flows carry no payload, so content and
+        application-layer rules never match them.
+        """
+        return self.on_packet(flow)
+
+    def _threshold_reached(self, rule: Dict, tracked_ip: str, now: float) -> bool:
+        """
+        Count a rule hit for the tracked (source or destination) address.
+        
+        Returns True once per 'seconds' window, when the address's hit count
+        in that window reaches the rule's threshold.
+        """
+        key = (rule['id'], tracked_ip)
+        state = self.threshold_state.get(key)
+        
+        if state is None or now - state[0] >= rule['seconds']:
+            state = [now, 0, False]
+            self.threshold_state[key] = state
+            if len(self.threshold_state) > MAX_THRESHOLD_ENTRIES:
+                self.threshold_state.popitem(last=False)
+        self.threshold_state.move_to_end(key)
+        
+        state[1] += 1
+        if state[1] >= rule['threshold'] and not state[2]:
+            state[2] = True
+            return True
+        return False
+    
     def add_rule(self, rule: Dict):
-        """Add a custom detection rule."""
-        self.rules.append(rule)
+        """
+        Add a custom detection rule.
+        
+        Raises:
+            ValueError: If the rule is invalid or its id is already in use
+        """
+        rule = validate_rule(rule)
+        if any(existing['id'] == rule['id'] for existing in self.rules):
+            raise ValueError(f"Duplicate rule id: {rule['id']}")
+        
+        self.custom_rules.append(rule)
+        self._install(self.rules + [rule])
+    
+    def get_rule_report(self) -> Dict:
+        """Get rule set size, match-cost estimates and import problems."""
+        report = self.compiled.report()
+        report['import_errors'] = len(self.import_errors)
+        report['missing_files'] = len(self.missing_files)
+        report['relaxed_rules'] = sum(1 for rule in self.rules if rule.get('relaxed_options'))
+        return report
     
     def get_alerts(self, limit: int = 100) -> List[Dict]:
         """Get recent alerts."""
         return self.alerts[-limit:]
     
+    def get_state(self) -> Dict:
+        """Get detector state for checkpointing."""
+        return {'alerts': self.alerts[-1000:]}
+    
+    def load_state(self, state: Dict):
+        """Restore state saved with get_state()."""
+        self.alerts = list(state.get('alerts', []))
+    
     def get_statistics(self) -> Dict:
         """Get rule detection statistics."""
         severity_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
@@ -121,5 +300,6 @@ class RuleDetector:
         return {
             'total_alerts': len(self.alerts),
             'by_severity': severity_counts,
+            'rule_set': self.get_rule_report(),
             'recent_alerts': self.alerts[-10:]
         }
\ No newline at end of file
@@ -0,0 +1,477 @@
+"""
+Scan Detection Engine
+Detects slow, horizontal and distributed scans over long time horizons
+"""
+import math
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+import time
+
+from ..core.address import address_to_int, packet_address
+from ..core.config import IDSConfig, config
+from ..core.hosts import HostRecord, HostTable
+from .rule_compiler import TCP_ACK, TCP_RST, TCP_SYN, flags_to_int
+from .registry import Detector
+
+# Items are hashed with a salt and then mixed (Fibonacci hashing), so even
+# sequential ports land on random-looking bits as linear counting assumes
+_SALT = 0x5BD1E995
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+# ICMP (v4) and ICMPv6 destination unreachable types
+UNREACHABLE = {4: 3, 6: 1}
+
+# (source address, destination address, source port, destination port)
+ProbeKey = Tuple[int, int, int, int]
+
+
+class DecayingBitmap:
+    """
+    Linear-counting distinct-count sketch over a sliding time horizon.
+
+    The horizon is split into generations, each a bitmap stored as a Python
+    int; an item sets one bit in the current generation. The number of
+    distinct items over the horizon is estimated from the zero bits of the
+    union of all generations (-m * ln(zeros / m)), and whole generations
+    fall off as time advances, so memory stays fixed however long a scan runs.
+    """
+
+    __slots__ = ('epoch', 'generations')
+
+    def __init__(self, epoch: int, generations: int):
+        self.epoch = epoch
+        self.generations = [0] * generations
+
+    def _advance(self, epoch: int):
+        """Rotate out generations older than the horizon."""
+        steps = epoch - self.epoch
+        if steps <= 0:
+            return
+        count = len(self.generations)
+        if steps >= count:
+            self.generations = [0] * count
+        else:
+            self.generations = [0] * steps + self.generations[:count - steps]
+        self.epoch = epoch
+
+    def add(self, bit: int, epoch: int) -> bool:
+        """
+        Set an item's bit.
+
+        Returns:
+            True if the bit was new (the estimate may have changed)
+        """
+        self._advance(epoch)
+        mask = 1 << bit
+        if self.generations[0] & mask:
+            return False
+        self.generations[0] |= mask
+        return not any(g & mask for g in self.generations[1:])
+
+    def dump(self) -> list:
+        """Get the epoch and generations as plain data (bitmaps as hex)."""
+        return [self.epoch, [format(g, 'x') for g in self.generations]]
+
+    @classmethod
+    def load(cls, data: list, generations: int) -> 'DecayingBitmap':
+        """Restore a bitmap saved with dump()."""
+        epoch, saved = data
+        bitmap = cls(epoch, generations)
+        for i, value in enumerate(saved[:generations]):
+            bitmap.generations[i] = int(value, 16)
+        return bitmap
+
+    def estimate(self, bits: int) -> float:
+        """Estimate the number of distinct items over the horizon."""
+        union = 0
+        for generation in self.generations:
+            union |= generation
+        zeros = bits - bin(union).count('1')
+        if zeros == 0:
+            # Saturated: report the largest estimate the bitmap can give
+            return bits * math.log(bits)
+        return -bits * math.log(zeros / bits)
+
+
+class SourceRecord:
+    """Distinct destination ports and hosts one source failed to reach."""
+
+    __slots__ = ('ports', 'hosts', 'alerted')
+
+    def __init__(self, epoch: int, generations: int):
+        self.ports = DecayingBitmap(epoch, generations)
+        self.hosts = DecayingBitmap(epoch, generations)
+        self.alerted = {}
+
+    def dump(self) -> list:
+        return [self.ports.dump(), self.hosts.dump(), self.alerted]
+
+    @classmethod
+    def load(cls, data: list, generations: int) -> 'SourceRecord':
+        ports, hosts, alerted = data
+        record = cls(0, generations)
+        record.ports = DecayingBitmap.load(ports, generations)
+        record.hosts = DecayingBitmap.load(hosts, generations)
+        record.alerted = dict(alerted)
+        return record
+
+
+class TargetRecord:
+    """Distinct ports that failed on one destination, and the sources probing it."""
+
+    __slots__ = ('ports', 'sources', 'alerted')
+
+    def __init__(self, epoch: int, generations: int):
+        self.ports = DecayingBitmap(epoch, generations)
+        self.sources = DecayingBitmap(epoch, generations)
+        self.alerted = {}
+
+    def dump(self) -> list:
+        return [self.ports.dump(), self.sources.dump(), self.alerted]
+
+    @classmethod
+    def load(cls, data: list, generations: int) -> 'TargetRecord':
+        ports, sources, alerted = data
+        record = cls(0, generations)
+        record.ports = DecayingBitmap.load(ports, generations)
+        record.sources = DecayingBitmap.load(sources, generations)
+        record.alerted = dict(alerted)
+        return record
+
+
+class ScanDetector(Detector):
+    """
+    Detects scans too slow or too spread out for per-window checks.
+
+    Only failed connection attempts are counted. Attempts (TCP SYNs without
+    ACK, and UDP packets that do not look like replies from a service port)
+    wait in a bounded pending table; a SYN-ACK or any UDP reply removes
+    them, while a RST, an ICMP unreachable quoting them, or no answer within
+    SCAN_PROBE_TIMEOUT makes them failed probes. Busy clients (resolvers,
+    NAT gateways, browsers) get answers and so never look like scanners.
+
+    Per source, distinct destination ports of failed probes reveal vertical
+    scans and distinct hosts reveal horizontal scans (one port, many
+    hosts); per destination, many failed ports from several sources reveal
+    a distributed scan. Every record holds fixed-size decaying bitmaps and
+    lives in the shared host table, which bounds the number of hosts.
+    """
+
+    name = 'scan_detector'
+    enable_setting = 'ENABLE_SCAN_DETECTION'
+    order = 20
+    transports = frozenset({'TCP', 'UDP', 'ICMP'})
+    fields = ('src_ip', 'dst_ip')
+
+    def __init__(self, settings: IDSConfig = None, hosts: HostTable = None):
+        """
+        Initialize scan detector.
+
+        Args:
+            settings: IDS configuration (defaults to the global config)
+            hosts: Shared host table (a private one is created if omitted)
+        """
+        self.settings = settings or config
+        self.bits = self.settings.SCAN_SKETCH_BITS
+        self.generations = self.settings.SCAN_GENERATIONS
+        self.generation_seconds = self.settings.SCAN_HORIZON / self.generations
+        self.probe_timeout = self.settings.SCAN_PROBE_TIMEOUT
+        self.max_pending = self.settings.SCAN_MAX_PENDING
+
+        # Source and target sketches live in the host records
+        self.hosts = hosts if hosts is not None else HostTable(self.settings.HOST_TABLE_SIZE)
+
+        # Unanswered attempts, oldest first: probe key -> time sent
+        self.pending: 'OrderedDict[ProbeKey, float]' = OrderedDict()
+
+        self.probes = 0
+        self.answered = 0
+        self.failed = 0
+        self.anomalies = []
+
+        # Whether saved sketches match this horizon layout (see load_state)
+        self._sketches_compatible = True
+
+        # Host records holding a sketch, counted here for statistics
+        self.tracked_sources = 0
+        self.tracked_targets = 0
+        self.hosts.evict_hooks.append(self._forget)
+
+    def _bit(self, value) -> int:
+        """Map an item to a bitmap position."""
+        return (((hash((value, _SALT)) & _MASK64) * _MIX & _MASK64) >> 32) % self.bits
+
+    @staticmethod
+    def _is_probe(packet_info: dict) -> bool:
+        """Check whether a packet is a connection attempt."""
+        transport = packet_info.get('transport')
+        if transport == 'TCP':
+            flags = flags_to_int(packet_info.get('flags'))
+            return flags & (TCP_SYN | TCP_ACK) == TCP_SYN
+        if transport == 'UDP':
+            src_port = packet_info.get('src_port') or 0
+            dst_port = packet_info.get('dst_port') or 0
+            # A service port answering an ephemeral port is a reply
+            return not (src_port < 1024 <= dst_port)
+        return False
+
+    def _should_alert(self, record, kind: str, epoch: int) -> bool:
+        """Allow one alert per record and scan kind per horizon."""
+        last = record.alerted.get(kind)
+        if last is not None and epoch - last < self.generations:
+            return False
+        record.alerted[kind] = epoch
+        return True
+
+    def analyze_packet(self, packet_info: dict) -> List[dict]:
+        """
+        Analyze a packet for scanning activity.
+
+        Args:
+            packet_info: Packet information dictionary
+
+        Returns:
+            List of detected anomalies
+        """
+        src = packet_address(packet_info, 'src_addr')
+        dst = packet_address(packet_info, 'dst_addr')
+        if src is None or dst is None:
+            return []
+        now = packet_info.get('capture_time') or time.time()
+        anomalies = self._expire(now)
+
+        transport = packet_info.get('transport')
+        if transport == 'ICMP':
+            failed = self._icmp_failure(packet_info, dst)
+            if failed:
+                anomalies.extend(self._count_failed(failed, now))
+            return anomalies
+
+        src_port = packet_info.get('src_port') or 0
+        dst_port = packet_info.get('dst_port')
+        if dst_port is None:
+            return anomalies
+
+        # An answer (or refusal) settles the attempt it replies to
+        reply_key = (dst, src, dst_port, src_port)
+        if reply_key in self.pending:
+            flags = flags_to_int(packet_info.get('flags')) if transport == 'TCP' else 0
+            if flags & TCP_RST:
+                del self.pending[reply_key]
+                anomalies.extend(self._count_failed(reply_key, now))
+            elif transport == 'UDP' or flags & (TCP_SYN | TCP_ACK) == (TCP_SYN | TCP_ACK):
+                del self.pending[reply_key]
+                self.answered += 1
+            return anomalies
+
+        if self._is_probe(packet_info):
+            key = (src, dst, src_port, dst_port)
+            if key not in self.pending:
+                self.probes += 1
+                self.pending[key] = now
+                if len(self.pending) > self.max_pending:
+                    # Too many open attempts: the oldest counts as unanswered
+                    oldest, _ = self.pending.popitem(last=False)
+                    anomalies.extend(self._count_failed(oldest, now))
+
+        return anomalies
+
+    def _icmp_failure(self, packet_info: dict, prober: int) -> Optional[ProbeKey]:
+        """Get the pending attempt an ICMP unreachable refers to, removing it."""
+        if packet_info.get('type') != UNREACHABLE.get(packet_info.get('ip_version', 4)):
+            return None
+        quoted_ip = packet_info.get('quoted_dst_ip')
+        if quoted_ip is None:
+            return None
+        try:
+            target = address_to_int(quoted_ip)
+        except ValueError:
+            return None
+        key = (prober, target, packet_info.get('quoted_src_port') or 0,
+               packet_info.get('quoted_dst_port') or 0)
+        if self.pending.pop(key, None) is None:
+            return None
+        return key
+
+    def _expire(self, now: float) -> List[dict]:
+        """Count attempts left unanswered for longer than the probe timeout."""
+        anomalies = []
+        pending = self.pending
+        deadline = now - self.probe_timeout
+        while pending:
+            key, sent = next(iter(pending.items()))
+            if sent > deadline:
+                break
+            del pending[key]
+            anomalies.extend(self._count_failed(key, now))
+        return anomalies
+
+    def _count_failed(self, key: ProbeKey, now: float) -> List[dict]:
+        """Add a failed attempt to its source's and target's sketches."""
+        src, dst, _, dst_port = key
+        self.failed += 1
+        src_host = self.hosts.get(src)
+        dst_host = self.hosts.get(dst)
+        epoch = int(now / self.generation_seconds)
+        port_bit = self._bit(dst_port)
+        anomalies = []
+
+        source = src_host.scan_source
+        if source is None:
+            source = src_host.scan_source = SourceRecord(epoch, self.generations)
+            self.tracked_sources += 1
+        new_port = source.ports.add(port_bit, epoch)
+        new_host = source.hosts.add(self._bit(dst_host.address), epoch)
+        if new_port or new_host:
+            anomaly = self._check_source(src_host, source, epoch)
+            if anomaly:
+                anomalies.append(anomaly)
+
+        target = dst_host.scan_target
+        if target is None:
+            target = dst_host.scan_target = TargetRecord(epoch, self.generations)
+            self.tracked_targets += 1
+        new_port = target.ports.add(port_bit, epoch)
+        new_source = target.sources.add(self._bit(src_host.address), epoch)
+        if new_port or new_source:
+            anomaly = self._check_target(dst_host, target, epoch)
+            if anomaly:
+                anomalies.append(anomaly)
+
+        self.anomalies.extend(anomalies)
+        return anomalies
+
+    on_packet = analyze_packet
+
+    def _anomaly(self, scan_type: str, source_ip: Optional[str], description: str,
+                 **fields) -> dict:
+        """Build a scan anomaly."""
+        anomaly = {
+            'type': scan_type,
+            'severity': 'HIGH',
+            'source_ip': source_ip,
+            'description': description,
+            'horizon': self.settings.SCAN_HORIZON,
+            'timestamp': datetime.now().isoformat()
+        }
+        anomaly.update(fields)
+        return anomaly
+
+    def _check_source(self, host: HostRecord, record: SourceRecord,
+                      epoch: int) -> Optional[dict]:
+        """Check one source for vertical and horizontal scanning."""
+        ports = record.ports.estimate(self.bits)
+        hosts = record.hosts.estimate(self.bits)
+        horizon = self.settings.SCAN_HORIZON / 60
+
+        if ports >= self.settings.SCAN_VERTICAL_PORTS and self._should_alert(record, 'vertical', epoch):
+            src_ip = host.ip
+            return self._anomaly(
+                'Vertical Port Scan', src_ip,
+                f"IP {src_ip} failed to reach ~{ports:.0f} ports on ~{hosts:.0f} hosts "
+                f"within {horizon:.0f} min",
+                ports_estimate=round(ports), hosts_estimate=round(hosts)
+            )
+        if (hosts >= self.settings.SCAN_HORIZONTAL_HOSTS
+                and ports <= self.settings.SCAN_HORIZONTAL_MAX_PORTS
+                and self._should_alert(record, 'horizontal', epoch)):
+            src_ip = host.ip
+            return self._anomaly(
+                'Horizontal Scan', src_ip,
+                f"IP {src_ip} failed to reach ~{hosts:.0f} hosts on ~{ports:.0f} ports "
+                f"within {horizon:.0f} min",
+                ports_estimate=round(ports), hosts_estimate=round(hosts)
+            )
+        return None
+
+    def _check_target(self, host: HostRecord, record: TargetRecord,
+                      epoch: int) -> Optional[dict]:
+        """Check one destination for a scan spread over many sources."""
+        ports = record.ports.estimate(self.bits)
+        if ports < self.settings.SCAN_DISTRIBUTED_PORTS:
+            return None
+        sources = record.sources.estimate(self.bits)
+        if sources < self.settings.SCAN_DISTRIBUTED_SOURCES:
+            return None
+        if not self._should_alert(record, 'distributed', epoch):
+            return None
+
+        horizon = self.settings.SCAN_HORIZON / 60
+        dst_ip = host.ip
+        return self._anomaly(
+            'Distributed Port Scan', None,
+            f"~{ports:.0f} closed ports on {dst_ip} probed by ~{sources:.0f} sources "
+            f"within {horizon:.0f} min",
+            destination_ip=dst_ip, ports_estimate=round(ports),
+            sources_estimate=round(sources)
+        )
+
+    def get_statistics(self) -> dict:
+        """Get scan detection statistics."""
+        return {
+            'probes': self.probes,
+            'answered': self.answered,
+            'failed': self.failed,
+            'pending': len(self.pending),
+            'tracked_sources': self.tracked_sources,
+            'tracked_targets': self.tracked_targets,
+            'total_anomalies': len(self.anomalies),
+            'recent_anomalies': self.anomalies[-10:]
+        }
+
+    def get_state(self) -> dict:
+        """
+        Get detector state for checkpointing.
+
+        The sketches (generations and epoch) are saved, so scans slower
+        than the restart interval are still caught; pending attempts, which
+        settle within SCAN_PROBE_TIMEOUT, are not.
+        """
+        return {
+            'anomalies': self.anomalies[-self.settings.MAX_ALERTS_IN_MEMORY:],
+            'generation_seconds': self.generation_seconds
+        }
+
+    def load_state(self, state: dict):
+        """Restore state saved with get_state()."""
+        self.anomalies = list(state.get('anomalies', []))
+        # Sketches of another horizon layout cannot be reused
+        self._sketches_compatible = state.get('generation_seconds') == self.generation_seconds
+
+    def dump_host(self, host: HostRecord) -> object:
+        """Get a host's sketches as a source and as a target."""
+        if host.scan_source is None and host.scan_target is None:
+            return None
+        return [host.scan_source.dump() if host.scan_source is not None else None,
+                host.scan_target.dump() if host.scan_target is not None else None]
+
+    def load_host(self, host: HostRecord, data):
+        """Restore sketches saved with dump_host()."""
+        if not self._sketches_compatible:
+            return
+        source, target = data
+        if source is not None:
+            if host.scan_source is None:
+                self.tracked_sources += 1
+            host.scan_source = SourceRecord.load(source, self.generations)
+        if target is not None:
+            if host.scan_target is None:
+                self.tracked_targets += 1
+            host.scan_target = TargetRecord.load(target, self.generations)
+
+    def _forget(self, host: HostRecord):
+        """Drop the counts of a host evicted from the host table."""
+        if host.scan_source is not None:
+            self.tracked_sources -= 1
+        if host.scan_target is not None:
+            self.tracked_targets -= 1
+
+    def reset(self):
+        """Reset detector state."""
+        for host in self.hosts:
+            host.scan_source = host.scan_target = None
+        self.tracked_sources = self.tracked_targets = 0
+        self.pending.clear()
+        self.anomalies.clear()
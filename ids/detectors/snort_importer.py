@@ -0,0 +1,371 @@
+"""
+Snort/Suricata Rule Importer
+Translates a practical subset of Snort rule syntax into native rules
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .rule_compiler import validate_rule
+
+PRIORITY_SEVERITY = {1: 'HIGH', 2: 'MEDIUM', 3: 'LOW', 4: 'LOW'}
+
+PROTOCOL_MAP = {'tcp': 'TCP', 'udp': 'UDP', 'icmp': 'ICMP', 'ip': 'ANY'}
+
+# Snort's reserved-bit flag names
+FLAG_ALIASES = {'1': 'C', '2': 'E'}
+
+# Options with no effect on matching here
+IGNORED_OPTIONS = {'rev', 'gid', 'classtype', 'reference', 'metadata', 'target'}
+
+# Options that narrow a match and are dropped (the imported rule matches more)
+RELAXED_OPTIONS = {'depth', 'offset', 'distance', 'within', 'fast_pattern', 'rawbytes',
+                   'http_header', 'http_raw_header', 'http_cookie', 'http_client_body',
+                   'http_stat_code', 'http_stat_msg', 'flow'}
+
+# Content modifiers (apply to the previous content) mapped to native rule fields
+BUFFER_MODIFIERS = {'http_uri': 'http_uri', 'http_raw_uri': 'http_uri',
+                    'http_method': 'http_method', 'http_host': 'http_host',
+                    'http_raw_host': 'http_host'}
+
+# Suricata sticky buffers (apply to the following contents)
+STICKY_BUFFERS = {'http.uri': 'http_uri', 'http.uri.raw': 'http_uri',
+                  'http.method': 'http_method', 'http.host': 'http_host',
+                  'http.host.raw': 'http_host', 'dns.query': 'dns_qname',
+                  'dns_query': 'dns_qname', 'pkt_data': None}
+
+# Variables of the stock snort.conf, used unless configured or redefined
+# (negated ports are written as the complementary ranges)
+DEFAULT_VARIABLES = {
+    'HOME_NET': 'any',
+    'EXTERNAL_NET': 'any',
+    'DNS_SERVERS': '$HOME_NET',
+    'SMTP_SERVERS': '$HOME_NET',
+    'HTTP_SERVERS': '$HOME_NET',
+    'SQL_SERVERS': '$HOME_NET',
+    'TELNET_SERVERS': '$HOME_NET',
+    'SSH_SERVERS': '$HOME_NET',
+    'FTP_SERVERS': '$HOME_NET',
+    'SIP_SERVERS': '$HOME_NET',
+    'HTTP_PORTS': ('[80,81,311,383,591,593,901,1220,1414,1741,1830,2301,2381,2809,3037,'
+                   '3128,3702,4343,4848,5250,6988,7000,7001,7144,7145,7510,7777,7779,8000,'
+                   '8008,8014,8028,8080,8085,8088,8090,8118,8123,8180,8181,8243,8280,8300,'
+                   '8800,8888,8899,9000,9060,9080,9090,9091,9443,9999,11371,34443,34444,'
+                   '41080,50002,55555]'),
+    'SHELLCODE_PORTS': '[0:79,81:65535]',
+    'ORACLE_PORTS': '1024:',
+    'SSH_PORTS': '22',
+    'FTP_PORTS': '[21,2100,3535]',
+    'SIP_PORTS': '[5060,5061,5600]',
+    'FILE_DATA_PORTS': '[$HTTP_PORTS,110,143]',
+    'GTP_PORTS': '[2123,2152,3386]'
+}
+
+_VARIABLE = re.compile(r'^\$(\w+)$')
+
+
+def _split_options(text: str) -> List[Tuple[str, str]]:
+    """Split 'key:value; key; ...' respecting quoted strings and escapes."""
+    options = []
+    current = []
+    in_quotes = False
+    escaped = False
+
+    for char in text:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == '\\':
+            current.append(char)
+            escaped = True
+        elif char == '"':
+            current.append(char)
+            in_quotes = not in_quotes
+        elif char == ';' and not in_quotes:
+            option = ''.join(current).strip()
+            if option:
+                options.append(option)
+            current = []
+        else:
+            current.append(char)
+
+    if ''.join(current).strip():
+        raise ValueError("Unterminated rule option")
+
+    result = []
+    for option in options:
+        key, _, value = option.partition(':')
+        result.append((key.strip().lower(), value.strip()))
+    return result
+
+
+def _unquote(value: str) -> str:
+    """Remove surrounding quotes and Snort escapes from a string."""
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+    return re.sub(r'\\(.)', r'\1', value)
+
+
+def parse_content(value: str) -> bytes:
+    """
+    Parse a content string, including |hex| byte sequences.
+
+    Raises:
+        ValueError: If the hex section is malformed
+    """
+    text = _unquote(value)
+    data = bytearray()
+    parts = text.split('|')
+    if len(parts) % 2 == 0:
+        raise ValueError(f"Unbalanced '|' in content {value}")
+
+    for i, part in enumerate(parts):
+        if i % 2:
+            try:
+                data.extend(bytes.fromhex(part))
+            except ValueError:
+                raise ValueError(f"Invalid hex bytes |{part}| in content")
+        else:
+            data.extend(part.encode('utf-8'))
+    return bytes(data)
+
+
+def _resolve(value: str, variables: Dict[str, str], depth: int = 0) -> str:
+    """Expand $VARIABLES in an address or port field."""
+    match = _VARIABLE.match(value)
+    if not match:
+        return value
+    if depth > 10:
+        raise ValueError(f"Recursive variable {value}")
+    return _resolve(variables.get(match.group(1), 'any'), variables, depth + 1)
+
+
+def _list_items(value: str) -> List[str]:
+    """Split a '[a,b,c]' list (or a single item)."""
+    value = value.strip()
+    if value.startswith('[') and value.endswith(']'):
+        return [item.strip() for item in value[1:-1].split(',') if item.strip()]
+    return [value]
+
+
+def _parse_addresses(value: str, variables: Dict[str, str]) -> Optional[List[str]]:
+    """Parse an address field into CIDRs (None means any)."""
+    cidrs = []
+    for item in _list_items(_resolve(value, variables)):
+        item = _resolve(item, variables)
+        if item.startswith('!'):
+            raise ValueError(f"Negated addresses are not supported: {value}")
+        if item == 'any':
+            return None
+        if item.startswith('['):
+            nested = _parse_addresses(item, variables)
+            if nested is None:
+                return None
+            cidrs.extend(nested)
+        else:
+            cidrs.append(item)
+    return cidrs
+
+
+def _parse_ports(value: str, variables: Dict[str, str]) -> Optional[List]:
+    """Parse a port field into native port specs (None means any)."""
+    ports = []
+    for item in _list_items(_resolve(value, variables)):
+        item = _resolve(item, variables)
+        if item.startswith('!'):
+            raise ValueError(f"Negated ports are not supported: {value}")
+        if item == 'any':
+            return None
+        if item.startswith('['):
+            nested = _parse_ports(item, variables)
+            if nested is None:
+                return None
+            ports.extend(nested)
+        elif ':' in item:
+            lo, _, hi = item.partition(':')
+            ports.append(f"{int(lo or 0)}-{int(hi or 65535)}")
+        else:
+            ports.extend(int(p) for p in item.split(','))
+    return ports
+
+
+def _parse_flags(value: str) -> str:
+    """Translate a Snort flags option to the native flags expression."""
+    value = value.split(',')[0].strip()
+    if not value or value[0] in '*!':
+        raise ValueError(f"Unsupported flags modifier: {value}")
+
+    at_least = value.endswith('+')
+    letters = ''.join(FLAG_ALIASES.get(c, c) for c in value.rstrip('+'))
+    return letters + ('+' if at_least else '')
+
+
+def _parse_threshold(value: str) -> Dict:
+    """Parse threshold/detection_filter arguments."""
+    settings = {}
+    for part in value.split(','):
+        key, _, arg = part.strip().partition(' ')
+        settings[key.strip().lower()] = arg.strip()
+
+    kind = settings.get('type', 'threshold')
+    count = int(settings.get('count', 1))
+    return {
+        # 'limit' alerts on the first match of a window
+        'threshold': 1 if kind == 'limit' else count,
+        'seconds': int(settings.get('seconds', 60)),
+        'track': settings.get('track', 'by_src')
+    }
+
+
+def parse_snort_rule(text: str, variables: Dict[str, str] = None) -> Optional[Dict]:
+    """
+    Translate one Snort/Suricata rule into a native rule.
+
+    Args:
+        text: Rule text
+        variables: Values for $VARIABLES, over DEFAULT_VARIABLES (unknown
+            variables mean 'any')
+
+    Returns:
+        Validated native rule, or None for actions other than 'alert'
+
+    Raises:
+        ValueError: If the rule uses syntax outside the supported subset
+    """
+    variables = {**DEFAULT_VARIABLES, **(variables or {})}
+    header, paren, body = text.partition('(')
+    if not paren or not body.rstrip().endswith(')'):
+        raise ValueError("Missing rule options")
+
+    fields = header.split()
+    if len(fields) != 7:
+        raise ValueError(f"Malformed rule header: {header.strip()}")
+    action, protocol, src, src_port, direction, dst, dst_port = fields
+
+    if action != 'alert':
+        return None
+    if protocol.lower() not in PROTOCOL_MAP:
+        raise ValueError(f"Unsupported protocol: {protocol}")
+    if direction != '->':
+        raise ValueError(f"Unsupported direction: {direction}")
+
+    rule = {'protocol': PROTOCOL_MAP[protocol.lower()]}
+
+    src_cidrs = _parse_addresses(src, variables)
+    dst_cidrs = _parse_addresses(dst, variables)
+    if src_cidrs:
+        rule['src_cidrs'] = src_cidrs
+    if dst_cidrs:
+        rule['dst_cidrs'] = dst_cidrs
+
+    src_ports = _parse_ports(src_port, variables)
+    dst_ports = _parse_ports(dst_port, variables)
+    if src_ports:
+        rule['src_ports'] = src_ports
+    if dst_ports:
+        rule['ports'] = dst_ports
+
+    contents = []
+    relaxed = []
+    buffer = None
+    for key, value in _split_options(body.rstrip()[:-1]):
+        if key == 'msg':
+            rule['name'] = _unquote(value)
+        elif key == 'sid':
+            rule['id'] = f"SID-{int(value)}"
+        elif key == 'priority':
+            rule['severity'] = PRIORITY_SEVERITY.get(int(value), 'LOW')
+        elif key == 'content':
+            if value.startswith('!'):
+                raise ValueError("Negated content is not supported")
+            contents.append({'pattern': parse_content(value).decode('utf-8', 'surrogateescape'),
+                             'nocase': False, 'buffer': buffer})
+        elif key == 'nocase':
+            if not contents:
+                raise ValueError("'nocase' without a preceding content")
+            contents[-1]['nocase'] = True
+        elif key in BUFFER_MODIFIERS:
+            if not contents:
+                raise ValueError(f"'{key}' without a preceding content")
+            contents[-1]['buffer'] = BUFFER_MODIFIERS[key]
+        elif key in STICKY_BUFFERS:
+            buffer = STICKY_BUFFERS[key]
+        elif key == 'flags':
+            rule['flags'] = _parse_flags(value)
+        elif key in ('threshold', 'detection_filter'):
+            rule.update(_parse_threshold(value))
+        elif key in RELAXED_OPTIONS:
+            relaxed.append(key)
+        elif key not in IGNORED_OPTIONS:
+            raise ValueError(f"Unsupported option: {key}")
+
+    if 'id' not in rule:
+        raise ValueError("Rule has no sid")
+    rule.setdefault('name', rule['id'])
+    rule['description'] = rule['name']
+    # Contents in HTTP/DNS buffers become application-layer fields
+    # (matched case-insensitively), the rest payload patterns
+    payload = []
+    for content in contents:
+        field = content.pop('buffer')
+        if field is None:
+            payload.append(content)
+        else:
+            rule.setdefault(field, []).append(content['pattern'])
+    if payload:
+        rule['payload'] = payload
+    if relaxed:
+        rule['relaxed_options'] = sorted(set(relaxed))
+
+    return validate_rule(rule)
+
+
+def load_snort_rules(path: str, variables: Dict[str, str] = None) -> Tuple[List[Dict], List[str]]:
+    """
+    Import a Snort/Suricata rules file.
+
+    Lines ending in a backslash continue on the next line, and var/ipvar/
+    portvar lines define variables for the rules after them. Rules outside
+    the supported subset are skipped and reported.
+
+    Args:
+        path: Rules file
+        variables: Values for $VARIABLES, over DEFAULT_VARIABLES
+
+    Returns:
+        (native rules, error messages for skipped rules)
+    """
+    variables = {**DEFAULT_VARIABLES, **(variables or {})}
+    rules = []
+    errors = []
+    pending = ''
+    start_line = 0
+
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not pending:
+                if not line or line.startswith('#'):
+                    continue
+                start_line = line_number
+
+            if line.endswith('\\'):
+                pending += line[:-1] + ' '
+                continue
+
+            text = pending + line
+            pending = ''
+
+            fields = text.split(None, 2)
+            if fields[0] in ('var', 'ipvar', 'portvar') and len(fields) == 3:
+                variables[fields[1]] = fields[2]
+                continue
+
+            try:
+                rule = parse_snort_rule(text, variables)
+            except ValueError as e:
+                errors.append(f"{path}:{start_line}: {e}")
+                continue
+            if rule:
+                rules.append(rule)
+
+    return rules, errors
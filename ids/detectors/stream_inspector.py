@@ -0,0 +1,302 @@
+"""
+Stream Inspection Module
+Reassembles TCP byte streams and matches attack signatures across segments
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from .pattern_matcher import MultiPatternMatcher
+from .registry import Detector
+from .rule_compiler import TCP_FIN, TCP_RST, TCP_SYN, flags_to_int
+
+SEQ_MASK = 0xFFFFFFFF
+SEQ_HALF = 1 << 31
+
+# Packets between two sweeps for idle streams
+EXPIRE_EVERY = 1024
+
+
+def seq_diff(a: int, b: int) -> int:
+    """Get a - b in 32-bit TCP sequence space (handles wraparound)."""
+    diff = (a - b) & SEQ_MASK
+    return diff - (SEQ_MASK + 1) if diff >= SEQ_HALF else diff
+
+
+class Stream:
+    """Reassembly state of one direction of a TCP connection."""
+
+    __slots__ = ('next_seq', 'segments', 'buffered', 'state', 'inspected',
+                 'found', 'last_seen')
+
+    def __init__(self, next_seq: int, now: float):
+        self.next_seq = next_seq
+        # seq -> out-of-order payload waiting for the bytes before it
+        self.segments: Dict[int, bytes] = {}
+        self.buffered = 0
+        # Matcher state after the last inspected byte
+        self.state = 0
+        self.inspected = 0
+        self.found = set()
+        self.last_seen = now
+
+
+class StreamInspector(Detector):
+    """
+    Matches signatures against reassembled TCP streams.
+
+    Each direction of a connection is inspected in sequence order. In-order
+    bytes are fed straight into the shared Aho-Corasick automaton, whose
+    state carries the last few bytes of context over to the next segment,
+    so a signature split across segments is still found and no byte is
+    scanned twice. Only out-of-order segments are buffered, bounded per
+    stream (the missing bytes are given up as a gap once the bound is hit)
+    and globally (the least recently active streams are evicted).
+    """
+
+    name = 'stream_inspector'
+    enable_setting = 'ENABLE_STREAM_INSPECTION'
+    order = 60
+    reports_anomalies = False
+    transports = frozenset({'TCP'})
+    fields = ('seq',)
+
+    def __init__(self, signatures: Iterable[str], max_streams: int = 50000,
+                 stream_buffer: int = 65536, memory_limit: int = 32 * 1024 * 1024,
+                 depth: int = 1024 * 1024, idle_timeout: float = 120.0):
+        """
+        Initialize stream inspector.
+
+        Args:
+            signatures: Case-insensitive byte strings to look for
+            max_streams: Maximum number of tracked stream directions
+            stream_buffer: Maximum out-of-order bytes buffered per stream
+            memory_limit: Maximum out-of-order bytes buffered over all streams
+            depth: Bytes inspected per stream before inspection stops
+            idle_timeout: Seconds after which an inactive stream is dropped
+        """
+        self.signatures = list(signatures)
+        self.matcher = MultiPatternMatcher(s.lower().encode('utf-8') for s in self.signatures)
+        self.max_streams = max_streams
+        self.stream_buffer = stream_buffer
+        self.memory_limit = memory_limit
+        self.depth = depth
+        self.idle_timeout = idle_timeout
+
+        # (src ip, src port, dst ip, dst port) -> Stream, least recently active first
+        self.streams: 'OrderedDict[tuple, Stream]' = OrderedDict()
+        self.buffered = 0
+
+        self.segments = 0
+        self.bytes_inspected = 0
+        self.out_of_order = 0
+        self.retransmissions = 0
+        self.gaps = 0
+        self.evicted = 0
+        self.expired = 0
+        self._since_expire = 0
+
+    def process(self, packet_info: dict) -> List[Dict]:
+        """
+        Add a TCP segment to its stream and inspect the newly contiguous bytes.
+
+        Args:
+            packet_info: Packet information dictionary (needs 'seq')
+
+        Returns:
+            Signatures found for the first time in the segment's stream
+        """
+        seq = packet_info.get('seq')
+        if seq is None or packet_info.get('transport') != 'TCP':
+            return []
+
+        now = packet_info.get('capture_time') or time.time()
+        self._since_expire += 1
+        if self._since_expire >= EXPIRE_EVERY:
+            self._expire(now)
+
+        key = (packet_info.get('src_ip'), packet_info.get('src_port'),
+               packet_info.get('dst_ip'), packet_info.get('dst_port'))
+        flags = flags_to_int(packet_info.get('flags'))
+        payload = packet_info.get('payload')
+
+        stream = self.streams.get(key)
+        if stream is None:
+            if flags & TCP_SYN:
+                stream = Stream((seq + 1) & SEQ_MASK, now)
+            elif payload:
+                # Connection already running: start from this segment
+                stream = Stream(seq, now)
+            else:
+                return []
+            self.streams[key] = stream
+            if len(self.streams) > self.max_streams:
+                self._evict_oldest()
+        else:
+            self.streams.move_to_end(key)
+            stream.last_seen = now
+
+        found = set()
+        if payload and stream.inspected < self.depth:
+            self.segments += 1
+            self._add_segment(stream, seq, payload, found)
+
+        if flags & (TCP_FIN | TCP_RST):
+            self._drop(key)
+
+        new = found - stream.found
+        if not new:
+            return []
+        stream.found |= new
+        return [
+            {
+                'signature': self.signatures[pattern_id],
+                'source_ip': key[0],
+                'source_port': key[1],
+                'destination_ip': key[2],
+                'destination_port': key[3],
+                'stream_offset': stream.inspected
+            }
+            for pattern_id in sorted(new)
+        ]
+
+    def on_packet(self, packet_info: dict) -> List[Dict]:
+        """Reassemble a segment and report new signature matches as alerts."""
+        return [
+            {
+                'type': 'Attack Signature',
+                'severity': 'HIGH',
+                'description': (f"Signature '{match['signature']}' in TCP stream "
+                                f"{match['source_ip']}:{match['source_port']} -> "
+                                f"{match['destination_ip']}:{match['destination_port']}"),
+                'source_ip': match['source_ip'],
+                'destination_port': match['destination_port']
+            }
+            for match in self.process(packet_info)
+        ]
+
+    def _add_segment(self, stream: Stream, seq: int, payload: bytes, found: set):
+        """Inspect a segment now, or buffer it until the bytes before it arrive."""
+        offset = seq_diff(seq, stream.next_seq)
+
+        if offset < 0:
+            # Retransmission or overlap: only bytes past next_seq are new
+            if offset + len(payload) <= 0:
+                self.retransmissions += 1
+                return
+            payload = payload[-offset:]
+            offset = 0
+
+        if offset > 0:
+            self.out_of_order += 1
+            if seq not in stream.segments or len(stream.segments[seq]) < len(payload):
+                self._store(stream, seq, payload)
+            if stream.buffered > self.stream_buffer:
+                # Too much data behind a hole: treat the missing bytes as lost
+                self._flush(stream, found)
+            return
+
+        self._inspect(stream, payload, found)
+        if stream.segments:
+            self._drain(stream, found)
+
+    def _store(self, stream: Stream, seq: int, payload: bytes):
+        """Buffer an out-of-order segment within the global memory limit."""
+        old = stream.segments.get(seq)
+        size = len(payload) - (len(old) if old else 0)
+
+        while self.buffered + size > self.memory_limit and len(self.streams) > 1:
+            self._evict_oldest()
+
+        stream.segments[seq] = payload
+        stream.buffered += size
+        self.buffered += size
+
+    def _pop(self, stream: Stream, seq: int) -> bytes:
+        """Remove a buffered segment."""
+        data = stream.segments.pop(seq)
+        stream.buffered -= len(data)
+        self.buffered -= len(data)
+        return data
+
+    def _inspect(self, stream: Stream, data: bytes, found: set):
+        """Feed the next contiguous bytes of a stream to the matcher."""
+        stream.next_seq = (stream.next_seq + len(data)) & SEQ_MASK
+
+        remaining = self.depth - stream.inspected
+        if remaining <= 0:
+            return
+        if len(data) > remaining:
+            data = data[:remaining]
+
+        ids, stream.state = self.matcher.feed(data.lower(), stream.state)
+        stream.inspected += len(data)
+        self.bytes_inspected += len(data)
+        if ids:
+            found |= ids
+
+    def _drain(self, stream: Stream, found: set):
+        """Inspect buffered segments that have become contiguous."""
+        while stream.segments:
+            seq = stream.next_seq
+            if seq not in stream.segments:
+                # Overlapping segments start before next_seq
+                seq = next((s for s in stream.segments
+                            if seq_diff(s, stream.next_seq) <= 0), None)
+                if seq is None:
+                    return
+
+            data = self._pop(stream, seq)
+            offset = seq_diff(seq, stream.next_seq)
+            if offset + len(data) > 0:
+                self._inspect(stream, data[-offset:] if offset else data, found)
+
+    def _flush(self, stream: Stream, found: set):
+        """Inspect all buffered segments in order, skipping the holes between them."""
+        for seq in sorted(stream.segments, key=lambda s: seq_diff(s, stream.next_seq)):
+            if seq not in stream.segments:
+                continue
+            if seq_diff(seq, stream.next_seq) > 0:
+                # Matches cannot span a hole
+                self.gaps += 1
+                stream.next_seq = seq
+                stream.state = 0
+            self._drain(stream, found)
+
+    def _drop(self, key: tuple):
+        """Forget a stream and release its buffers."""
+        stream = self.streams.pop(key, None)
+        if stream is not None:
+            self.buffered -= stream.buffered
+
+    def _evict_oldest(self):
+        """Drop the least recently active stream."""
+        key = next(iter(self.streams))
+        self._drop(key)
+        self.evicted += 1
+
+    def _expire(self, now: float):
+        """Drop streams idle for longer than the timeout."""
+        self._since_expire = 0
+        cutoff = now - self.idle_timeout
+        while self.streams:
+            key, stream = next(iter(self.streams.items()))
+            if stream.last_seen >= cutoff:
+                break
+            self._drop(key)
+            self.expired += 1
+
+    def get_statistics(self) -> Dict:
+        """Get stream reassembly statistics."""
+        return {
+            'streams': len(self.streams),
+            'buffered_bytes': self.buffered,
+            'segments': self.segments,
+            'bytes_inspected': self.bytes_inspected,
+            'out_of_order_segments': self.out_of_order,
+            'retransmissions': self.retransmissions,
+            'gaps': self.gaps,
+            'evicted_streams': self.evicted,
+            'expired_streams': self.expired,
+            'signatures': len(self.signatures)
+        }
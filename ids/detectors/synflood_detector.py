@@ -0,0 +1,338 @@
+"""
+SYN Flood Detection Engine
+Detects SYN floods and half-open connection build-up per destination
+"""
+import ipaddress
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+import time
+
+from ..core.address import packet_address
+from ..core.config import IDSConfig, config
+from ..core.hosts import HostRecord, HostTable
+from .rule_compiler import TCP_ACK, TCP_FIN, TCP_RST, TCP_SYN, flags_to_int
+from .registry import Detector
+
+# Counters kept per flooded destination for the top source ranges
+TOP_RANGES = 16
+
+# Ended incidents kept for reporting
+MAX_INCIDENTS = 100
+
+# SYN-ACKs awaiting the ACK that completes them, kept per destination and window
+MAX_HANDSHAKES = 4096
+
+SEQ_MASK = 0xFFFFFFFF
+
+
+def source_range(ip: str) -> str:
+    """Get the range a (possibly spoofed) source is grouped under: /16 or /32 for IPv6."""
+    if ':' not in ip:
+        first, second, _ = ip.split('.', 2)
+        return f"{first}.{second}.0.0/16"
+    return str(ipaddress.ip_network(f"{ip}/32", strict=False))
+
+
+class TopRanges:
+    """
+    Misra-Gries summary of the most frequent source ranges.
+
+    Holds at most TOP_RANGES counters; any range sending more than
+    1/TOP_RANGES of the SYNs is guaranteed to be among them.
+    """
+
+    __slots__ = ('counters',)
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+
+    def add(self, key: str):
+        counters = self.counters
+        if key in counters:
+            counters[key] += 1
+        elif len(counters) < TOP_RANGES:
+            counters[key] = 1
+        else:
+            for other in list(counters):
+                counters[other] -= 1
+                if not counters[other]:
+                    del counters[other]
+
+    def top(self, limit: int = 5) -> List[str]:
+        return sorted(self.counters, key=self.counters.get, reverse=True)[:limit]
+
+
+class TargetWindow:
+    """
+    Handshake packet counts for one destination in the current window.
+
+    SYN-ACKs the destination sends are remembered by client address and
+    port with the acknowledgment number that completes them (the server's
+    ISN + 1), for this window and the previous one, so a handshake that
+    spans a window boundary still completes.
+    """
+
+    __slots__ = ('start', 'syn', 'synack', 'ack', 'rst', 'ranges', 'incident',
+                 'handshakes', 'previous')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.syn = 0
+        self.synack = 0
+        self.ack = 0
+        self.rst = 0
+        self.ranges = TopRanges()
+        self.incident: Optional[Dict] = None
+        # (client address, client port) -> acknowledgment number completing the handshake
+        self.handshakes: Dict[Tuple[int, int], int] = {}
+        self.previous: Dict[Tuple[int, int], int] = {}
+
+    def reset(self, start: float):
+        self.start = start
+        self.syn = self.synack = self.ack = self.rst = 0
+        if self.incident is None:
+            self.ranges = TopRanges()
+        self.previous = self.handshakes
+        self.handshakes = {}
+
+    def expect(self, client: Tuple[int, int], ack: int):
+        """Remember a SYN-ACK sent to a client."""
+        if len(self.handshakes) < MAX_HANDSHAKES:
+            self.handshakes[client] = ack
+
+    def complete(self, client: Tuple[int, int], ack: int) -> bool:
+        """Check whether an ACK from a client completes a remembered handshake."""
+        for pending in (self.handshakes, self.previous):
+            if pending.get(client) == ack:
+                del pending[client]
+                return True
+        return False
+
+
+class SynFloodDetector(Detector):
+    """
+    Detects SYN floods from TCP handshake ratios per destination.
+
+    A destination's window counts SYNs it receives, SYN-ACKs and RSTs it
+    sends, and the ACKs that complete one of its SYN-ACKs (acknowledging
+    its ISN + 1). Legitimate clients complete the handshake, so completions
+    keep up with SYNs; in a flood they do not, and other ACKs (data, or
+    forged) are not counted. A window with enough SYNs and too few
+    completions starts (or extends) an incident, and each incident raises
+    one alert. Only destinations receiving SYNs get a window, kept in their
+    record of the shared host table, and flags are compared as integers.
+
+    Windows that saw SYNs or belong to an incident are queued by start
+    time and evaluated as soon as any TCP packet shows they have ended, so
+    incidents close even when a target receives nothing more.
+    """
+
+    name = 'synflood_detector'
+    enable_setting = 'ENABLE_SYN_FLOOD_DETECTION'
+    order = 30
+    transports = frozenset({'TCP'})
+
+    def __init__(self, settings: IDSConfig = None, hosts: HostTable = None):
+        """
+        Initialize SYN flood detector.
+
+        Args:
+            settings: IDS configuration (defaults to the global config)
+            hosts: Shared host table (a private one is created if omitted)
+        """
+        self.settings = settings or config
+        self.window = self.settings.SYN_FLOOD_WINDOW
+
+        # Destination windows live in the host records
+        self.hosts = hosts if hosts is not None else HostTable(self.settings.HOST_TABLE_SIZE)
+        self.incidents: List[Dict] = []
+        self.anomalies = []
+
+        # Host records holding a window, counted here for statistics
+        self.tracked_targets = 0
+        self.hosts.evict_hooks.append(self._forget)
+
+        # (window start, destination address) of the windows to evaluate, oldest first
+        self.open_windows: Deque[Tuple[float, int]] = deque()
+
+    def analyze_packet(self, packet_info: dict) -> List[dict]:
+        """
+        Analyze a TCP packet.
+
+        Args:
+            packet_info: Packet information dictionary
+
+        Returns:
+            List of detected anomalies (one per new incident)
+        """
+        if packet_info.get('transport') != 'TCP':
+            return []
+
+        flags = flags_to_int(packet_info.get('flags'))
+        handshake = flags & (TCP_SYN | TCP_ACK | TCP_RST | TCP_FIN)
+        now = packet_info.get('capture_time') or time.time()
+
+        anomalies = []
+        if self.open_windows and now - self.open_windows[0][0] >= self.window:
+            anomalies = self._expire(now)
+
+        if handshake == TCP_SYN:
+            host = self.hosts.destination(packet_info)
+            if host is None:
+                return anomalies
+            record = host.syn_target
+            if record is None:
+                record = host.syn_target = TargetWindow(now)
+                self.tracked_targets += 1
+
+            # An idle window is restarted by its first SYN
+            anomaly = self._roll(host, record, now)
+            if anomaly:
+                anomalies.append(anomaly)
+            record.syn += 1
+            if record.syn == 1 and record.incident is None:
+                self.open_windows.append((record.start, host.address))
+            # Sources are only summarized once the window looks busy
+            if record.incident or record.syn >= self.settings.SYN_FLOOD_MIN_SYNS // 4:
+                record.ranges.add(source_range(packet_info['src_ip']))
+            return anomalies
+
+        # Replies and handshake completions only count for tracked servers
+        if handshake == TCP_SYN | TCP_ACK:
+            record = self._target(packet_info, 'src_addr')
+            if record is not None:
+                record.synack += 1
+                seq = packet_info.get('seq')
+                client = packet_address(packet_info, 'dst_addr')
+                if seq is not None and client is not None:
+                    record.expect((client, packet_info.get('dst_port')), (seq + 1) & SEQ_MASK)
+        elif handshake == TCP_ACK:
+            record = self._target(packet_info, 'dst_addr')
+            ack = packet_info.get('ack')
+            if record is not None and ack is not None:
+                client = (packet_address(packet_info, 'src_addr'), packet_info.get('src_port'))
+                if record.complete(client, ack):
+                    record.ack += 1
+        elif handshake & TCP_RST:
+            record = self._target(packet_info, 'src_addr')
+            if record is not None:
+                record.rst += 1
+        return anomalies
+
+    def _target(self, packet_info: dict, field: str) -> Optional[TargetWindow]:
+        """Get the window of an already tracked server, without creating one."""
+        host = self.hosts.find(packet_address(packet_info, field))
+        return host.syn_target if host is not None else None
+
+    on_packet = analyze_packet
+
+    def _expire(self, now: float) -> List[dict]:
+        """Evaluate the queued windows that have ended."""
+        anomalies = []
+        open_windows = self.open_windows
+        while open_windows and now - open_windows[0][0] >= self.window:
+            start, address = open_windows.popleft()
+            host = self.hosts.find(address)
+            record = host.syn_target if host is not None else None
+            # Skip windows already rolled by a SYN, or of evicted hosts
+            if record is None or record.start != start:
+                continue
+            anomaly = self._roll(host, record, now)
+            if anomaly:
+                anomalies.append(anomaly)
+        return anomalies
+
+    def _roll(self, host: HostRecord, record: TargetWindow, now: float) -> Optional[dict]:
+        """Evaluate a destination's window once it has ended and start a new one."""
+        if now - record.start < self.window:
+            return None
+
+        flooded = (record.syn >= self.settings.SYN_FLOOD_MIN_SYNS
+                   and record.syn >= self.settings.SYN_FLOOD_RATIO * max(record.ack, 1))
+        anomaly = None
+
+        if flooded:
+            elapsed = now - record.start
+            incident = record.incident
+            if incident is None:
+                server = host.ip
+                incident = record.incident = {
+                    'destination_ip': server,
+                    'started': record.start,
+                    'syns': 0,
+                    'peak_rate': 0.0,
+                    'active': True
+                }
+                self.incidents.append(incident)
+                if len(self.incidents) > MAX_INCIDENTS:
+                    self.incidents.pop(0)
+                anomaly = self._anomaly(server, record, elapsed)
+
+            incident['syns'] += record.syn
+            incident['peak_rate'] = max(incident['peak_rate'], record.syn / elapsed)
+            incident['last_seen'] = now
+            incident['top_source_ranges'] = record.ranges.top()
+        elif record.incident is not None:
+            record.incident['active'] = False
+            record.incident['ended'] = now
+            record.incident = None
+
+        record.reset(now)
+        # An incident's window is evaluated even if no SYN arrives
+        if record.incident is not None:
+            self.open_windows.append((now, host.address))
+        return anomaly
+
+    def _anomaly(self, server: str, record: TargetWindow, elapsed: float) -> dict:
+        """Build the alert that opens an incident."""
+        rate = record.syn / elapsed
+        ranges = record.ranges.top()
+        anomaly = {
+            'type': 'SYN Flood',
+            'severity': 'HIGH',
+            'source_ip': None,
+            'destination_ip': server,
+            'description': (f"SYN flood on {server}: {rate:,.0f} SYN/s, "
+                            f"{record.synack} SYN-ACK, {record.ack} ACK, {record.rst} RST "
+                            f"in {elapsed:.0f}s; top sources {', '.join(ranges) or 'n/a'}"),
+            'syn_rate': rate,
+            'handshake_completion': record.ack / record.syn,
+            'top_source_ranges': ranges,
+            'timestamp': datetime.now().isoformat()
+        }
+        self.anomalies.append(anomaly)
+        return anomaly
+
+    def _forget(self, host: HostRecord):
+        """Drop the count of a host evicted from the host table."""
+        if host.syn_target is not None:
+            self.tracked_targets -= 1
+
+    def get_statistics(self) -> dict:
+        """Get SYN flood statistics."""
+        return {
+            'tracked_targets': self.tracked_targets,
+            'active_incidents': sum(1 for i in self.incidents if i['active']),
+            'incidents': self.incidents[-10:],
+            'total_anomalies': len(self.anomalies)
+        }
+
+    def get_state(self) -> dict:
+        """Get detector state for checkpointing."""
+        return {'anomalies': self.anomalies[-self.settings.MAX_ALERTS_IN_MEMORY:],
+                'incidents': [i for i in self.incidents if not i['active']]}
+
+    def load_state(self, state: dict):
+        """Restore state saved with get_state()."""
+        self.anomalies = list(state.get('anomalies', []))
+        self.incidents = list(state.get('incidents', []))
+
+    def reset(self):
+        """Reset detector state."""
+        for host in self.hosts:
+            host.syn_target = None
+        self.tracked_targets = 0
+        self.open_windows.clear()
+        self.incidents.clear()
+        self.anomalies.clear()
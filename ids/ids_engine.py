@@ -4,30 +4,107 @@ Coordinates all IDS components
 """
 import threading
 import time
-from typing import Optional
+from typing import Optional, Tuple
 
-from .core.sniffer import PacketSniffer
 from .detectors.anomaly_detector import AnomalyDetector
 from .detectors.rule_detector import RuleDetector
+from .detectors.registry import ALERT_FIELDS, DetectorRegistry
 from .alerts.alert_manager import AlertManager
+from .core.address import address_to_int
 from .core.config import config
+from .core.checkpoint import CheckpointManager
+from .core.hosts import HostTable
+from .core.metrics import Metrics
+from .core.load_shedding import LoadShedder
+from .core.reputation import IPReputation, escalate_severity
+from .core.timeseries import TimeSeries
 
 class IDSEngine:
     """Main Intrusion Detection System engine."""
     
     def __init__(self):
         """Initialize IDS engine."""
-        self.sniffer = None
-        self.anomaly_detector = AnomalyDetector()
-        self.rule_detector = RuleDetector()
+        self.capture = None
+        self.flow_listener = None
+        self.hosts = HostTable(config.HOST_TABLE_SIZE)
+        self.anomaly_detector = AnomalyDetector(hosts=self.hosts)
+        self.rule_detector = RuleDetector(
+            rule_files=config.RULE_FILES,
+            reload_interval=config.RULE_RELOAD_INTERVAL,
+            snort_files=config.SNORT_RULE_FILES,
+            snort_variables=config.SNORT_VARIABLES
+        )
+        self._create_optional_detectors()
         self.alert_manager = AlertManager(config.ALERT_LOG_FILE)
+        self.reputation = IPReputation(
+            allowlist_files=config.ALLOWLIST_FILES,
+            denylist_files=config.DENYLIST_FILES,
+            cache_size=config.REPUTATION_CACHE_SIZE,
+            reload_interval=config.LIST_RELOAD_INTERVAL
+        )
+        self.reputation.start_watching()
+        
+        self.metrics = Metrics()
+        self.timeseries = TimeSeries(config.TIMESERIES_POINTS) if config.ENABLE_TIMESERIES else None
+        
+        # Dispatch order, enable flags and subscriptions come from the detectors
+        self.detectors = DetectorRegistry(config, self.metrics)
+        for detector in (self.anomaly_detector, self.scan_detector, self.synflood_detector,
+                         self.dns_detector, self.rule_detector, self.stream_inspector):
+            if detector is not None:
+                self.detectors.register(detector)
+        # Host record slots are checkpointed by the detectors that fill them
+        self.hosts.dumpers = self.detectors.host_dumpers()
+        
+        self.offline = False
+        self.capture_lag = 0.0
+        self.packet_thread_id = None
+        self._register_metrics()
         
         self.running = False
         self.stats = {
             'packets_processed': 0,
+            'flows_processed': 0,
             'anomalies_detected': 0,
-            'alerts_generated': 0
+            'alerts_generated': 0,
+            'packets_suppressed': 0,
+            'packets_shed': 0
         }
+        
+        self.load_shedder = LoadShedder(
+            target_lag=config.LOAD_SHED_TARGET_LAG,
+            min_rate=config.LOAD_SHED_MIN_RATE,
+            priority_ports=self._priority_ports(),
+            suspicion_ttl=config.SUSPICION_TTL
+        )
+        self.rule_detector.on_reload.append(self._update_priority_ports)
+        
+        self.checkpoints = None
+        if config.ENABLE_CHECKPOINTS:
+            self.checkpoints = CheckpointManager(
+                config.CHECKPOINT_FILE,
+                self.get_state,
+                interval=config.CHECKPOINT_INTERVAL,
+                hosts=self.hosts
+            )
+            self.restore_checkpoint()
+        
+        # Push alert and statistics deltas to a central collector, if configured
+        self.reporter = None
+        if config.COLLECTOR_HOST:
+            from .collector.sensor import SensorReporter
+            self.reporter = SensorReporter(
+                self,
+                config.COLLECTOR_HOST,
+                config.COLLECTOR_PORT,
+                name=config.SENSOR_NAME,
+                token=config.COLLECTOR_TOKEN,
+                interval=config.COLLECTOR_INTERVAL,
+                spool_dir=config.COLLECTOR_SPOOL_DIR,
+                max_spool_bytes=config.COLLECTOR_SPOOL_MAX_BYTES,
+                top_talkers=config.COLLECTOR_TOP_TALKERS
+            )
+            self.reporter.start()
     
     def packet_callback(self, packet_info: dict):
         """
@@ -36,69 +113,325 @@ class IDSEngine:
         Args:
             packet_info: Packet information dictionary
         """
+        started = time.perf_counter_ns()
         self.stats['packets_processed'] += 1
+        self.packet_thread_id = threading.get_ident()
+        
+        # Replayed captures carry their original timestamps, not a backlog
+        capture_time = packet_info.get('capture_time')
+        if capture_time and not self.offline:
+            self.capture_lag = time.time() - capture_time
+        
+        # Charted traffic includes packets that are shed or allowlisted below
+        if self.timeseries:
+            self.timeseries.add_packet(capture_time or time.time(),
+                                       packet_info.get('length', 0), packet_info.get('transport'))
         
-        # Check for anomalies
-        if config.ENABLE_ANOMALY_DETECTION:
-            anomalies = self.anomaly_detector.analyze_packet(packet_info)
+        # Snapshot (and copy collector batches) between packets so the state is consistent
+        if self.checkpoints:
+            self.checkpoints.maybe_snapshot()
+        if self.reporter:
+            self.reporter.maybe_collect()
+        
+        # Under overload, only a sample of low-value traffic is analyzed
+        # (a replayed capture file cannot fall behind, so nothing is shed)
+        if (config.ENABLE_LOAD_SHEDDING and not self.offline
+                and not self.load_shedder.admit(packet_info)):
+            self.stats['packets_shed'] += 1
+            return
+        
+        # Allowlisted sources are exempt, denylisted ones get escalated alerts
+        reputation = None
+        src_ip = packet_info.get('src_ip')
+        if src_ip and self.reputation.enabled:
+            reputation = self.reputation.lookup(src_ip)
             
-            for anomaly in anomalies:
+            if reputation and reputation['list'] == 'allow':
+                self.stats['packets_suppressed'] += 1
+                self.metrics.observe('pipeline', time.perf_counter_ns() - started)
+                return
+        
+        # Only detectors subscribed to this packet's transport, ports and fields run
+        for detector, alerts in self.detectors.run_packet(packet_info):
+            self._report_alerts(detector, alerts, src_ip, reputation)
+        
+        self.metrics.observe('pipeline', time.perf_counter_ns() - started)
+    
+    def _create_optional_detectors(self):
+        """
+        Import and build the detectors that can be turned off.
+        
+        A disabled detector is never imported and stays None, so it costs
+        neither startup time nor memory (enable it before creating the engine).
+        """
+        self.dns_detector = self.scan_detector = self.synflood_detector = None
+        self.stream_inspector = None
+        
+        if config.ENABLE_DNS_DETECTION:
+            from .detectors.dns_detector import DNSDetector
+            self.dns_detector = DNSDetector(hosts=self.hosts)
+        if config.ENABLE_SCAN_DETECTION:
+            from .detectors.scan_detector import ScanDetector
+            self.scan_detector = ScanDetector(hosts=self.hosts)
+        if config.ENABLE_SYN_FLOOD_DETECTION:
+            from .detectors.synflood_detector import SynFloodDetector
+            self.synflood_detector = SynFloodDetector(hosts=self.hosts)
+        if config.ENABLE_STREAM_INSPECTION:
+            from .detectors.stream_inspector import StreamInspector
+            self.stream_inspector = StreamInspector(
+                config.ATTACK_SIGNATURES,
+                max_streams=config.STREAM_MAX_FLOWS,
+                stream_buffer=config.STREAM_BUFFER_BYTES,
+                memory_limit=config.STREAM_MEMORY_LIMIT,
+                depth=config.STREAM_DEPTH,
+                idle_timeout=config.STREAM_IDLE_TIMEOUT
+            )
+    
+    def _priority_ports(self) -> set:
+        """Ports whose traffic is never shed: rule ports and suspicious ports."""
+        return set(config.SUSPICIOUS_PORTS) | self.rule_detector.compiled.ports()
+    
+    def _update_priority_ports(self):
+        """Refresh the never-shed ports after the rule set changes."""
+        self.load_shedder.priority_ports = frozenset(self._priority_ports())
+    
+    def _register_metrics(self):
+        """Expose engine counters and gauges through the metrics registry."""
+        m = self.metrics
+        m.describe('alerts_total', 'Alerts raised, by detector and severity')
+        m.register_callback('packets_processed_total', lambda: self.stats['packets_processed'],
+                            'Packets that entered the detection pipeline', kind='counter')
+        m.register_callback('flows_processed_total', lambda: self.stats['flows_processed'],
+                            'Flow records (NetFlow/IPFIX) that entered detection', kind='counter')
+        m.register_callback('packets_suppressed_total', lambda: self.stats['packets_suppressed'],
+                            'Packets skipped because the source is allowlisted', kind='counter')
+        m.register_callback('anomalies_detected_total', lambda: self.stats['anomalies_detected'],
+                            'Anomalies reported by the anomaly detector', kind='counter')
+        m.register_callback('packets_dropped_total',
+                            lambda: self.capture.kernel_drops() if self.capture else 0,
+                            'Packets dropped by the kernel before capture', kind='counter')
+        m.register_callback('interface_packets_total', self._interface_counts,
+                            'Packets captured, by interface', kind='counter')
+        m.register_callback('capture_lag_seconds', lambda: self.capture_lag,
+                            'Delay between capture and processing of the last packet')
+        m.register_callback('packets_shed_total', lambda: self.stats['packets_shed'],
+                            'Low-value packets skipped by load shedding', kind='counter')
+        m.register_callback('sampling_rate', lambda: self.load_shedder.effective_rate,
+                            'Share of packets analyzed (divide counts by it to scale)')
+        m.register_callback('tracked_hosts', lambda: len(self.hosts),
+                            'Hosts in the shared host table')
+        if self.stream_inspector:
+            m.register_callback('stream_buffered_bytes', lambda: self.stream_inspector.buffered,
+                                'Out-of-order TCP bytes held for reassembly')
+        m.register_callback('profiler_running', lambda: int(m.profiler.running),
+                            'Whether the sampling profiler is active')
+    
+    def process_batch(self, packets: list):
+        """
+        Process a batch of packets: each one through the per-packet pipeline,
+        then the whole batch through the detectors' batch hooks.
+        
+        Args:
+            packets: Packet information dictionaries
+        """
+        for packet_info in packets:
+            self.packet_callback(packet_info)
+        for detector, alerts in self.detectors.run_batch(packets):
+            self._report_alerts(detector, alerts, None, None)
+    
+    def process_flows(self, flows: list):
+        """
+        Process the flow records of one export packet.
+        
+        Each flow is charted at its end time with its packet and byte counts
+        and run through the detectors' flow hooks. Flows are never shed: one
+        record already stands for all packets of a connection.
+        
+        Args:
+            flows: Flow record dictionaries (see ids.netflow.decoder.make_flow)
+        """
+        self.packet_thread_id = threading.get_ident()
+        for flow in flows:
+            started = time.perf_counter_ns()
+            self.stats['flows_processed'] += 1
+            if self.timeseries:
+                self.timeseries.add_packet(flow['end'], flow['bytes'], flow.get('transport'),
+                                           packets=flow['packets'])
+            if self.checkpoints:
+                self.checkpoints.maybe_snapshot()
+            if self.reporter:
+                self.reporter.maybe_collect()
+            self.flow_callback(flow)
+            self.metrics.observe('flow_pipeline', time.perf_counter_ns() - started)
+    
+    def flow_callback(self, flow: dict):
+        """
+        Process a completed flow record through the detectors' flow hooks.
+        
+        Args:
+            flow: Flow record dictionary
+        """
+        reputation = None
+        src_ip = flow.get('src_ip')
+        if src_ip and self.reputation.enabled:
+            reputation = self.reputation.lookup(src_ip)
+            if reputation and reputation['list'] == 'allow':
+                return
+        
+        for detector, alerts in self.detectors.run_flow(flow):
+            self._report_alerts(detector, alerts, src_ip, reputation)
+    
+    def _interface_counts(self) -> dict:
+        """Captured packet counts labelled by interface, for the metrics export."""
+        if not self.capture:
+            return {}
+        return {
+            (('interface', name),): entry['packet_count']
+            for name, entry in self.capture.get_stats()['interfaces'].items()
+        }
+    
+    def _report_alerts(self, detector, alerts: list, src_ip: Optional[str],
+                       reputation: Optional[dict]):
+        """Raise an alert for each finding reported by a detector."""
+        for found in alerts:
+            if detector.reports_anomalies:
                 self.stats['anomalies_detected'] += 1
-                self.stats['alerts_generated'] += 1
-                
-                self.alert_manager.create_alert(
-                    alert_type=anomaly['type'],
-                    severity=anomaly['severity'],
-                    description=anomaly['description'],
-                    source_ip=anomaly.get('source_ip'),
-                    timestamp=anomaly['timestamp']
-                )
-        
-        # Check against rules
-        if config.ENABLE_RULE_DETECTION:
-            rule_alerts = self.rule_detector.check_packet(packet_info)
             
-            for alert in rule_alerts:
-                self.stats['alerts_generated'] += 1
-                
-                self.alert_manager.create_alert(
-                    alert_type=alert['rule_name'],
-                    severity=alert['severity'],
-                    description=alert['description'],
-                    source_ip=alert.get('source_ip'),
-                    destination_port=alert.get('destination_port'),
-                    rule_id=alert.get('rule_id')
-                )
-    
-    def start(self, interface: str = None, count: int = 0, timeout: int = None):
+            severity, extra = self._apply_reputation(
+                found['severity'], found.get('source_ip'), src_ip, reputation
+            )
+            for name in ALERT_FIELDS:
+                if name in found:
+                    extra[name] = found[name]
+            self._raise_alert(
+                detector.name,
+                alert_type=found['type'],
+                severity=severity,
+                description=found['description'],
+                **extra
+            )
+    
+    def _raise_alert(self, detector: str, alert_type: str, severity: str,
+                     description: str, **kwargs):
+        """Send an alert to the alert manager, timing and counting it."""
+        self.stats['alerts_generated'] += 1
+        self.load_shedder.mark_suspicious(kwargs.get('source_ip'))
+        self.metrics.inc('alerts_total', labels=(('detector', detector), ('severity', severity)))
+        if self.timeseries:
+            self.timeseries.add_alert(severity)
+        
+        stage_start = time.perf_counter_ns()
+        alert = self.alert_manager.create_alert(
+            alert_type=alert_type,
+            severity=severity,
+            description=description,
+            **kwargs
+        )
+        self.metrics.observe('alert_manager', time.perf_counter_ns() - stage_start)
+        return alert
+    
+    @staticmethod
+    def _apply_reputation(severity: str, alert_ip: Optional[str], src_ip: Optional[str],
+                          reputation: Optional[dict]) -> Tuple[str, dict]:
+        """
+        Escalate an alert raised against a denylisted source.
+        
+        Only alerts naming the packet's source are escalated; a detector may
+        report another address (e.g. a flood's victim) for the same packet.
+        
+        Args:
+            severity: Severity reported by the detector
+            alert_ip: The alert's source_ip
+            src_ip: Source address the reputation was looked up for
+            reputation: Lookup result for src_ip
+        
+        Returns:
+            (severity, extra alert fields)
+        """
+        if alert_ip and alert_ip == src_ip and reputation and reputation['list'] == 'deny':
+            return escalate_severity(severity), {'reputation': reputation}
+        return severity, {}
+    
+    def start(self, interface: str = None, count: int = 0, timeout: int = None,
+              pcap_file: str = None, netflow: bool = False):
         """
         Start the IDS engine.
         
         Args:
-            interface: Network interface to monitor
-            count: Number of packets to capture (0 = infinite)
+            interface: Network interface to monitor (default: config.INTERFACES,
+                or config.INTERFACE)
+            count: Number of packets (flows in NetFlow mode) to capture (0 = infinite)
             timeout: Capture timeout in seconds
+            pcap_file: Capture file to replay instead of monitoring interfaces
+            netflow: Receive NetFlow/IPFIX exports on config.NETFLOW_HOST and
+                NETFLOW_PORT instead of capturing packets
         """
         self.running = True
+        self.offline = pcap_file is not None
+        interfaces = [interface] if interface else (config.INTERFACES or [config.INTERFACE])
         
         print("\n" + "=" * 70)
         print("  NETWORK INTRUSION DETECTION SYSTEM")
         print("=" * 70)
-        print(f"  Interface: {interface or 'Auto-detect'}")
-        print(f"  Anomaly Detection: {'Enabled' if config.ENABLE_ANOMALY_DETECTION else 'Disabled'}")
-        print(f"  Rule Detection: {'Enabled' if config.ENABLE_RULE_DETECTION else 'Disabled'}")
+        if netflow:
+            print(f"  Flow Exports: udp://{config.NETFLOW_HOST}:{config.NETFLOW_PORT} "
+                  f"(NetFlow v5/v9, IPFIX)")
+        elif pcap_file:
+            print(f"  Capture File: {pcap_file}")
+        else:
+            print(f"  Interface: {', '.join(i or 'Auto-detect' for i in interfaces)}")
+        if config.CAPTURE_WORKERS_PER_INTERFACE > 1 and not (pcap_file or netflow):
+            print(f"  Capture Workers: {config.CAPTURE_WORKERS_PER_INTERFACE} per interface "
+                  f"(fanout by {config.CAPTURE_FANOUT_MODE})")
+        print(f"  Detectors: {', '.join(s.name for s in self.detectors.ordered()) or 'None'}")
+        report = self.rule_detector.get_rule_report()
+        print(f"  Rules: {report['rules']} ({report['indexed_ports']} indexed ports, "
+              f"~{report['avg_indexed_cost']:.1f} checks/packet)")
+        if report['import_errors']:
+            print(f"  Skipped Snort rules: {report['import_errors']} (unsupported syntax)")
         print(f"  Alert Logging: {config.ALERT_LOG_FILE}")
         print("=" * 70)
         
-        # Create sniffer
-        self.sniffer = PacketSniffer(
-            interface=interface or config.INTERFACE,
-            callback=self.packet_callback
+        if netflow:
+            self._start_flows(count, timeout)
+            return
+        
+        # Scapy is only loaded once capture actually starts
+        from .core.capture import CaptureManager
+        
+        # One capture worker per interface (or fanout group member)
+        self.capture = CaptureManager(
+            interfaces,
+            callback=self.packet_callback,
+            batch_callback=self.process_batch,
+            batch_size=config.CAPTURE_BATCH_SIZE,
+            metrics=self.metrics,
+            workers_per_interface=config.CAPTURE_WORKERS_PER_INTERFACE,
+            fanout_mode=config.CAPTURE_FANOUT_MODE,
+            queue_size=config.CAPTURE_QUEUE_SIZE,
+            pcap_file=pcap_file
         )
         
         # Start sniffing
         try:
-            self.sniffer.start(count=count, timeout=timeout)
+            self.capture.start(count=count, timeout=timeout)
+        except KeyboardInterrupt:
+            print("\n\nStopping IDS...")
+            self.stop()
+    
+    def _start_flows(self, count: int, timeout: Optional[float]):
+        """Receive flow exports until stopped (no packet capture, so no Scapy)."""
+        from .netflow.listener import FlowListener
+        
+        self.flow_listener = FlowListener(
+            config.NETFLOW_HOST,
+            config.NETFLOW_PORT,
+            callback=self.process_flows,
+            buffer_size=config.NETFLOW_RECV_BUFFER,
+            metrics=self.metrics
+        )
+        try:
+            self.flow_listener.start(count=count, timeout=timeout)
         except KeyboardInterrupt:
             print("\n\nStopping IDS...")
             self.stop()
@@ -107,8 +440,20 @@ class IDSEngine:
         """Stop the IDS engine."""
         self.running = False
         
-        if self.sniffer:
-            self.sniffer.stop()
+        if self.capture:
+            self.capture.stop()
+        if self.flow_listener:
+            self.flow_listener.stop()
+        
+        # Last batch to the collector (spooled if it is unreachable)
+        if self.reporter:
+            self.reporter.stop()
+        
+        if self.checkpoints:
+            try:
+                self.checkpoints.save_now()
+            except (OSError, TypeError, ValueError) as e:
+                print(f"\n❌ Could not save checkpoint: {e}")
         
         # Print final statistics
         self.print_statistics()
@@ -119,8 +464,13 @@ class IDSEngine:
         print("  IDS STATISTICS")
         print("=" * 70)
         print(f"  Packets Processed: {self.stats['packets_processed']:,}")
+        if self.flow_listener or self.stats['flows_processed']:
+            print(f"  Flows Processed: {self.stats['flows_processed']:,}")
         print(f"  Anomalies Detected: {self.stats['anomalies_detected']:,}")
         print(f"  Alerts Generated: {self.stats['alerts_generated']:,}")
+        print(f"  Packets Suppressed: {self.stats['packets_suppressed']:,}")
+        print(f"  Packets Shed: {self.stats['packets_shed']:,} "
+              f"(sampling rate {self.load_shedder.effective_rate:.2f})")
         print("=" * 70)
         
         # Alert breakdown
@@ -129,13 +479,114 @@ class IDSEngine:
         print(f"    🔴 HIGH: {alert_stats['by_severity']['HIGH']}")
         print(f"    🟠 MEDIUM: {alert_stats['by_severity']['MEDIUM']}")
         print(f"    🟡 LOW: {alert_stats['by_severity']['LOW']}")
+        
+        # Throughput and per-stage latency
+        uptime = time.time() - self.metrics.start_time
+        drops = self.capture.kernel_drops() if self.capture else 0
+        print(f"\n  Alert Rate: {self.stats['alerts_generated'] / max(uptime, 1e-9):.2f}/sec")
+        print(f"  Kernel Drops: {drops:,}")
+        print(f"  Capture Lag: {self.capture_lag * 1000:.1f} ms")
+        
+        flows = self.flow_listener.get_stats() if self.flow_listener else None
+        if flows:
+            print(f"\n  Flow Exporters:")
+            print(f"    {'exporter':<18}{'packets':>10}{'flows':>12}{'errors':>8}")
+            for name, entry in flows['exporters'].items():
+                print(f"    {name:<18}{entry['packets']:>10,}{entry['flows']:>12,}"
+                      f"{entry['errors']:>8,}")
+            decoder = flows['decoder']
+            print(f"    Socket drops: {flows['kernel_drops']:,}  "
+                  f"Data without template: {decoder['missing_templates']:,}")
+        
+        capture = self.capture.get_stats() if self.capture else None
+        if capture and len(capture['interfaces']) > 1:
+            print(f"\n  Capture Interfaces:")
+            print(f"    {'interface':<18}{'workers':>8}{'packets':>12}{'kernel drops':>14}{'queue drops':>13}")
+            for name, entry in capture['interfaces'].items():
+                print(f"    {name:<18}{entry['workers']:>8}{entry['packet_count']:>12,}"
+                      f"{entry['kernel_drops']:>14,}{entry['queue_drops']:>13,}")
+        
+        stages = self.metrics.stage_summary()
+        if stages:
+            print(f"\n  Stage Latency (µs):")
+            print(f"    {'stage':<18}{'count':>10}{'mean':>9}{'p50':>9}{'p99':>9}{'max':>10}")
+            for stage, summary in stages.items():
+                print(f"    {stage:<18}{summary['count']:>10,}{summary['mean_us']:>9.1f}"
+                      f"{summary['p50_us']:>9.1f}{summary['p99_us']:>9.1f}{summary['max_us']:>10.1f}")
+        
+        print(f"\n  Detector Cost:")
+        print(f"    {'detector':<18}{'packets':>10}{'skipped':>10}{'flows':>10}{'time ms':>10}{'alerts':>8}")
+        for name, cost in self.detectors.get_statistics().items():
+            if cost['enabled']:
+                print(f"    {name:<18}{cost['packets']:>10,}{cost['skipped_packets']:>10,}"
+                      f"{cost['flows']:>10,}{cost['time_ms']:>10.1f}{cost['alerts']:>8,}")
         print("\n" + "=" * 70 + "\n")
     
     def get_statistics(self) -> dict:
         """Get current IDS statistics."""
-        return {
-            'engine': self.stats,
-            'anomaly_detector': self.anomaly_detector.get_statistics(),
-            'rule_detector': self.rule_detector.get_statistics(),
-            'alert_manager': self.alert_manager.get_statistics()
-        }
\ No newline at end of file
+        stats = {'engine': self.stats}
+        for detector in self.detectors:
+            stats[detector.name] = detector.get_statistics()
+        stats.update({
+            'detectors': self.detectors.get_statistics(),
+            'hosts': self.hosts.get_statistics(),
+            'capture': self.capture.get_stats() if self.capture else None,
+            'netflow': self.flow_listener.get_stats() if self.flow_listener else None,
+            'collector': self.reporter.get_statistics() if self.reporter else None,
+            'alert_manager': self.alert_manager.get_statistics(),
+            'reputation': self.reputation.get_statistics(),
+            'checkpoints': self.checkpoints.get_statistics() if self.checkpoints else None,
+            'load_shedding': self.load_shedder.get_statistics(),
+            'latency': self.metrics.stage_summary()
+        })
+        return stats
+    
+    def get_state(self) -> dict:
+        """
+        Get the state of every component for checkpointing.
+
+        Host records are not included: the checkpoint manager saves them
+        copy-on-write under 'hosts' (see HostSnapshot).
+        """
+        state = {
+            'saved_at': time.time(),
+            'engine': dict(self.stats),
+            'alert_manager': self.alert_manager.get_state()
+        }
+        if self.timeseries:
+            state['timeseries'] = self.timeseries.get_state()
+        for detector in self.detectors:
+            state[detector.name] = detector.get_state()
+        return state
+    
+    def restore_checkpoint(self) -> bool:
+        """
+        Warm-start from the last checkpoint, if there is one.
+        
+        Returns:
+            True if state was restored
+        """
+        state = self.checkpoints.load()
+        if not state:
+            return False
+        
+        self.stats.update(state.get('engine', {}))
+        for detector in self.detectors:
+            detector.load_state(state.get(detector.name, {}))
+        for name, saved in state.get('hosts', {}).items():
+            detector = self.detectors.get(name)
+            if detector is None:
+                continue
+            for ip, data in saved.items():
+                try:
+                    host = self.hosts.get(address_to_int(ip))
+                except ValueError:
+                    continue
+                detector.load_host(host, data)
+        self.alert_manager.load_state(state.get('alert_manager', {}))
+        if self.timeseries:
+            self.timeseries.load_state(state.get('timeseries', {}))
+        
+        age = time.time() - state.get('saved_at', time.time())
+        print(f"\n  ♻️  Restored detector state from {config.CHECKPOINT_FILE} ({age:.0f}s old)")
+        return True
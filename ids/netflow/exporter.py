@@ -0,0 +1,249 @@
+"""
+Flow Exporter
+Aggregates packets into flows and exports them as NetFlow v5, v9 or IPFIX (for replay tests)
+"""
+import socket
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .decoder import (IPFIX, IPFIX_HEADER, IPFIX_TEMPLATE, NETFLOW_V5, NETFLOW_V9,
+                      SET_HEADER, V5_HEADER, V5_RECORD, V9_HEADER, V9_TEMPLATE)
+
+# Records per export packet, keeping datagrams under a typical MTU
+V5_MAX_RECORDS = 30
+MAX_RECORDS = 24
+
+# Template ids and layouts (element id, length) used for the exported records
+IPV4_TEMPLATE, IPV6_TEMPLATE = 256, 257
+V9_FIELDS = {
+    IPV4_TEMPLATE: ((8, 4), (12, 4), (7, 2), (11, 2), (4, 1), (6, 1),
+                    (2, 4), (1, 8), (22, 4), (21, 4)),
+    IPV6_TEMPLATE: ((27, 16), (28, 16), (7, 2), (11, 2), (4, 1), (6, 1),
+                    (2, 4), (1, 8), (22, 4), (21, 4)),
+}
+IPFIX_FIELDS = {
+    IPV4_TEMPLATE: ((8, 4), (12, 4), (7, 2), (11, 2), (4, 1), (6, 1),
+                    (2, 8), (1, 8), (152, 8), (153, 8)),
+    IPV6_TEMPLATE: ((27, 16), (28, 16), (7, 2), (11, 2), (4, 1), (6, 1),
+                    (2, 8), (1, 8), (152, 8), (153, 8)),
+}
+V9_RECORDS = {IPV4_TEMPLATE: struct.Struct('!4s4sHHBBIQII'),
+              IPV6_TEMPLATE: struct.Struct('!16s16sHHBBIQII')}
+IPFIX_RECORDS = {IPV4_TEMPLATE: struct.Struct('!4s4sHHBBQQQQ'),
+                 IPV6_TEMPLATE: struct.Struct('!16s16sHHBBQQQQ')}
+
+UPTIME_MASK = 0xFFFFFFFF
+
+
+def flows_from_packets(packets: Iterable[dict], inactive_timeout: float = 15.0,
+                       active_timeout: float = 60.0) -> Iterator[Dict]:
+    """
+    Aggregate packets into unidirectional flows, like a router's flow cache.
+
+    A flow ends when no packet of it was seen for inactive_timeout seconds
+    or it has been running for active_timeout seconds (capture time).
+
+    Args:
+        packets: Packet information dictionaries in capture order
+
+    Yields:
+        Flows with addresses, 'protocol', ports (ICMP type * 256 + code in
+        'dst_port'), combined TCP 'flags', 'packets', 'bytes', 'start', 'end'
+    """
+    cache: Dict[Tuple, Dict] = {}
+    seen = 0
+    for packet_info in packets:
+        src_ip = packet_info.get('src_ip')
+        if not src_ip:
+            continue
+        now = packet_info.get('capture_time', 0.0)
+        if packet_info.get('transport') == 'ICMP':
+            src_port = 0
+            dst_port = (packet_info.get('type', 0) << 8) | packet_info.get('code', 0)
+        else:
+            src_port = packet_info.get('src_port', 0)
+            dst_port = packet_info.get('dst_port', 0)
+        key = (src_ip, packet_info.get('dst_ip'), packet_info.get('protocol', 0),
+               src_port, dst_port)
+
+        flow = cache.get(key)
+        if flow is not None and (now - flow['end'] > inactive_timeout
+                                 or now - flow['start'] > active_timeout):
+            yield cache.pop(key)
+            flow = None
+        if flow is None:
+            flow = cache[key] = {
+                'ip_version': packet_info.get('ip_version', 4),
+                'src_ip': src_ip, 'dst_ip': key[1], 'protocol': key[2],
+                'src_port': src_port, 'dst_port': dst_port,
+                'flags': 0, 'packets': 0, 'bytes': 0, 'start': now, 'end': now
+            }
+        flow['packets'] += 1
+        flow['bytes'] += packet_info.get('length', 0)
+        flow['flags'] |= packet_info.get('flags', 0) or 0
+        flow['end'] = max(flow['end'], now)
+
+        # Sweep idle flows now and then, so long captures stay bounded
+        seen += 1
+        if seen % 1024 == 0:
+            for key in [k for k, f in cache.items() if now - f['end'] > inactive_timeout]:
+                yield cache.pop(key)
+
+    yield from sorted(cache.values(), key=lambda f: f['end'])
+
+
+def _address(flow: Dict, field: str) -> bytes:
+    family = socket.AF_INET6 if flow['ip_version'] == 6 else socket.AF_INET
+    return socket.inet_pton(family, flow[field])
+
+
+class FlowExporter:
+    """
+    Sends flows to a collector as NetFlow v5, NetFlow v9 or IPFIX.
+
+    Packets are built the way routers build them: v5 packets of up to 30
+    IPv4 records, v9/IPFIX packets with one data set per address family and
+    the templates repeated every template_interval packets.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 2055, version: int = NETFLOW_V5,
+                 template_interval: int = 20):
+        """
+        Initialize flow exporter.
+
+        Args:
+            host: Collector (listener) address
+            port: Collector UDP port
+            version: 5, 9 or 10 (IPFIX)
+            template_interval: Export packets between two template announcements
+        """
+        if version not in (NETFLOW_V5, NETFLOW_V9, IPFIX):
+            raise ValueError(f"Unsupported export version {version}")
+        self.address = (host, port)
+        self.version = version
+        self.template_interval = max(template_interval, 1)
+        self.sequence = 0
+        self.encoded = 0
+        self.packets_sent = 0
+        self.flows_sent = 0
+        self.skipped = 0
+        self.boot: Optional[float] = None
+        self._socket = socket.socket(
+            socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_DGRAM
+        )
+
+    def export(self, flows: List[Dict]) -> int:
+        """
+        Encode and send flows.
+
+        Returns:
+            Number of export packets sent
+        """
+        datagrams = self.encode(flows)
+        for datagram in datagrams:
+            self._socket.sendto(datagram, self.address)
+        self.packets_sent += len(datagrams)
+        return len(datagrams)
+
+    def encode(self, flows: List[Dict]) -> List[bytes]:
+        """Encode flows into export packets."""
+        if not flows:
+            return []
+        if self.boot is None:
+            # Exporter "booted" shortly before the first flow
+            self.boot = min(flow['start'] for flow in flows) - 60
+        if self.version == NETFLOW_V5:
+            v4 = [flow for flow in flows if flow['ip_version'] == 4]
+            self.skipped += len(flows) - len(v4)
+            return [self._encode_v5(v4[i:i + V5_MAX_RECORDS])
+                    for i in range(0, len(v4), V5_MAX_RECORDS)]
+        return [self._encode_templated(flows[i:i + MAX_RECORDS])
+                for i in range(0, len(flows), MAX_RECORDS)]
+
+    def _uptime(self, timestamp: float) -> int:
+        return max(int((timestamp - self.boot) * 1000), 0) & UPTIME_MASK
+
+    def _encode_v5(self, flows: List[Dict]) -> bytes:
+        export_time = max(flow['end'] for flow in flows)
+        header = V5_HEADER.pack(
+            NETFLOW_V5, len(flows), self._uptime(export_time), int(export_time),
+            int(export_time % 1 * 1e9), self.sequence & UPTIME_MASK, 0, 0, 0
+        )
+        records = [
+            V5_RECORD.pack(
+                _address(flow, 'src_ip'), _address(flow, 'dst_ip'), 0, 0,
+                flow['packets'] & UPTIME_MASK, flow['bytes'] & UPTIME_MASK,
+                self._uptime(flow['start']), self._uptime(flow['end']),
+                flow['src_port'], flow['dst_port'], flow['flags'] & 0xFF, flow['protocol'],
+                0, 0, 0, 0, 0
+            )
+            for flow in flows
+        ]
+        self.sequence += len(flows)
+        self.flows_sent += len(flows)
+        return header + b''.join(records)
+
+    def _encode_templated(self, flows: List[Dict]) -> bytes:
+        """Build one v9/IPFIX packet: templates when due, then the data sets."""
+        ipfix = self.version == IPFIX
+        fields = IPFIX_FIELDS if ipfix else V9_FIELDS
+        layouts = IPFIX_RECORDS if ipfix else V9_RECORDS
+        sets = []
+        records = 0
+
+        if self.encoded % self.template_interval == 0:
+            body = b''.join(
+                struct.pack('!HH', template_id, len(template))
+                + b''.join(struct.pack('!HH', *field) for field in template)
+                for template_id, template in fields.items()
+            )
+            sets.append(self._set(IPFIX_TEMPLATE if ipfix else V9_TEMPLATE, body, ipfix))
+            records += len(fields)
+
+        export_time = max(flow['end'] for flow in flows)
+        for template_id, layout in layouts.items():
+            family = 6 if template_id == IPV6_TEMPLATE else 4
+            members = [flow for flow in flows if flow['ip_version'] == family]
+            if not members:
+                continue
+            if ipfix:
+                body = b''.join(layout.pack(
+                    _address(flow, 'src_ip'), _address(flow, 'dst_ip'),
+                    flow['src_port'], flow['dst_port'], flow['protocol'], flow['flags'] & 0xFF,
+                    flow['packets'], flow['bytes'],
+                    int(flow['start'] * 1000), int(flow['end'] * 1000)
+                ) for flow in members)
+            else:
+                body = b''.join(layout.pack(
+                    _address(flow, 'src_ip'), _address(flow, 'dst_ip'),
+                    flow['src_port'], flow['dst_port'], flow['protocol'], flow['flags'] & 0xFF,
+                    flow['packets'] & UPTIME_MASK, flow['bytes'],
+                    self._uptime(flow['start']), self._uptime(flow['end'])
+                ) for flow in members)
+            sets.append(self._set(template_id, body, ipfix))
+            records += len(members)
+
+        payload = b''.join(sets)
+        if ipfix:
+            header = IPFIX_HEADER.pack(IPFIX, IPFIX_HEADER.size + len(payload),
+                                       int(export_time), self.sequence & UPTIME_MASK, 0)
+            self.sequence += len(flows)
+        else:
+            # The header has whole seconds only: uptime is taken at the same second
+            header = V9_HEADER.pack(NETFLOW_V9, records, self._uptime(int(export_time)),
+                                    int(export_time), self.sequence & UPTIME_MASK, 0)
+            self.sequence += 1
+        self.encoded += 1
+        self.flows_sent += len(flows)
+        return header + payload
+
+    @staticmethod
+    def _set(set_id: int, body: bytes, ipfix: bool) -> bytes:
+        # v9 flowsets are padded to 32 bits; IPFIX sets need no padding
+        if not ipfix:
+            body += b'\x00' * (-len(body) % 4)
+        return SET_HEADER.pack(set_id, SET_HEADER.size + len(body)) + body
+
+    def close(self):
+        """Close the socket."""
+        self._socket.close()
@@ -0,0 +1,201 @@
+"""
+Flow Listener
+Receives NetFlow/IPFIX export packets over UDP and hands their flows to the engine
+"""
+import socket
+import struct
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from .decoder import FlowDecoder
+
+# Linux SO_RXQ_OVFL: each datagram carries the socket's running drop count
+SO_RXQ_OVFL = 40
+DROPS = struct.Struct('I')
+
+# Exporters tracked individually; more are counted under 'other'
+MAX_EXPORTERS = 1024
+
+
+class FlowListener:
+    """
+    Receives flow exports from routers instead of capturing packets.
+
+    Each export packet is decoded in one go (see FlowDecoder) and its flows
+    are passed to the callback as one list, so a datagram of up to a few
+    dozen flows costs one receive and one decode call. Datagrams that
+    arrive faster than they are decoded are queued by the kernel in a
+    socket buffer of buffer_size bytes; what it drops is counted (Linux).
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 2055,
+                 callback: Optional[Callable[[List[dict]], None]] = None,
+                 buffer_size: int = 8 * 1024 * 1024, metrics=None):
+        """
+        Initialize flow listener.
+
+        Args:
+            host: Address to receive exports on
+            port: UDP port to receive exports on
+            callback: Function called with the flows of each export packet
+            buffer_size: Socket receive buffer in bytes
+            metrics: Optional Metrics registry for decode timing
+        """
+        self.address = (host, port)
+        self.callback = callback
+        self.buffer_size = buffer_size
+        self.metrics = metrics
+        self.decoder = FlowDecoder()
+        self.running = False
+        self.start_time = None
+        self.packet_count = 0
+        self.flow_count = 0
+        self.errors = 0
+        self.kernel_drops = 0
+        self.exporters: Dict[str, Dict] = {}
+        self._socket: Optional[socket.socket] = None
+
+    def open(self):
+        """
+        Bind the UDP socket (port 0 binds a free port, see self.address).
+
+        Raises:
+            OSError: If the address cannot be bound
+        """
+        family = socket.AF_INET6 if ':' in self.address[0] else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.buffer_size)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+            except OSError:
+                pass
+            sock.bind(self.address)
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(0.5)
+        self._socket = sock
+        self.address = sock.getsockname()[:2]
+
+    def start(self, count: int = 0, timeout: Optional[float] = None):
+        """
+        Receive and decode exports until stopped.
+
+        Args:
+            count: Number of flows to receive (0 = infinite)
+            timeout: Timeout in seconds (None = no timeout)
+        """
+        self.running = True
+        self.start_time = time.time()
+
+        print(f"\n{'='*70}")
+        print(f"  FLOW LISTENER STARTED")
+        print(f"{'='*70}")
+        print(f"  NetFlow v5/v9/IPFIX: udp://{self.address[0]}:{self.address[1]}")
+        print(f"  Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"{'='*70}\n")
+
+        try:
+            if self._socket is None:
+                self.open()
+            deadline = self.start_time + timeout if timeout else None
+            ancillary = socket.CMSG_SPACE(DROPS.size)
+            while self.running:
+                if deadline and time.time() >= deadline:
+                    break
+                try:
+                    data, cmsgs, _, source = self._socket.recvmsg(65535, ancillary)
+                except socket.timeout:
+                    continue
+                for level, kind, value in cmsgs:
+                    if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                        (self.kernel_drops,) = DROPS.unpack(value[:DROPS.size])
+                self.receive(data, source[0])
+                if count and self.flow_count >= count:
+                    break
+        except Exception as e:
+            print(f"\n❌ ERROR: {str(e)}")
+        finally:
+            self.running = False
+            if self._socket:
+                self._socket.close()
+                self._socket = None
+
+    def receive(self, data: bytes, exporter: str) -> List[dict]:
+        """
+        Decode one export packet and pass its flows to the callback.
+
+        Returns:
+            The decoded flows
+        """
+        started = time.perf_counter_ns()
+        self.packet_count += 1
+        entry = self._exporter(exporter)
+        entry['packets'] += 1
+        entry['last_seen'] = time.time()
+
+        try:
+            flows = self.decoder.decode(data, exporter)
+        except ValueError:
+            self.errors += 1
+            entry['errors'] += 1
+            return []
+
+        self.flow_count += len(flows)
+        entry['flows'] += len(flows)
+        if self.metrics:
+            self.metrics.observe('flow_decode', time.perf_counter_ns() - started)
+
+        if flows and self.callback:
+            self.callback(flows)
+        return flows
+
+    def _exporter(self, exporter: str) -> Dict:
+        entry = self.exporters.get(exporter)
+        if entry is None:
+            if len(self.exporters) >= MAX_EXPORTERS:
+                exporter = 'other'
+                entry = self.exporters.get(exporter)
+            if entry is None:
+                entry = self.exporters[exporter] = {
+                    'packets': 0, 'flows': 0, 'errors': 0, 'last_seen': None
+                }
+        return entry
+
+    def stop(self):
+        """Stop receiving exports."""
+        self.running = False
+
+        if self.start_time:
+            duration = time.time() - self.start_time
+            print(f"\n{'='*70}")
+            print(f"  FLOW LISTENER STOPPED")
+            print(f"{'='*70}")
+            print(f"  Export packets: {self.packet_count} from {len(self.exporters)} exporters")
+            print(f"  Flows: {self.flow_count}")
+            print(f"  Duration: {duration:.2f} seconds")
+            print(f"  Rate: {self.flow_count/duration:.2f} flows/sec")
+            print(f"{'='*70}\n")
+
+    def get_stats(self) -> Dict:
+        """Get listener statistics, overall and per exporter."""
+        duration = time.time() - self.start_time if self.start_time else 0
+        exporters = {}
+        # list() copies at once; the listener thread keeps adding exporters
+        for name, entry in list(self.exporters.items()):
+            exporters[name] = dict(entry, rate=entry['flows'] / duration if duration > 0 else 0)
+
+        return {
+            'address': f"{self.address[0]}:{self.address[1]}",
+            'packet_count': self.packet_count,
+            'flow_count': self.flow_count,
+            'errors': self.errors,
+            'kernel_drops': self.kernel_drops,
+            'duration': duration,
+            'rate': self.flow_count / duration if duration > 0 else 0,
+            'running': self.running,
+            'decoder': self.decoder.get_statistics(),
+            'exporters': exporters
+        }
@@ -1,14 +1,13 @@
 """
 Flask Web Dashboard for IDS
 """
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, request
 import os
 import sys
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from ids.ids_engine import IDSEngine
 from ids.core.config import config
 
 app = Flask(__name__)
@@ -53,6 +52,44 @@ def get_anomalies():
     
     return jsonify([])
 
+@app.route('/api/timeseries')
+def get_timeseries():
+    """Get traffic and alert counts over time: ?resolution=1s|1m|1h&start=&end= (epoch seconds)."""
+    if not ids_engine or not ids_engine.timeseries:
+        return jsonify({'resolution': None, 'step': 0, 'timestamps': [], 'series': {}})
+    
+    try:
+        series = ids_engine.timeseries.query(
+            request.args.get('resolution', '1m'),
+            start=request.args.get('start', type=float),
+            end=request.args.get('end', type=float)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(series)
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics endpoint."""
+    body = ids_engine.metrics.render_prometheus() if ids_engine else ''
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiler', methods=['GET', 'POST'])
+def profiler():
+    """Get sampling profiler results, or start/stop it with {"enabled": true|false}."""
+    if not ids_engine:
+        return jsonify({'running': False, 'samples': 0, 'top_stacks': []})
+    
+    sampler = ids_engine.metrics.profiler
+    if request.method == 'POST':
+        enabled = (request.get_json(silent=True) or {}).get('enabled', not sampler.running)
+        if enabled:
+            sampler.start(ids_engine.packet_thread_id)
+        else:
+            sampler.stop()
+    
+    return jsonify(sampler.report())
+
 def run_dashboard(engine):
     """Run the dashboard server."""
     global ids_engine
@@ -0,0 +1,67 @@
+"""
+Flask Web Dashboard for the Collector
+Combined view of all sensors reporting to one collector
+"""
+from flask import Flask, jsonify, render_template, request
+
+app = Flask(__name__)
+
+# Collector instance (will be set from run_collector.py)
+collector = None
+
+@app.route('/')
+def index():
+    """Main dashboard page (the sensor dashboard, with a sensors table)."""
+    return render_template('dashboard.html')
+
+@app.route('/api/stats')
+def get_stats():
+    """Get statistics merged over all sensors."""
+    if not collector:
+        return jsonify({})
+    return jsonify(collector.get_statistics())
+
+@app.route('/api/alerts')
+def get_alerts():
+    """Get recent alerts of all sensors, each with its 'sensor'."""
+    if not collector:
+        return jsonify([])
+    with collector.lock:
+        alerts = list(collector.alerts)
+    return jsonify(alerts[-request.args.get('limit', 100, type=int):])
+
+@app.route('/api/sensors')
+def get_sensors():
+    """Get per-sensor status."""
+    if not collector:
+        return jsonify({})
+    return jsonify(collector.get_statistics()['sensors'])
+
+@app.route('/api/timeseries')
+def get_timeseries():
+    """Get traffic and alert counts over time, summed over sensors."""
+    if not collector:
+        return jsonify({'resolution': None, 'step': 0, 'timestamps': [], 'series': {}})
+
+    try:
+        with collector.lock:
+            series = collector.timeseries.query(
+                request.args.get('resolution', '1m'),
+                start=request.args.get('start', type=float),
+                end=request.args.get('end', type=float)
+            )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(series)
+
+def run_dashboard(instance, host: str = "127.0.0.1", port: int = 5000):
+    """Run the collector dashboard server."""
+    global collector
+    collector = instance
+
+    app.run(
+        host=host,
+        port=port,
+        debug=False,
+        use_reloader=False
+    )
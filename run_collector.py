@@ -0,0 +1,82 @@
+"""
+Run the central collector that sensors report to
+
+Sensors connect with: python -m ids live --collector HOST:PORT --sensor-name NAME
+--collector-token TOKEN (or COLLECTOR_HOST/COLLECTOR_PORT/COLLECTOR_TOKEN in
+ids/core/config.py); the collector only accepts sensors presenting its token.
+"""
+import argparse
+import sys
+import threading
+import time
+from ids.collector.server import Collector
+from ids.core.config import config
+
+def main():
+    """Run the collector and its combined dashboard."""
+    parser = argparse.ArgumentParser(description='Central collector for IDS sensors')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to accept sensors on (0.0.0.0: all interfaces)')
+    parser.add_argument('--port', type=int, default=config.COLLECTOR_PORT,
+                        help='port to accept sensors on')
+    parser.add_argument('--token', default=config.COLLECTOR_TOKEN,
+                        help='shared token sensors must present (default: COLLECTOR_TOKEN)')
+    parser.add_argument('--dashboard-host', default=config.DASHBOARD_HOST)
+    parser.add_argument('--dashboard-port', type=int, default=config.DASHBOARD_PORT)
+    parser.add_argument('--no-dashboard', action='store_true',
+                        help='only collect (statistics are printed on exit)')
+    args = parser.parse_args()
+
+    collector = Collector(
+        args.host,
+        args.port,
+        token=args.token,
+        max_alerts=config.MAX_ALERTS_IN_MEMORY,
+        top_talkers=config.COLLECTOR_TOP_TALKERS,
+        timeseries_points=config.TIMESERIES_POINTS
+    )
+    try:
+        collector.start()
+    except ValueError as e:
+        print(f"\n❌ {e}: set it or pass --token")
+        sys.exit(1)
+    except OSError as e:
+        print(f"\n❌ Could not listen on {args.host}:{args.port}: {e}")
+        sys.exit(1)
+
+    print("\n" + "=" * 70)
+    print("  IDS COLLECTOR")
+    print("=" * 70)
+    print(f"  Sensors: {collector.address[0]}:{collector.address[1]}")
+
+    if not args.no_dashboard:
+        from ids.web.collector_app import run_dashboard
+        threading.Thread(
+            target=run_dashboard,
+            args=(collector, args.dashboard_host, args.dashboard_port),
+            daemon=True
+        ).start()
+        print(f"  📊 Dashboard: http://{args.dashboard_host}:{args.dashboard_port}")
+    print("\n  Press Ctrl+C to stop")
+    print("=" * 70 + "\n")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Shutting down collector...")
+
+    collector.stop()
+    stats = collector.get_statistics()
+    print(f"\n  Sensors: {stats['collector']['sensors']}  "
+          f"Batches: {stats['collector']['batches']:,}  "
+          f"Duplicates: {stats['collector']['duplicates']:,}")
+    print(f"  Packets: {stats['engine']['packets_processed']:,}  "
+          f"Alerts: {stats['engine']['alerts_generated']:,}")
+    for name, sensor in stats['sensors'].items():
+        print(f"    {name:<20}{sensor['packets_processed']:>12,} packets"
+              f"{sensor['alerts_generated']:>8,} alerts")
+    print()
+
+if __name__ == '__main__':
+    main()
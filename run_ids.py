@@ -1,15 +1,20 @@
 """
 Run the Network IDS
+
+Without arguments, asks for the mode; with arguments, runs non-interactively
+(same options as python -m ids, e.g. run_ids.py live -i eth0 --dashboard).
 """
 import sys
 import threading
 import time
-from ids.ids_engine import IDSEngine
-from ids.web.app import run_dashboard
 from ids.core.config import config
 
 def main():
     """Main function to run IDS."""
+    if len(sys.argv) > 1:
+        from ids.cli import main as run_cli
+        sys.exit(run_cli(sys.argv[1:]))
+    
     print("\n" + "=" * 70)
     print("  NETWORK INTRUSION DETECTION SYSTEM v1.0")
     print("=" * 70)
@@ -31,6 +36,8 @@ def main():
 def run_capture_mode():
     """Run IDS with real packet capture."""
     print("\n  Starting system components...")
+    from ids.ids_engine import IDSEngine
+    from ids.web.app import run_dashboard
     
     # Create IDS engine
     ids = IDSEngine()
@@ -80,6 +87,8 @@ def run_demo_mode():
     """Run IDS with simulated traffic."""
     import random
     from datetime import datetime
+    from ids.ids_engine import IDSEngine
+    from ids.web.app import run_dashboard
     
     def generate_demo_traffic(ids_engine):
         """Generate continuous fake traffic."""
@@ -0,0 +1,19 @@
+"""
+Shared fixtures
+"""
+import pytest
+
+from ids.core.config import config
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """An engine writing its files under tmp_path, without checkpoints or a collector."""
+    from ids.ids_engine import IDSEngine
+
+    monkeypatch.setattr(config, 'ALERT_LOG_FILE', str(tmp_path / 'alerts.log'))
+    monkeypatch.setattr(config, 'ENABLE_CHECKPOINTS', False)
+    monkeypatch.setattr(config, 'COLLECTOR_HOST', None)
+    engine = IDSEngine()
+    yield engine
+    engine.reputation.stop_watching()
@@ -0,0 +1,37 @@
+"""
+Capture tests: batches from the capture manager to the detectors' batch hooks
+"""
+from scapy.layers.inet import IP, UDP
+from scapy.layers.l2 import Ether
+from scapy.utils import wrpcap
+
+from ids.core.capture import CaptureManager
+from ids.detectors.registry import Detector
+
+
+class BatchCounter(Detector):
+    name = 'batch_counter'
+
+    def __init__(self):
+        self.batches = []
+
+    def on_batch(self, packets):
+        self.batches.append(len(packets))
+        return [{'type': 'Batch', 'severity': 'LOW', 'description': f"{len(packets)} packets"}]
+
+
+def test_capture_batches_reach_on_batch(engine, tmp_path):
+    path = str(tmp_path / 'capture.pcap')
+    wrpcap(path, [Ether() / IP(src='192.0.2.1', dst='198.51.100.2') / UDP(sport=5000, dport=9)
+                  for _ in range(5)])
+    counter = engine.detectors.register(BatchCounter())
+
+    capture = CaptureManager([None], engine.packet_callback, pcap_file=path,
+                             batch_callback=engine.process_batch)
+    capture.start()
+
+    assert engine.stats['packets_processed'] == 5
+    assert sum(counter.batches) == 5
+    assert capture.get_stats()['batches'] == len(counter.batches)
+    stats = engine.detectors.get_statistics()['batch_counter']
+    assert stats['batches'] == len(counter.batches) and stats['alerts'] == len(counter.batches)
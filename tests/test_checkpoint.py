@@ -0,0 +1,153 @@
+"""
+Checkpoint tests: copy-on-write host snapshots and save/restore round-trips
+"""
+import json
+import time
+
+from ids.core.address import V4_MAPPED, address_to_int, int_to_address
+from ids.core.checkpoint import (CHECKPOINT_MAGIC, CHECKPOINT_VERSION, CheckpointManager,
+                                 decode_snapshot, encode_snapshot, load_snapshot)
+from ids.core.config import IDSConfig
+from ids.core.hosts import HostTable
+from ids.detectors.anomaly_detector import AnomalyDetector
+from ids.detectors.scan_detector import ScanDetector
+
+START = 1_700_000_000.0
+
+
+def make_detectors(size=200000):
+    settings = IDSConfig()
+    hosts = HostTable(size)
+    anomaly = AnomalyDetector(settings, hosts)
+    scan = ScanDetector(settings, hosts)
+    hosts.dumpers = {anomaly.name: anomaly.dump_host, scan.name: scan.dump_host}
+    return hosts, anomaly, scan
+
+
+def packet(src: int, dst: int, when: float, flags='S', src_port=40000, dst_port=80) -> dict:
+    return {
+        'src_ip': int_to_address(V4_MAPPED | src), 'dst_ip': int_to_address(V4_MAPPED | dst),
+        'transport': 'TCP', 'flags': flags, 'src_port': src_port, 'dst_port': dst_port,
+        'length': 60, 'capture_time': when
+    }
+
+
+def feed(detectors, packets):
+    for info in packets:
+        for detector in detectors:
+            detector.on_packet(info)
+
+
+def members(saved) -> dict:
+    """Parse the JSON members a HostSnapshot saved for one dumper."""
+    return json.loads('{' + ','.join(saved) + '}')
+
+
+def get_state(anomaly, scan):
+    return lambda: {anomaly.name: anomaly.get_state(), scan.name: scan.get_state()}
+
+
+def restore(state, size=200000):
+    hosts, anomaly, scan = make_detectors(size)
+    anomaly.load_state(state[anomaly.name])
+    scan.load_state(state[scan.name])
+    detectors = {anomaly.name: anomaly, scan.name: scan}
+    for name, saved in state['hosts'].items():
+        for ip, data in saved.items():
+            detectors[name].load_host(hosts.get(address_to_int(ip)), data)
+    return hosts, anomaly, scan
+
+
+def test_snapshot_pause_is_bounded(tmp_path):
+    hosts, anomaly, scan = make_detectors()
+    feed([anomaly], (packet(0x0A000000 + i, 0x0A0000FE, START + i * 1e-4)
+                     for i in range(100000)))
+    assert len(hosts) >= 100000
+
+    manager = CheckpointManager(str(tmp_path / 'checkpoint.bin'), get_state(anomaly, scan),
+                                hosts=hosts)
+    manager.snapshot()
+    # Keep processing packets while the writer saves the table
+    slowest = 0
+    for i in range(20000):
+        started = time.perf_counter_ns()
+        feed([anomaly], [packet(0x0A000000 + i * 5, 0x0A0000FE, START + 10 + i * 1e-4)])
+        slowest = max(slowest, time.perf_counter_ns() - started)
+    manager._writer.join()
+
+    # Starting the snapshot is O(1): far below the cost of encoding 100k hosts
+    assert manager.last_pause_ns < 20e6
+    # A packet only copies the hosts it touches
+    assert slowest < 20e6
+    assert manager.snapshots_failed == 0
+    state = manager.load()
+    assert len(state['hosts'][anomaly.name]) == 100000
+
+
+def test_snapshot_saves_hosts_as_they_were_when_it_started(tmp_path):
+    hosts, anomaly, scan = make_detectors()
+    feed([anomaly], [packet(1, 2, START), packet(1, 2, START + 1), packet(3, 2, START + 2)])
+
+    view = hosts.begin_snapshot()
+    # Changed, created and evicted after the start
+    feed([anomaly], [packet(1, 2, START + 3), packet(4, 2, START + 4)])
+    saved = members(view.collect()[anomaly.name])
+
+    assert saved[int_to_address(V4_MAPPED | 1)][0] == 2
+    assert saved[int_to_address(V4_MAPPED | 3)][0] == 1
+    assert int_to_address(V4_MAPPED | 4) not in saved
+    assert hosts.snapshot is None
+    # The live table kept the new counts
+    assert hosts.find(V4_MAPPED | 1).packets == 3
+
+
+def test_evicted_host_is_saved(tmp_path):
+    hosts, anomaly, scan = make_detectors(size=2)
+    feed([anomaly], [packet(1, 9, START), packet(2, 9, START + 1)])
+    view = hosts.begin_snapshot()
+    # A third source evicts one of the first two
+    feed([anomaly], [packet(3, 9, START + 2)])
+    saved = members(view.collect()[anomaly.name])
+    assert set(saved) == {int_to_address(V4_MAPPED | 1), int_to_address(V4_MAPPED | 2)}
+
+
+def test_round_trip(tmp_path):
+    hosts, anomaly, scan = make_detectors()
+    traffic = []
+    for i in range(300):
+        when = START + i * 0.01
+        traffic.append(packet(7, 0x0A000000 + i, when, dst_port=1000 + i))
+        traffic.append(packet(0x0A000000 + i, 7, when, flags='RA', src_port=1000 + i,
+                              dst_port=40000))
+    feed([anomaly, scan], traffic)
+
+    path = str(tmp_path / 'checkpoint.bin')
+    manager = CheckpointManager(path, get_state(anomaly, scan), hosts=hosts)
+    manager.save_now()
+    state = manager.load()
+    assert decode_snapshot(encode_snapshot(state)) == state
+
+    restored_hosts, restored_anomaly, restored_scan = restore(state)
+    assert restored_anomaly.sources == anomaly.sources
+    assert restored_anomaly.get_top_talkers(5) == anomaly.get_top_talkers(5)
+    assert restored_scan.tracked_sources == scan.tracked_sources
+    assert restored_scan.tracked_targets == scan.tracked_targets
+    source = restored_hosts.find(V4_MAPPED | 7)
+    original = hosts.find(V4_MAPPED | 7)
+    assert source.scan_source.dump() == original.scan_source.dump()
+    assert (restored_anomaly.host_baselines.dump_record(source.baseline)
+            == anomaly.host_baselines.dump_record(original.baseline))
+
+
+def test_unusable_checkpoints_are_ignored(tmp_path):
+    state = {'alerts': [1, 2, 3]}
+    data = encode_snapshot(state, {'scan': ['"10.0.0.1":{"a":1}']})
+    assert decode_snapshot(data) == {**state, 'hosts': {'scan': {'10.0.0.1': {'a': 1}}}}
+
+    path = tmp_path / 'checkpoint.bin'
+    assert load_snapshot(str(path)) is None
+    header = len(CHECKPOINT_MAGIC)
+    newer = data[:header] + bytes([CHECKPOINT_VERSION + 1]) + data[header + 1:]
+    for bad in (b'garbage', data[:-10], newer):
+        path.write_bytes(bad)
+        assert load_snapshot(str(path)) is None
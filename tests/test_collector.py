@@ -0,0 +1,144 @@
+"""
+Collector tests: framing, sensor reporting and token checks
+"""
+import io
+import socket
+import time
+import zlib
+
+import pytest
+
+from ids.collector.protocol import (HEADER, decode_payload, encode_frame, read_frames,
+                                    recv_message)
+from ids.collector.sensor import SensorReporter
+from ids.collector.server import Collector
+
+TOKEN = 'secret'
+
+
+@pytest.fixture
+def collector():
+    server = Collector(port=0, token=TOKEN)
+    server.start()
+    yield server
+    server.stop()
+
+
+def reporter(engine, collector, tmp_path, token=TOKEN, **kwargs) -> SensorReporter:
+    host, port = collector.address
+    return SensorReporter(engine, host, port, name='test-sensor', token=token,
+                          spool_dir=str(tmp_path / 'spool'), **kwargs)
+
+
+def packet(number: int) -> dict:
+    return {'number': number, 'length': 100, 'src_ip': '192.0.2.1', 'dst_ip': '198.51.100.2',
+            'transport': 'UDP', 'src_port': 5000, 'dst_port': 53}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_frames_round_trip():
+    messages = [{'type': 'hello', 'sensor': 'a'}, {'type': 'batch', 'packets': [packet(1)]}]
+    data = b''.join(encode_frame(message) for message in messages)
+
+    frames = list(read_frames(io.BytesIO(data)))
+    assert [decode_payload(frame[HEADER.size:]) for frame in frames] == messages
+
+    # A spool file cut off inside its last frame yields the complete ones
+    assert len(list(read_frames(io.BytesIO(data[:-3])))) == 1
+
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(data)
+        left.close()
+        assert [recv_message(right), recv_message(right), recv_message(right)] == messages + [None]
+
+
+@pytest.mark.parametrize('payload', [b'not zlib', zlib.compress(b'{"truncated'),
+                                     zlib.compress(b'[1, 2]')])
+def test_corrupt_payload_raises_value_error(payload):
+    with pytest.raises(ValueError):
+        decode_payload(payload)
+
+
+def test_truncated_stream_raises_value_error():
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(encode_frame({'type': 'hello'})[:-2])
+        left.close()
+        with pytest.raises(ValueError):
+            recv_message(right)
+
+
+def test_batches_are_built_on_the_packet_thread(engine, collector, tmp_path):
+    sensor = reporter(engine, collector, tmp_path, interval=0.05)
+    engine.reporter = sensor
+    sensor.start()
+    for number in range(50):
+        engine.packet_callback(packet(number))
+    time.sleep(0.06)
+    engine.packet_callback(packet(50))
+    wait_for(lambda: sensor.stats['batches_sent'] >= 1)
+
+    # Packets after the last batch are sent by stop()
+    engine.packet_callback(packet(51))
+    sensor.stop()
+    merged = collector.sensors['test-sensor']
+    assert merged.counters['packets_processed'] == 52
+    assert sensor.stats['errors'] == 0
+
+
+def test_a_failed_cycle_does_not_stop_reporting(engine, collector, tmp_path, monkeypatch):
+    sensor = reporter(engine, collector, tmp_path, interval=0.05)
+    sensor.start()
+    failures = []
+
+    def flaky(message):
+        if not failures:
+            failures.append(message)
+            raise RuntimeError("dictionary changed size during iteration")
+        return encode_frame(message)
+
+    from ids.collector import sensor as sensor_module
+    encode_frame = sensor_module.encode_frame
+    monkeypatch.setattr(sensor_module, 'encode_frame', flaky)
+
+    sensor.collect()
+    wait_for(lambda: sensor.stats['errors'] == 1)
+    sensor.collect()
+    wait_for(lambda: sensor.stats['batches_sent'] == 1)
+    assert sensor._thread.is_alive()
+    sensor.stop()
+
+
+def test_rejected_token_raises_at_start(engine, collector, tmp_path):
+    sensor = reporter(engine, collector, tmp_path, token='wrong')
+    with pytest.raises(PermissionError):
+        sensor.start()
+    assert collector.refused == 1
+    assert 'test-sensor' not in collector.sensors
+
+
+def test_rejected_token_stops_reporting_instead_of_spooling(engine, collector, tmp_path):
+    sensor = reporter(engine, collector, tmp_path, interval=0.05)
+    sensor.start()
+    # The collector's token changes while the sensor runs
+    collector.token = 'rotated'
+    sensor._close()
+
+    sensor.collect()
+    wait_for(lambda: sensor.refused is not None)
+    sensor._thread.join(1)
+    assert not sensor._thread.is_alive()
+    assert sensor.spool_bytes() == 0
+    assert sensor.stats['batches_dropped'] == 1
+
+    # Nothing more is collected or sent
+    sensor.maybe_collect()
+    sensor.stop()
+    assert sensor.spool_bytes() == 0
@@ -0,0 +1,155 @@
+"""
+NetFlow tests: exporter/decoder round-trips for v5, v9 and IPFIX
+"""
+import socket
+import struct
+
+import pytest
+
+from ids.netflow.decoder import (IPFIX, IPFIX_HEADER, IPFIX_TEMPLATE, NETFLOW_V5, NETFLOW_V9,
+                                 SET_HEADER, FlowDecoder)
+from ids.netflow.exporter import FlowExporter, flows_from_packets
+
+START = 1_700_000_000.0
+EXPORTER = '192.0.2.250'
+
+
+def packets():
+    """Two TCP flows, a UDP flow and an IPv6 flow."""
+    for i in range(10):
+        when = START + i * 0.5
+        yield {'ip_version': 4, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'protocol': 6,
+               'transport': 'TCP', 'src_port': 40000, 'dst_port': 443, 'flags': 0x18,
+               'length': 1000, 'capture_time': when}
+        yield {'ip_version': 4, 'src_ip': '10.0.0.3', 'dst_ip': '10.0.0.2', 'protocol': 6,
+               'transport': 'TCP', 'src_port': 40001, 'dst_port': 22, 'flags': 0x02,
+               'length': 60, 'capture_time': when}
+    yield {'ip_version': 4, 'src_ip': '10.0.0.4', 'dst_ip': '10.0.0.53', 'protocol': 17,
+           'transport': 'UDP', 'src_port': 5353, 'dst_port': 53, 'length': 80,
+           'capture_time': START + 1}
+    yield {'ip_version': 6, 'src_ip': '2001:db8::1', 'dst_ip': '2001:db8::2', 'protocol': 17,
+           'transport': 'UDP', 'src_port': 5000, 'dst_port': 9, 'length': 120,
+           'capture_time': START + 2}
+
+
+def round_trip(version: int):
+    flows = list(flows_from_packets(packets()))
+    exporter = FlowExporter(version=version)
+    try:
+        datagrams = exporter.encode(flows)
+    finally:
+        exporter.close()
+    decoder = FlowDecoder()
+    decoded = [flow for datagram in datagrams for flow in decoder.decode(datagram, EXPORTER)]
+    return flows, decoded, decoder
+
+
+def key(flow):
+    return (flow['src_ip'], flow['dst_ip'], flow['protocol'], flow.get('src_port'),
+            flow.get('dst_port'))
+
+
+@pytest.mark.parametrize('version', [NETFLOW_V5, NETFLOW_V9, IPFIX])
+def test_round_trip(version):
+    flows, decoded, decoder = round_trip(version)
+    if version == NETFLOW_V5:
+        # v5 carries IPv4 only
+        flows = [flow for flow in flows if flow['ip_version'] == 4]
+    assert len(decoded) == len(flows)
+
+    by_key = {key(flow): flow for flow in decoded}
+    for flow in flows:
+        got = by_key[key(flow)]
+        assert got['packets'] == flow['packets']
+        assert got['bytes'] == flow['bytes']
+        assert got['exporter'] == EXPORTER
+        assert got['start'] == pytest.approx(flow['start'], abs=0.002)
+        assert got['end'] == pytest.approx(flow['end'], abs=0.002)
+        if flow['protocol'] == 6:
+            assert got['transport'] == 'TCP' and got['flags'] == flow['flags']
+    assert decoder.missing_templates == 0
+
+
+def test_data_before_template_is_skipped():
+    flows = list(flows_from_packets(packets()))
+    exporter = FlowExporter(version=NETFLOW_V9, template_interval=2)
+    try:
+        first, second = exporter.encode(flows[:1]), exporter.encode(flows[1:2])
+    finally:
+        exporter.close()
+
+    decoder = FlowDecoder()
+    # The second packet carries no template; until the first arrives it cannot be read
+    assert decoder.decode(second[0], EXPORTER) == []
+    assert decoder.missing_templates == 1
+    assert len(decoder.decode(first[0], EXPORTER)) == 1
+    assert len(decoder.decode(second[0], EXPORTER)) == 1
+
+
+def ipfix_message(template: bytes, data: bytes, template_id: int = 300) -> bytes:
+    sets = (SET_HEADER.pack(IPFIX_TEMPLATE, SET_HEADER.size + len(template)) + template
+            + SET_HEADER.pack(template_id, SET_HEADER.size + len(data)) + data)
+    return IPFIX_HEADER.pack(IPFIX, IPFIX_HEADER.size + len(sets), int(START), 1, 7) + sets
+
+
+def varlen(value: bytes) -> bytes:
+    if len(value) < 255:
+        return bytes([len(value)]) + value
+    return b'\xff' + struct.pack('!H', len(value)) + value
+
+
+def test_ipfix_enterprise_and_variable_length_fields():
+    # src, vendor element (enterprise 9), dst, interfaceName (variable length),
+    # ports, protocol, another vendor element of variable length, counters, times
+    fields = (struct.pack('!HH', 8, 4)
+              + struct.pack('!HHI', 0x8000 | 12, 4, 9)
+              + struct.pack('!HH', 12, 4)
+              + struct.pack('!HH', 82, 0xFFFF)
+              + struct.pack('!HH', 7, 2) + struct.pack('!HH', 11, 2)
+              + struct.pack('!HH', 4, 1)
+              + struct.pack('!HHI', 0x8000 | 40, 0xFFFF, 29305)
+              + struct.pack('!HH', 2, 8) + struct.pack('!HH', 1, 8)
+              + struct.pack('!HH', 152, 8) + struct.pack('!HH', 153, 8))
+    template = struct.pack('!HH', 300, 12) + fields
+
+    def record(src, dst, name, vendor, packets, octets):
+        return (socket.inet_aton(src) + b'\xde\xad\xbe\xef' + socket.inet_aton(dst)
+                + varlen(name) + struct.pack('!HHB', 40000, 80, 6) + varlen(vendor)
+                + struct.pack('!QQQQ', packets, octets, int(START * 1000),
+                              int((START + 3) * 1000)))
+
+    data = (record('10.1.0.1', '10.1.0.2', b'eth0', b'', 3, 180)
+            + record('10.1.0.3', '10.1.0.4', b'x' * 300, b'v' * 20, 7, 900))
+    flows = FlowDecoder().decode(ipfix_message(template, data), EXPORTER)
+
+    assert [(f['src_ip'], f['dst_ip'], f['src_port'], f['dst_port'], f['transport'],
+             f['packets'], f['bytes']) for f in flows] == [
+        ('10.1.0.1', '10.1.0.2', 40000, 80, 'TCP', 3, 180),
+        ('10.1.0.3', '10.1.0.4', 40000, 80, 'TCP', 7, 900),
+    ]
+    assert flows[0]['start'] == pytest.approx(START) and flows[0]['end'] == pytest.approx(START + 3)
+
+
+def test_ipfix_enterprise_field_in_fixed_layout():
+    # A fixed-length vendor element between the decoded fields
+    fields = (struct.pack('!HH', 8, 4) + struct.pack('!HHI', 0x8000 | 1, 6, 9)
+              + struct.pack('!HH', 12, 4) + struct.pack('!HH', 4, 1)
+              + struct.pack('!HH', 2, 4) + struct.pack('!HH', 1, 4))
+    template = struct.pack('!HH', 301, 6) + fields
+    data = (socket.inet_aton('10.2.0.1') + b'\x01' * 6 + socket.inet_aton('10.2.0.2')
+            + struct.pack('!BII', 17, 5, 500))
+    flows = FlowDecoder().decode(ipfix_message(template, data, 301), EXPORTER)
+
+    assert [(f['src_ip'], f['dst_ip'], f['transport'], f['packets'], f['bytes'])
+            for f in flows] == [('10.2.0.1', '10.2.0.2', 'UDP', 5, 500)]
+
+
+def test_malformed_packets_raise_value_error():
+    decoder = FlowDecoder()
+    with pytest.raises(ValueError):
+        decoder.decode(b'\x00', EXPORTER)
+    with pytest.raises(ValueError):
+        decoder.decode(struct.pack('!H', 7) + b'\x00' * 30, EXPORTER)
+    with pytest.raises(ValueError):
+        # A v5 header announcing records that are not there
+        decoder.decode(struct.pack('!HH', NETFLOW_V5, 5) + b'\x00' * 20, EXPORTER)
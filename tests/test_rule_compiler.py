@@ -0,0 +1,57 @@
+"""
+Rule compiler tests: port and fast-pattern indexing
+"""
+from ids.detectors.rule_compiler import CompiledRuleSet, validate_rule
+from ids.detectors.snort_importer import parse_snort_rule
+
+
+def packet(dst_port: int, payload: bytes, transport='TCP') -> dict:
+    return {'transport': transport, 'src_ip': '192.0.2.1', 'dst_ip': '198.51.100.2',
+            'src_port': 40000, 'dst_port': dst_port, 'flags': 'PA', 'payload': payload}
+
+
+def matched(rules, info) -> list:
+    return [compiled.id for compiled in CompiledRuleSet(rules).match(info)]
+
+
+def test_any_port_content_rules_are_indexed_by_fast_pattern():
+    rules = [parse_snort_rule(f'alert tcp any any -> any any (msg:"r{i}"; '
+                              f'content:"marker{i:03d}"; content:"x"; sid:{i + 1};)')
+             for i in range(200)]
+    rule_set = CompiledRuleSet(rules)
+
+    report = rule_set.report()
+    assert report['fast_pattern_rules'] == 200
+    assert report['unindexed_cost']['TCP'] == 0
+    assert [r.id for r in rule_set.match(packet(80, b'..marker007..x'))] == ['SID-8']
+    # The fast pattern alone is not enough: every content must occur
+    assert rule_set.match(packet(80, b'..marker007..')) == []
+    # Nor is the content enough without the header
+    assert rule_set.match(packet(80, b'..marker007..x', transport='UDP')) == []
+
+
+def test_large_port_ranges_are_checked_after_the_fast_pattern():
+    rule = parse_snort_rule('alert tcp any any -> any $SHELLCODE_PORTS '
+                            '(msg:"nop sled"; content:"|90 90 90|"; sid:1;)')
+    assert matched([rule], packet(81, b'\x90\x90\x90')) == ['SID-1']
+    assert matched([rule], packet(80, b'\x90\x90\x90')) == []
+
+
+def test_default_snort_variables():
+    rule = parse_snort_rule('alert tcp $EXTERNAL_NET any -> $HTTP_SERVERS $HTTP_PORTS '
+                            '(msg:"sqli"; content:"union select"; nocase; sid:2;)')
+    assert 8080 in rule['ports'] and 80 in rule['ports']
+    assert matched([rule], packet(8080, b'id=1 UNION SELECT')) == ['SID-2']
+    assert matched([rule], packet(22, b'id=1 UNION SELECT')) == []
+
+    # Configured values take precedence
+    rule = parse_snort_rule('alert tcp any any -> any $HTTP_PORTS (msg:"m"; sid:3;)',
+                            {'HTTP_PORTS': '8000'})
+    assert rule['ports'] == [8000]
+
+
+def test_native_rules_keep_port_index():
+    rule = validate_rule({'id': 'R1', 'name': 'n', 'description': 'd', 'protocol': 'TCP',
+                          'ports': [80], 'payload': ['attack'], 'severity': 'HIGH'})
+    assert matched([rule], packet(80, b'an attack')) == ['R1']
+    assert matched([rule], packet(81, b'an attack')) == []
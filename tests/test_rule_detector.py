@@ -0,0 +1,44 @@
+"""
+Rule detector tests: thresholds in capture time and rule file handling
+"""
+import json
+
+from ids.detectors.rule_detector import RuleDetector
+
+START = 1_700_000_000.0
+
+RULE = {'id': 'T1', 'name': 'Test', 'description': 'd', 'protocol': 'UDP', 'ports': [9],
+        'threshold': 3, 'seconds': 10, 'severity': 'LOW'}
+
+
+def packet(when: float) -> dict:
+    return {'transport': 'UDP', 'src_ip': '192.0.2.1', 'dst_ip': '198.51.100.2',
+            'src_port': 5000, 'dst_port': 9, 'capture_time': when}
+
+
+def test_thresholds_use_capture_time(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps([RULE]))
+    detector = RuleDetector(rule_files=[str(path)])
+    detector.watcher.stop()
+
+    # Replayed far faster than real time: spread over 30s of capture time
+    alerts = [detector.check_packet(packet(START + i * 6)) for i in range(5)]
+    assert not any(alerts)
+
+    alerts = [detector.check_packet(packet(START + 100 + i)) for i in range(3)]
+    assert [len(a) for a in alerts] == [0, 0, 1]
+
+
+def test_missing_rule_files_are_skipped(tmp_path):
+    path = tmp_path / 'rules.json'
+    snort_path = tmp_path / 'local.rules'
+    detector = RuleDetector(rule_files=[str(path)], snort_files=[str(snort_path)])
+    detector.watcher.stop()
+    assert detector.missing_files == [str(path), str(snort_path)]
+    assert detector.get_rule_report()['missing_files'] == 2
+
+    path.write_text(json.dumps([RULE]))
+    detector.reload()
+    assert detector.missing_files == [str(snort_path)]
+    assert 'T1' in {rule['id'] for rule in detector.rules}
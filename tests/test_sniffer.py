@@ -0,0 +1,40 @@
+"""
+Sniffer tests: packet dissection into packet_info
+"""
+from scapy.layers.inet import IP, TCP
+from scapy.layers.l2 import Ether
+from scapy.packet import Raw
+
+from ids.core.sniffer import PacketSniffer
+from ids.detectors.stream_inspector import StreamInspector
+
+
+def dissect(frame) -> dict:
+    """Dissect a frame as it would arrive from the wire (padded to 60 bytes)."""
+    raw = bytes(frame)
+    raw += b'\x00' * max(0, 60 - len(raw))
+    return PacketSniffer().process_packet(Ether(raw))
+
+
+def segment(seq: int, flags='PA', data: bytes = b''):
+    frame = Ether() / IP(src='192.0.2.1', dst='198.51.100.2') / TCP(
+        sport=40000, dport=80, flags=flags, seq=seq)
+    return frame / Raw(data) if data else frame
+
+
+def test_ethernet_padding_is_not_payload():
+    info = dissect(segment(1000, flags='A'))
+    assert info['transport'] == 'TCP'
+    assert 'payload' not in info
+
+    # A short segment is padded too; only its own bytes are payload
+    assert dissect(segment(1000, data=b'abc'))['payload'] == b'abc'
+
+
+def test_padded_ack_does_not_split_the_stream():
+    inspector = StreamInspector(['UNION SELECT'])
+    found = []
+    for frame in (segment(1000, flags='S'), segment(1001, data=b'id=1 UNION SEL'),
+                  segment(1015, flags='A'), segment(1015, data=b'ECT password')):
+        found.extend(inspector.process(dissect(frame)))
+    assert [match['signature'] for match in found] == ['UNION SELECT']
@@ -0,0 +1,95 @@
+"""
+Snort importer tests: rule translation and rules-file loading
+"""
+import pytest
+
+from ids.detectors.snort_importer import load_snort_rules, parse_content, parse_snort_rule
+
+
+def test_content_translation():
+    assert parse_content('"|90 90|AB|0d0a|"') == b'\x90\x90AB\r\n'
+    with pytest.raises(ValueError):
+        parse_content('"|90 9"')
+
+
+def test_rule_translation():
+    rule = parse_snort_rule(
+        'alert tcp $EXTERNAL_NET any -> 10.0.0.0/8 [80,8000:8010] (msg:"Probe"; '
+        'content:"|90 90|AB"; nocase; depth:4; flags:S+; '
+        'detection_filter:track by_src, count 5, seconds 10; sid:100; rev:2; priority:1;)')
+
+    assert rule['id'] == 'SID-100'
+    assert rule['name'] == 'Probe'
+    assert rule['severity'] == 'HIGH'
+    assert rule['protocol'] == 'TCP'
+    assert rule['dst_cidrs'] == ['10.0.0.0/8']
+    assert rule['ports'] == [80, '8000-8010']
+    assert rule['flags'] == 'S+'
+    assert (rule['threshold'], rule['seconds'], rule['track']) == (5, 10, 'by_src')
+    assert rule['payload'] == [{'pattern': '\udc90\udc90AB', 'nocase': True}]
+    # depth narrows the match and is dropped, which the rule records
+    assert rule['relaxed_options'] == ['depth']
+
+
+def test_http_buffers_become_fields():
+    rule = parse_snort_rule(
+        'alert tcp any any -> any $HTTP_PORTS (msg:"Admin"; content:"GET"; http_method; '
+        'http.uri; content:"/admin"; content:"/login"; sid:2;)')
+
+    assert rule['http_method'] == ['GET']
+    assert rule['http_uri'] == ['/admin', '/login']
+    assert 'payload' not in rule
+    assert 80 in rule['ports'] and 8080 in rule['ports']
+
+
+def test_default_and_user_variables():
+    rule = parse_snort_rule('alert tcp any any -> any $ORACLE_PORTS (content:"a"; sid:3;)')
+    assert rule['ports'] == ['1024-65535']
+
+    rule = parse_snort_rule('alert tcp any any -> $HOME_NET $HTTP_PORTS (content:"a"; sid:4;)',
+                            {'HOME_NET': '192.168.0.0/16', 'HTTP_PORTS': '8080'})
+    assert rule['dst_cidrs'] == ['192.168.0.0/16']
+    assert rule['ports'] == [8080]
+
+
+def test_non_alert_actions_are_ignored():
+    assert parse_snort_rule('pass tcp any any -> any 80 (content:"a"; sid:5;)') is None
+
+
+@pytest.mark.parametrize('text', [
+    'alert tcp any any -> any 80 (content:!"a"; sid:6;)',
+    'alert tcp !10.0.0.1 any -> any 80 (content:"a"; sid:7;)',
+    'alert tcp any any -> any !80 (content:"a"; sid:8;)',
+    'alert tcp any any <> any 80 (content:"a"; sid:9;)',
+    'alert sctp any any -> any 80 (content:"a"; sid:10;)',
+    'alert tcp any any -> any 80 (content:"a"; pcre:"/a+/"; sid:11;)',
+    'alert tcp any any -> any 80 (nocase; content:"a"; sid:12;)',
+    'alert tcp any any -> any 80 (content:"a";)',
+    'alert tcp any any -> any 80 content:"a"; sid:13;',
+])
+def test_unsupported_syntax_raises(text):
+    with pytest.raises(ValueError):
+        parse_snort_rule(text)
+
+
+def test_load_rules_file(tmp_path):
+    path = tmp_path / 'local.rules'
+    path.write_text(
+        '# Local rules\n'
+        'var HOME_NET 10.0.0.0/8\n'
+        'portvar WEB_PORTS [80,443]\n'
+        '\n'
+        'alert tcp any any -> $HOME_NET $WEB_PORTS (msg:"Split"; \\\n'
+        '    content:"evil"; sid:1;)\n'
+        'alert tcp any any -> any 80 (content:"a"; pcre:"/a/"; sid:2;)\n'
+        'drop tcp any any -> any 80 (content:"a"; sid:3;)\n'
+        'alert udp any any -> any 53 (msg:"DNS"; dns.query; content:"example"; sid:4;)\n')
+
+    rules, errors = load_snort_rules(str(path))
+
+    assert [rule['id'] for rule in rules] == ['SID-1', 'SID-4']
+    assert rules[0]['dst_cidrs'] == ['10.0.0.0/8']
+    assert rules[0]['ports'] == [80, 443]
+    assert rules[0]['payload'] == [{'pattern': 'evil', 'nocase': False}]
+    assert rules[1]['dns_qname'] == ['example']
+    assert errors == [f"{path}:7: Unsupported option: pcre"]
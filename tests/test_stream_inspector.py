@@ -0,0 +1,71 @@
+"""
+Stream inspector tests: reassembly of reordered and split TCP segments
+"""
+from ids.detectors.stream_inspector import StreamInspector
+
+SIGNATURES = ['UNION SELECT', '/etc/passwd']
+
+
+def segment(seq: int, data: bytes = b'', flags: str = 'PA', src_port: int = 40000) -> dict:
+    info = {'transport': 'TCP', 'src_ip': '192.0.2.1', 'src_port': src_port,
+            'dst_ip': '198.51.100.2', 'dst_port': 80, 'seq': seq, 'flags': flags,
+            'capture_time': 1000.0}
+    if data:
+        info['payload'] = data
+    return info
+
+
+def run(inspector: StreamInspector, segments) -> list:
+    found = []
+    for info in segments:
+        found.extend(match['signature'] for match in inspector.process(info))
+    return found
+
+
+def test_reordered_segments_are_reassembled():
+    inspector = StreamInspector(SIGNATURES)
+    found = run(inspector, [segment(1000, flags='S'),
+                            segment(1016, b'CT * FROM users'),
+                            segment(1006, b'UNION SELE'),
+                            segment(1001, b'id=1 ')])
+
+    assert found == ['UNION SELECT']
+    stats = inspector.get_statistics()
+    assert stats['out_of_order_segments'] == 2
+    assert stats['buffered_bytes'] == 0
+
+
+def test_signature_split_around_acks():
+    inspector = StreamInspector(SIGNATURES)
+    found = run(inspector, [segment(1000, flags='S'),
+                            segment(1001, b'GET /etc/pa'),
+                            segment(1012, flags='A'),
+                            segment(1012, flags='A'),
+                            segment(1012, b'sswd HTTP/1.1')])
+    assert found == ['/etc/passwd']
+
+
+def test_retransmitted_bytes_are_not_scanned_twice():
+    inspector = StreamInspector(SIGNATURES)
+    found = run(inspector, [segment(1000, flags='S'),
+                            segment(1001, b'UNION SEL'),
+                            segment(1001, b'UNION SEL'),
+                            segment(1001, b'UNION SELECT')])
+    assert found == ['UNION SELECT']
+    assert inspector.get_statistics()['bytes_inspected'] == len(b'UNION SELECT')
+
+
+def test_streams_are_kept_apart():
+    inspector = StreamInspector(SIGNATURES)
+    found = run(inspector, [segment(1000, flags='S'), segment(5000, flags='S', src_port=40001),
+                            segment(1001, b'UNION '), segment(5001, b'SELECT', src_port=40001)])
+    assert found == []
+
+
+def test_sequence_wraparound():
+    inspector = StreamInspector(SIGNATURES)
+    start = 0xFFFFFFFA
+    found = run(inspector, [segment(start, flags='S'),
+                            segment(0x00000001, b'SELECT'),
+                            segment(start + 1, b'UNION ')])
+    assert found == ['UNION SELECT']
@@ -0,0 +1,72 @@
+"""
+SYN flood detector tests: handshake completion and window timing
+"""
+from ids.core.address import V4_MAPPED
+from ids.core.config import IDSConfig
+from ids.detectors.synflood_detector import SynFloodDetector
+
+SERVER = '198.51.100.2'
+START = 1_700_000_000.0
+
+
+def tcp(src, dst, src_port, dst_port, flags, when, seq=0, ack=0) -> dict:
+    return {'transport': 'TCP', 'src_ip': src, 'dst_ip': dst,
+            'src_addr': V4_MAPPED | int.from_bytes(bytes(map(int, src.split('.'))), 'big'),
+            'dst_addr': V4_MAPPED | int.from_bytes(bytes(map(int, dst.split('.'))), 'big'),
+            'src_port': src_port, 'dst_port': dst_port, 'flags': flags,
+            'seq': seq, 'ack': ack, 'capture_time': when}
+
+
+def client(i: int) -> str:
+    return f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}'
+
+
+def handshakes(detector, count, when, complete=True, forged_acks=False):
+    """Run count SYN/SYN-ACK(/ACK) exchanges, returning the alerts."""
+    alerts = []
+    for i in range(count):
+        now = when + i * 1e-4
+        port = 1024 + i % 60000
+        alerts += detector.on_packet(tcp(client(i), SERVER, port, 80, 'S', now, seq=i))
+        alerts += detector.on_packet(tcp(SERVER, client(i), 80, port, 'SA', now, seq=5000 + i,
+                                         ack=i + 1))
+        if complete:
+            alerts += detector.on_packet(tcp(client(i), SERVER, port, 80, 'A', now,
+                                             seq=i + 1, ack=5001 + i))
+        elif forged_acks:
+            alerts += detector.on_packet(tcp(client(i), SERVER, port, 80, 'A', now,
+                                             seq=i + 1, ack=12345))
+    return alerts
+
+
+def test_completed_handshakes_are_not_a_flood():
+    detector = SynFloodDetector(IDSConfig())
+    alerts = handshakes(detector, 2000, START)
+    alerts += detector.on_packet(tcp(client(1), SERVER, 9999, 80, 'S', START + 10))
+    assert alerts == []
+
+
+def test_acks_that_complete_nothing_are_not_counted():
+    detector = SynFloodDetector(IDSConfig())
+    alerts = handshakes(detector, 2000, START, complete=False, forged_acks=True)
+    alerts += detector.on_packet(tcp(client(1), SERVER, 9999, 80, 'S', START + 10))
+    assert [alert['type'] for alert in alerts] == ['SYN Flood']
+    assert alerts[0]['handshake_completion'] == 0
+
+
+def test_windows_close_without_more_syns():
+    settings = IDSConfig()
+    detector = SynFloodDetector(settings)
+    handshakes(detector, 2000, START, complete=False)
+
+    # Any later TCP packet, even between other hosts, evaluates the window
+    other = tcp('192.0.2.7', '192.0.2.8', 5555, 443, 'A', START + settings.SYN_FLOOD_WINDOW)
+    alerts = detector.on_packet(other)
+    assert [alert['type'] for alert in alerts] == ['SYN Flood']
+    assert detector.get_statistics()['active_incidents'] == 1
+
+    # The flood has stopped: the next window ends the incident
+    detector.on_packet(dict(other, capture_time=START + 2 * settings.SYN_FLOOD_WINDOW + 1))
+    incidents = detector.get_statistics()['incidents']
+    assert detector.get_statistics()['active_incidents'] == 0
+    assert incidents[0]['destination_ip'] == SERVER and not incidents[0]['active']